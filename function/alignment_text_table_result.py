@@ -16,6 +16,7 @@ from config import (
     MAX_TOKENS,
     TEMPERATURE
 )
+from profiler import profiled
 
 
 # Prompt 模板
@@ -236,6 +237,7 @@ def extract_json_from_text(text: str) -> Optional[str]:
     return None
 
 
+@profiled("llm")
 def call_llm_api(prompt: str) -> Optional[str]:
     """调用大模型API"""
     headers = {
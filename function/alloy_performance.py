@@ -0,0 +1,337 @@
+"""
+合金性能扁平表 alloy_performance：每篇论文的每个合金一行，数值列可建索引做范围查询
+（如“1 M KOH 中 η10 < 50 mV 的全部合金”），不再需要在 Python 中逐行解析 merge_result
+1. 从 result_merge.merge_result.extraction_results 展开：
+   标准电流密度（10 / 50 / 100 / 500 / 1000 mA cm^-2）下的过电位（mV，取绝对值）、
+   Tafel 斜率（mV dec^-1）、稳定性时长（h）与循环数（数值与单位由 units.py 归一化）
+2. 电解液成分 / 摩尔浓度 / pH，以及合金的元素集合（ex_info.alloy_info.core_alloys 的组成式由 composition.py 解析）
+3. write_merge_result 写入 merge_result 后同步刷新对应论文的行；也可以全量重建
+
+用法：
+    python alloy_performance.py         # 从 result_merge 全量重建
+"""
+import json
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+from tqdm import tqdm
+from db import get_connection_params
+from storage import DatabaseError, connect
+from composition import composition_elements
+from table_rules import build_alias_map, label_key
+from units import STANDARD_CURRENT_DENSITIES, normalize_result
+
+ALLOY_PERFORMANCE_DDL = """
+    CREATE TABLE IF NOT EXISTS alloy_performance (
+        id SERIAL PRIMARY KEY,
+        identifier VARCHAR(32) NOT NULL,
+        alloy_id TEXT NOT NULL,
+        alloy_type TEXT,
+        composition TEXT,
+        elements JSONB,
+        element_count INTEGER,
+        electrolyte TEXT,
+        electrolyte_key TEXT,
+        electrolyte_molar DOUBLE PRECISION,
+        ph DOUBLE PRECISION,
+        overpotential_10 DOUBLE PRECISION,
+        overpotential_50 DOUBLE PRECISION,
+        overpotential_100 DOUBLE PRECISION,
+        overpotential_500 DOUBLE PRECISION,
+        overpotential_1000 DOUBLE PRECISION,
+        tafel_slope DOUBLE PRECISION,
+        stability_hours DOUBLE PRECISION,
+        stability_cycles INTEGER
+    )
+"""
+
+# 范围查询用到的列建部分索引（只索引非空值）；两种后端都支持
+ALLOY_PERFORMANCE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_alloy_performance_identifier ON alloy_performance(identifier)",
+    "CREATE INDEX IF NOT EXISTS idx_alloy_performance_electrolyte ON alloy_performance(electrolyte_key, electrolyte_molar)",
+    "CREATE INDEX IF NOT EXISTS idx_alloy_performance_eta10 ON alloy_performance(overpotential_10) WHERE overpotential_10 IS NOT NULL",
+    "CREATE INDEX IF NOT EXISTS idx_alloy_performance_eta100 ON alloy_performance(overpotential_100) WHERE overpotential_100 IS NOT NULL",
+    "CREATE INDEX IF NOT EXISTS idx_alloy_performance_tafel ON alloy_performance(tafel_slope) WHERE tafel_slope IS NOT NULL",
+    "CREATE INDEX IF NOT EXISTS idx_alloy_performance_stability ON alloy_performance(stability_hours) WHERE stability_hours IS NOT NULL",
+]
+# 元素包含查询（elements @> '["Fe", "Ni"]'）的 GIN 索引，仅 PostgreSQL
+POSTGRES_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_alloy_performance_elements ON alloy_performance USING GIN (elements jsonb_path_ops)",
+]
+
+COLUMNS = (
+    "identifier", "alloy_id", "alloy_type", "composition", "elements", "element_count",
+    "electrolyte", "electrolyte_key", "electrolyte_molar", "ph",
+    "overpotential_10", "overpotential_50", "overpotential_100", "overpotential_500", "overpotential_1000",
+    "tafel_slope", "stability_hours", "stability_cycles"
+)
+
+# ========== 配置参数 ==========
+QUERY_BATCH = 500
+REBUILD_FETCH_SIZE = 200
+
+_SUBSCRIPT_TRANSLATION = str.maketrans("₀₁₂₃₄₅₆₇₈₉−–", "0123456789--")
+
+
+def _normalize_text(value) -> str:
+    """统一下标数字与各种减号"""
+    return str(value).translate(_SUBSCRIPT_TRANSLATION)
+
+
+def electrolyte_key(name) -> Optional[str]:
+    """电解液比较键：大写、去空白与下标，如 "H₂SO₄" -> "H2SO4"，"koh" -> "KOH" """
+    if not name:
+        return None
+    key = re.sub(r"\s+", "", _normalize_text(name)).upper()
+    return key or None
+
+
+def _parse_json(value):
+    """JSONB 字段在 SQLite / 旧数据中可能是字符串"""
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except (json.JSONDecodeError, TypeError):
+            return None
+    return value
+
+
+def _core_alloy_lookup(alloy_info) -> Tuple[Dict[str, dict], Dict[str, str]]:
+    """({合金 id: core alloy}, {label_key: 合金 id})"""
+    alloy_info = _parse_json(alloy_info)
+    core_alloys = alloy_info.get("core_alloys") if isinstance(alloy_info, dict) else None
+    if not isinstance(core_alloys, list):
+        return {}, {}
+    by_id = {}
+    for alloy in core_alloys:
+        if isinstance(alloy, dict) and isinstance(alloy.get("id"), str):
+            by_id.setdefault(alloy["id"], alloy)
+    return by_id, build_alias_map(core_alloys)
+
+
+def alloy_performance_row(identifier: str, result: dict, core_alloy: Optional[dict]) -> Optional[Tuple]:
+    """
+    单个合金的扁平行
+
+    参数:
+        identifier: 论文 identifier
+        result: extraction_results 中的一项
+        core_alloy: alloy_info.core_alloys 中对应的合金（可为 None）
+
+    返回:
+        与 COLUMNS 顺序一致的元组；没有 alloy_id 时返回 None
+    """
+    alloy_id = result.get("alloy_id")
+    if not alloy_id:
+        return None
+    core_alloy = core_alloy or {}
+
+    record = normalize_result(result)
+    electrolyte_name = record["electrolyte"]
+
+    composition = core_alloy.get("composition")
+    composition = composition if isinstance(composition, str) else None
+    elements = composition_elements(composition, core_alloy.get("id"), str(alloy_id))
+
+    return (
+        identifier,
+        str(alloy_id),
+        core_alloy.get("type") if isinstance(core_alloy.get("type"), str) else None,
+        composition,
+        json.dumps(elements),
+        len(elements),
+        electrolyte_name,
+        electrolyte_key(electrolyte_name),
+        record["electrolyte_molar"],
+        record["ph"],
+        *(record["overpotential_at"].get(standard) for standard in STANDARD_CURRENT_DENSITIES),
+        record["tafel_slope"],
+        record["stability_hours"],
+        record["stability_cycles"]
+    )
+
+
+def alloy_performance_rows(identifier: str, merge_result, alloy_info=None) -> List[Tuple]:
+    """
+    将一篇论文的 merge_result 展开为扁平行
+
+    参数:
+        identifier: 论文 identifier
+        merge_result: result_merge.merge_result
+        alloy_info: ex_info.alloy_info（用于组成、类型与元素集合）
+
+    返回:
+        [与 COLUMNS 顺序一致的元组, ...]
+    """
+    merge_result = _parse_json(merge_result)
+    results = merge_result.get("extraction_results") if isinstance(merge_result, dict) else None
+    if not isinstance(results, list):
+        return []
+
+    by_id, alias_map = _core_alloy_lookup(alloy_info)
+    rows = []
+    for result in results:
+        if not isinstance(result, dict):
+            continue
+        alloy_id = result.get("alloy_id")
+        core_alloy = by_id.get(alloy_id) if isinstance(alloy_id, str) else None
+        if core_alloy is None and alloy_id:
+            core_alloy = by_id.get(alias_map.get(label_key(alloy_id)))
+        row = alloy_performance_row(identifier, result, core_alloy)
+        if row is not None:
+            rows.append(row)
+    return rows
+
+
+def ensure_alloy_performance(conn) -> None:
+    """创建 alloy_performance 表与索引（已存在时不做任何事）"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(ALLOY_PERFORMANCE_DDL)
+        statements = list(ALLOY_PERFORMANCE_INDEXES)
+        if getattr(conn, "backend", "postgres") != "sqlite":
+            statements.extend(POSTGRES_INDEXES)
+        for statement in statements:
+            cursor.execute(statement)
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def replace_alloy_performance(conn, papers: Iterable[Tuple[str, object, object]]) -> int:
+    """
+    重建若干论文的扁平行（先删后插，不提交）
+
+    参数:
+        conn: 数据库连接
+        papers: [(identifier, merge_result, alloy_info), ...]
+
+    返回:
+        写入的行数
+    """
+    identifiers = []
+    rows = []
+    for identifier, merge_result, alloy_info in papers:
+        if not identifier:
+            continue
+        identifiers.append((identifier,))
+        rows.extend(alloy_performance_rows(identifier, merge_result, alloy_info))
+
+    if not identifiers:
+        return 0
+
+    placeholders = ", ".join("%s::jsonb" if column == "elements" else "%s" for column in COLUMNS)
+    cursor = conn.cursor()
+    try:
+        cursor.executemany("DELETE FROM alloy_performance WHERE identifier = %s", identifiers)
+        if rows:
+            cursor.executemany(f"""
+                INSERT INTO alloy_performance ({", ".join(COLUMNS)})
+                VALUES ({placeholders})
+            """, rows)
+    finally:
+        cursor.close()
+    return len(rows)
+
+
+def fetch_papers(conn, identifiers: List[str]) -> List[Tuple[str, object, object]]:
+    """
+    批量读取论文最新的 merge_result 与 alloy_info
+
+    返回:
+        [(identifier, merge_result, alloy_info), ...]，与 identifiers 顺序一致
+    """
+    merge_results = {}
+    alloy_infos = {}
+    cursor = conn.cursor()
+    try:
+        for i in range(0, len(identifiers), QUERY_BATCH):
+            batch = identifiers[i:i + QUERY_BATCH]
+            placeholders = ", ".join(["%s"] * len(batch))
+            cursor.execute(f"""
+                SELECT identifier, merge_result FROM result_merge
+                WHERE identifier IN ({placeholders})
+                AND merge_result IS NOT NULL
+                AND merge_result::text != 'null'::text
+                ORDER BY id DESC
+            """, batch)
+            for identifier, merge_result in cursor.fetchall():
+                merge_results.setdefault(identifier, merge_result)
+
+            cursor.execute(f"""
+                SELECT identifier, alloy_info FROM ex_info
+                WHERE identifier IN ({placeholders})
+                AND alloy_info IS NOT NULL
+                AND alloy_info::text != 'null'::text
+                ORDER BY id DESC
+            """, batch)
+            for identifier, alloy_info in cursor.fetchall():
+                alloy_infos.setdefault(identifier, alloy_info)
+    finally:
+        cursor.close()
+    return [(identifier, merge_results.get(identifier), alloy_infos.get(identifier)) for identifier in identifiers]
+
+
+def sync_alloy_performance(conn, identifiers: Iterable[str]) -> int:
+    """
+    刷新若干论文的扁平行并提交（write_merge_result 写入 merge_result 后调用）
+
+    返回:
+        写入的行数
+    """
+    identifiers = list(dict.fromkeys(identifier for identifier in identifiers if identifier))
+    if not identifiers:
+        return 0
+    ensure_alloy_performance(conn)
+    written = 0
+    for i in range(0, len(identifiers), REBUILD_FETCH_SIZE):
+        written += replace_alloy_performance(conn, fetch_papers(conn, identifiers[i:i + REBUILD_FETCH_SIZE]))
+        conn.commit()
+    return written
+
+
+def rebuild_alloy_performance(conn, fetch_size: int = REBUILD_FETCH_SIZE) -> int:
+    """
+    从 result_merge 全量重建扁平表（清空后按批写入，每批提交一次）
+
+    返回:
+        写入的行数
+    """
+    ensure_alloy_performance(conn)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT DISTINCT identifier FROM result_merge
+            WHERE identifier IS NOT NULL
+            AND merge_result IS NOT NULL
+            AND merge_result::text != 'null'::text
+            ORDER BY identifier
+        """)
+        identifiers = [row[0] for row in cursor.fetchall()]
+        cursor.execute("DELETE FROM alloy_performance")
+        conn.commit()
+    finally:
+        cursor.close()
+
+    written = 0
+    for i in tqdm(range(0, len(identifiers), fetch_size), desc="重建合金性能表", unit="batch"):
+        written += replace_alloy_performance(conn, fetch_papers(conn, identifiers[i:i + fetch_size]))
+        conn.commit()
+    return written
+
+
+def main():
+    """命令行入口：全量重建合金性能表"""
+    conn = None
+    try:
+        conn = connect(get_connection_params())
+        written = rebuild_alloy_performance(conn)
+        print(f"✓ 合金性能表重建完成，共 {written} 行")
+    except DatabaseError as e:
+        print(f"✗ 数据库错误: {str(e)}")
+    finally:
+        if conn:
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+图片匹配基准：
+1. 一致性检查：FigureIndex 与逐对调用 texts_match 的参考实现在随机构造的论文上结果必须完全一致
+   （覆盖完全匹配、>= 10 字符的包含匹配、关键词重叠匹配以及各类边界长度）
+2. 耗时对比：单篇论文所有 source 字段的匹配耗时
+3. 可选：用数据库中的真实论文（result_merge.text_table_result + table_figure_info.figure_info）做一致性检查
+
+用法：
+    python bench_figure_match.py            # 随机构造 300 篇论文
+    python bench_figure_match.py 1000       # 指定论文数
+    python bench_figure_match.py --db       # 额外校验数据库中的全部论文
+"""
+import random
+import sys
+import time
+from write_merge_result import (
+    FigureIndex,
+    get_figure_info,
+    match_figure_to_source_pairwise,
+    parse_jsonb
+)
+
+# ========== 配置参数 ==========
+DEFAULT_PAPERS = 300
+SEED = 20240601
+VOCABULARY = (
+    "fig figure the of and alloy hea feconi cocrfeni overpotential tafel slope lsv curves "
+    "polarization xrd pattern sem image tem eds mapping stability test chronopotentiometry "
+    "electrolyte koh 1.0 m 10 ma cm mv dec her oer catalyst sample annealed as-cast "
+    "nanoporous surface area ecsa impedance nyquist plot (a) (b) (c) 2θ ° wt.% α-phase"
+).split()
+
+
+def random_sentence(rng, min_words=1, max_words=30):
+    """随机句子：词表中的单词 + 随机标点/大小写"""
+    words = [rng.choice(VOCABULARY) for _ in range(rng.randint(min_words, max_words))]
+    words = [word.upper() if rng.random() < 0.1 else word for word in words]
+    sentence = " ".join(words)
+    if rng.random() < 0.5:
+        sentence += rng.choice([".", ";", ",", " ", "  ", ")"])
+    return sentence
+
+
+def random_paper(rng):
+    """
+    随机构造一篇论文：figure_info 列表与若干 source 列表
+    source 句子部分取自图片文本的片段/变体，保证各类匹配分支都会被触发
+    """
+    figures = []
+    for idx in range(rng.randint(0, 12)):
+        location = f"Fig. {idx + 1} " + random_sentence(rng, 0, 20) if rng.random() < 0.9 else ""
+        refs = [random_sentence(rng, 1, 40) for _ in range(rng.randint(0, 5))]
+        if rng.random() < 0.1:
+            refs.append(None)
+        figures.append({"location": location, "reference_text_list": refs if rng.random() < 0.95 else None})
+    if rng.random() < 0.05:
+        figures.append("not a dict")
+
+    figure_texts = [text for fig in figures if isinstance(fig, dict)
+                    for text in [fig["location"]] + list(fig["reference_text_list"] or []) if text]
+
+    def random_source():
+        if figure_texts and rng.random() < 0.4:
+            text = rng.choice(figure_texts)
+            start = rng.randint(0, len(text))
+            end = rng.randint(start, len(text))
+            variant = rng.random()
+            if variant < 0.3:
+                return text[start:end]
+            if variant < 0.6:
+                return random_sentence(rng, 0, 5) + " " + text[start:end] + " " + random_sentence(rng, 0, 5)
+            return text.upper().replace(" ", "  ")
+        return random_sentence(rng)
+
+    source_lists = []
+    for _ in range(rng.randint(1, 30)):
+        sources = [random_source() for _ in range(rng.randint(0, 4))]
+        if rng.random() < 0.05:
+            sources.append(42)
+        source_lists.append(sources)
+    return figures, source_lists
+
+
+def match_all_pairwise(figures, source_lists):
+    """参考实现：逐个 source 列表逐对匹配"""
+    return [match_figure_to_source_pairwise(sources, figures) for sources in source_lists]
+
+
+def match_all_indexed(figures, source_lists):
+    """索引实现：每篇论文构建一次 FigureIndex"""
+    figure_index = FigureIndex(figures)
+    return [figure_index.match(sources) if figures else None for sources in source_lists]
+
+
+def check_papers(papers):
+    """
+    一致性检查并统计耗时
+
+    返回:
+        (不一致的论文数, 参考实现耗时, 索引实现耗时, 匹配成功的 source 列表数)
+    """
+    mismatches = 0
+    matched = 0
+    pairwise_time = 0.0
+    indexed_time = 0.0
+    for figures, source_lists in papers:
+        start = time.perf_counter()
+        expected = match_all_pairwise(figures, source_lists)
+        pairwise_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = match_all_indexed(figures, source_lists)
+        indexed_time += time.perf_counter() - start
+
+        # figure_info 可能有重复内容，按对象身份比较
+        if [id(item) for item in expected] != [id(item) for item in actual]:
+            mismatches += 1
+        matched += sum(1 for item in expected if item is not None)
+    return mismatches, pairwise_time, indexed_time, matched
+
+
+def collect_source_lists(data, result=None):
+    """递归收集数据结构中所有 source 列表（与 add_figure_source_to_data 遍历规则一致）"""
+    if result is None:
+        result = []
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if key == 'source' and isinstance(value, list):
+                result.append(value)
+            else:
+                collect_source_lists(value, result)
+    elif isinstance(data, list):
+        for item in data:
+            collect_source_lists(item, result)
+    return result
+
+
+def load_db_papers():
+    """从数据库读取全部真实论文的 (figure_info, source 列表)"""
+    from db import get_connection_params
+    from storage import connect
+
+    conn = connect(get_connection_params())
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT identifier, text_table_result
+            FROM result_merge
+            WHERE text_table_result IS NOT NULL
+            AND text_table_result::text != 'null'::text
+        """)
+        papers = []
+        for identifier, text_table_result in cursor.fetchall():
+            figures = get_figure_info(identifier, conn)
+            papers.append((figures, collect_source_lists(parse_jsonb(text_table_result))))
+        return papers
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def report(name, papers):
+    """输出一组论文的一致性与耗时"""
+    mismatches, pairwise_time, indexed_time, matched = check_papers(papers)
+    total = sum(len(source_lists) for _, source_lists in papers)
+    status = "✓" if mismatches == 0 else "✗"
+    print(f"{status} [{name}] {len(papers)} 篇论文 {total} 个 source 列表（匹配 {matched}），不一致 {mismatches} 篇")
+    speedup = pairwise_time / indexed_time if indexed_time > 0 else float("inf")
+    print(f"  逐对匹配 {pairwise_time * 1000:10.1f}ms  倒排索引 {indexed_time * 1000:10.1f}ms  加速 {speedup:5.1f}x")
+    return mismatches == 0
+
+
+def main():
+    """主函数：随机论文一致性检查 + 耗时对比（可选数据库真实论文）"""
+    args = [arg for arg in sys.argv[1:] if arg != "--db"]
+    num_papers = int(args[0]) if args else DEFAULT_PAPERS
+
+    rng = random.Random(SEED)
+    ok = report("随机", [random_paper(rng) for _ in range(num_papers)])
+
+    if "--db" in sys.argv[1:]:
+        ok = report("数据库", load_db_papers()) and ok
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+分句工具基准：
+1. 金标准一致性检查：对 test.txt 分句，结果需与 sentence_split.json 完全一致
+2. 吞吐量测试：断点收集（断句引擎）、完整分句（含 token 计数）与多文档批量分句的 chars/sec
+3. 匹配器微基准：缩写后缀字典树 vs 逐个 endswith，数字预扫描 vs 每个候选点直接跑正则
+4. 流式分句：与批量接口逐句一致性检查，以及 tracemalloc 峰值内存对比
+
+用法：
+    python bench_split_tool.py            # 默认把 test.txt 放大 10 倍测吞吐
+    python bench_split_tool.py 50         # 指定放大倍数
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+import split_tool
+from split_tool import collect_boundaries, iter_text_chunks, split_text_to_chunks, split_texts_to_chunks
+
+# ========== 配置参数 ==========
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+GOLDEN_INPUT = os.path.join(BASE_DIR, "test.txt")
+GOLDEN_OUTPUT = os.path.join(BASE_DIR, "sentence_split.json")
+DEFAULT_SCALE = 10
+REPEAT = 3
+
+
+def check_golden():
+    """
+    金标准一致性检查
+
+    返回:
+        True 表示与 sentence_split.json 完全一致
+    """
+    with open(GOLDEN_INPUT, "r", encoding="utf-8") as f:
+        text = f.read()
+    with open(GOLDEN_OUTPUT, "r", encoding="utf-8") as f:
+        expected = json.load(f)
+
+    actual = split_text_to_chunks(text)
+    if actual == expected:
+        print(f"✓ 金标准一致: {len(actual)} 个句子")
+        return True
+
+    print(f"✗ 金标准不一致: 期望 {len(expected)} 个句子，实际 {len(actual)} 个句子")
+    for exp, act in zip(expected, actual):
+        if exp != act:
+            print(f"  首个差异 id={exp.get('id')}")
+            print(f"    期望: {exp.get('sentence')[:120]!r}")
+            print(f"    实际: {act.get('sentence')[:120]!r}")
+            break
+    return False
+
+
+def _timed(func, arg):
+    """返回 func(arg) 的耗时（秒）"""
+    start = time.perf_counter()
+    func(arg)
+    return time.perf_counter() - start
+
+
+def measure_throughput(func, text, repeat=REPEAT):
+    """
+    测量 func(text) 的吞吐量（取多次运行中的最快一次）
+
+    返回:
+        (chars/sec, 最快一次耗时秒数)
+    """
+    best = min(_timed(func, text) for _ in range(repeat))
+    return len(text) / best if best > 0 else float("inf"), best
+
+
+def bench_matchers(text, repeat=REPEAT):
+    """
+    匹配器微基准：在所有候选断点上分别比较
+    1. 缩写判断：逐个 endswith 与 SuffixTrie
+    2. 断句判断：不带数字索引与带数字索引的 should_split / should_split_no_space
+    """
+    masked_text, _ = split_tool._mask_protected_regions(text)
+    with_space = [m.start(1) for m in split_tool.SENT_END_CANDIDATE_WITH_SPACE.finditer(masked_text)]
+    no_space = [m.start(1) for m in split_tool.SENT_END_CANDIDATE_NO_SPACE.finditer(masked_text)]
+    prev_ends = [split_tool._rstrip_end(masked_text, idx) for idx in with_space + no_space]
+
+    abbreviations = sorted(split_tool.COMMON_ABBREVIATIONS)
+    max_len = max(len(abbrev) for abbrev in abbreviations)
+    matcher = split_tool.SuffixTrie(abbreviations)
+
+    def endswith_loop(ends):
+        results = []
+        for end in ends:
+            tail = masked_text[max(0, end - max_len):end]
+            results.append(any(tail.endswith(abbrev) for abbrev in abbreviations))
+        return results
+
+    def suffix_trie(ends):
+        return [matcher.endswith_any(masked_text, end) for end in ends]
+
+    assert endswith_loop(prev_ends) == suffix_trie(prev_ends)
+    loop_time = min(_timed(endswith_loop, prev_ends) for _ in range(repeat))
+    trie_time = min(_timed(suffix_trie, prev_ends) for _ in range(repeat))
+    print(f"缩写判断 {len(prev_ends):>8,} 个候选点  endswith 循环 {loop_time * 1000:8.2f}ms  "
+          f"后缀字典树 {trie_time * 1000:8.2f}ms  加速 {loop_time / trie_time:5.1f}x")
+
+    digits = split_tool._DigitIndex(masked_text, 0, len(masked_text))
+
+    def decide(index):
+        return ([split_tool.should_split(masked_text, idx, index) for idx in with_space] +
+                [split_tool.should_split_no_space(masked_text, idx, index) for idx in no_space])
+
+    assert decide(None) == decide(digits)
+    plain_time = min(_timed(decide, None) for _ in range(repeat))
+    indexed_time = min(_timed(decide, digits) for _ in range(repeat))
+    print(f"断句判断 {len(prev_ends):>8,} 个候选点  逐点正则     {plain_time * 1000:8.2f}ms  "
+          f"数字预扫描 {indexed_time * 1000:8.2f}ms  加速 {plain_time / indexed_time:5.1f}x")
+
+
+def peak_memory(func, text):
+    """
+    测量 func(text) 执行期间的 Python 堆峰值（字节，不含输入文本本身）
+    生成器结果逐个消费后丢弃，模拟边分句边写出的用法
+    """
+    tracemalloc.start()
+    try:
+        result = func(text)
+        if not isinstance(result, list):
+            for _ in result:
+                pass
+        del result
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def bench_streaming(text):
+    """
+    流式分句：检查 iter_text_chunks 与 split_text_to_chunks 结果完全一致，并对比吞吐与峰值内存
+
+    返回:
+        True 表示结果一致
+    """
+    same = list(iter_text_chunks(text)) == split_text_to_chunks(text)
+    print(f"{'✓' if same else '✗'} 流式与批量结果{'一致' if same else '不一致'}")
+
+    def drain(t):
+        for _ in iter_text_chunks(t):
+            pass
+
+    rate, elapsed = measure_throughput(drain, text)
+    print(f"流式分句 {len(text):>10,} chars  {elapsed:.3f}s  {rate:>14,.0f} chars/sec")
+
+    batch_peak = peak_memory(split_text_to_chunks, text)
+    stream_peak = peak_memory(iter_text_chunks, text)
+    print(f"峰值内存  批量 {batch_peak / 1024 / 1024:8.2f}MB  流式 {stream_peak / 1024 / 1024:8.2f}MB  "
+          f"节省 {batch_peak / max(stream_peak, 1):5.1f}x")
+    return same
+
+
+def main():
+    """主函数：金标准检查 + 吞吐量测试"""
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SCALE
+
+    print("=" * 60)
+    print("金标准一致性检查")
+    print("=" * 60)
+    golden_ok = check_golden()
+
+    with open(GOLDEN_INPUT, "r", encoding="utf-8") as f:
+        base_text = f.read()
+
+    # 两种放大方式：多段落（按换行分块）与单个超长文本块（无换行，断句引擎最坏情况）
+    samples = [
+        ("多段落", "\n".join([base_text] * scale)),
+        ("单块", base_text.replace("\n", " ") * scale),
+    ]
+
+    print("\n" + "=" * 60)
+    print(f"吞吐量测试（放大 {scale} 倍，取 {REPEAT} 次最快）")
+    print("=" * 60)
+    for name, text in samples:
+        rate, elapsed = measure_throughput(collect_boundaries, text)
+        print(f"断点收集 [{name}] {len(text):>10,} chars  {elapsed:.3f}s  {rate:>14,.0f} chars/sec")
+        rate, elapsed = measure_throughput(split_text_to_chunks, text)
+        print(f"完整分句 [{name}] {len(text):>10,} chars  {elapsed:.3f}s  {rate:>14,.0f} chars/sec")
+
+    # 多篇文档批量分句：基础 chunk 跨文档一次 encode_batch
+    documents = [base_text] * scale
+    total_chars = sum(len(doc) for doc in documents)
+    best = min(_timed(split_texts_to_chunks, documents) for _ in range(REPEAT))
+    print(f"批量分句 [{scale} 篇] {total_chars:>10,} chars  {best:.3f}s  {total_chars / best:>14,.0f} chars/sec")
+
+    print("\n" + "=" * 60)
+    print("匹配器微基准")
+    print("=" * 60)
+    bench_matchers(samples[0][1])
+
+    print("\n" + "=" * 60)
+    print("流式分句")
+    print("=" * 60)
+    streaming_ok = bench_streaming(samples[0][1])
+
+    if not (golden_ok and streaming_ok):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,25 +2,18 @@
 检查 hea.public.result_merge 表中，相同 identifier 的 text_result 是否存在重复的 alloy_id
 若存在，打印出其对应的 identifier 和 alloy_id
 """
-import psycopg2
 import json
 from collections import defaultdict
 from db import get_connection_params
+from storage import DatabaseError, connect
 
 
 def create_connection(db_config):
-    """创建PostgreSQL数据库连接"""
+    """创建数据库连接（PostgreSQL 或本地 SQLite，由 db.DB_BACKEND 决定）"""
     try:
-        conn = psycopg2.connect(
-            host=db_config.get('host'),
-            port=db_config.get('port'),
-            database=db_config.get('database'),
-            user=db_config.get('user'),
-            password=db_config.get('password'),
-            connect_timeout=30
-        )
+        conn = connect(db_config)
         return conn
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库连接失败: {str(e)}")
         raise
 
@@ -0,0 +1,215 @@
+"""
+合金组成解析：把 core_alloys[].composition 中的组成式解析为归一化摩尔分数
+alloy_performance 表的元素集合与 data_api 的相似合金检索（/alloys/similar）共用本模块，保证同一合金的元素集合一致
+
+支持的写法：
+- 下标数值：Fe0.15Co0.40Ni0.45、Fe20Co20Ni20Cr20Mn20、FeCoNiCrMn（省略下标视为 1）
+- 括号与变量：Alx(CoCrFeNi)1-x、(FeCoNi)0.9Mo0.1、[PtRu]3Ir（括号内先归一化，下标为该部分所占份额）
+- LaTeX 与 Unicode：$\\mathrm{Fe}_{0.2}\\mathrm{Co}_{0.8}$、Fe₀.₂Co₀.₈
+- 缩写、载体与说明文字：FeCoNi-HEA、NiMo/NF、FeCoNi@CC（取 / 或 @ 之前的部分）、Commercial Pt/C
+  （不能完整拆分为元素符号的单词整体跳过）
+
+本模块只依赖标准库
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+
+# ========== 配置参数 ==========
+# 组成式中的变量（x、y、z、δ）未给出取值时使用的默认值
+DEFAULT_VARIABLE_VALUE = 0.5
+
+# 固定元素基：按原子序数排列（H..Pu）
+ELEMENTS = tuple("""
+    H He Li Be B C N O F Ne Na Mg Al Si P S Cl Ar K Ca Sc Ti V Cr Mn Fe Co Ni Cu Zn Ga Ge As Se Br Kr
+    Rb Sr Y Zr Nb Mo Tc Ru Rh Pd Ag Cd In Sn Sb Te I Xe Cs Ba La Ce Pr Nd Pm Sm Eu Gd Tb Dy Ho Er Tm
+    Yb Lu Hf Ta W Re Os Ir Pt Au Hg Tl Pb Bi Po At Rn Fr Ra Ac Th Pa U Np Pu
+""".split())
+ELEMENT_INDEX = {symbol: index for index, symbol in enumerate(ELEMENTS)}
+
+VARIABLES = "xyzδ"
+
+_CHAR_TRANSLATION = str.maketrans({
+    "₀": "0", "₁": "1", "₂": "2", "₃": "3", "₄": "4", "₅": "5", "₆": "6", "₇": "7", "₈": "8", "₉": "9",
+    "−": "-", "–": "-", "—": "-", "ₓ": "x", "{": "", "}": "", "$": "", "_": "",
+})
+_LATEX_WRAPPER_PATTERN = re.compile(r"\\(?:mathrm|text|textrm|rm|mathit)\s*")
+_LATEX_COMMAND_PATTERN = re.compile(r"\\(?:[A-Za-z]+|[,;!])")
+_ACRONYM_PATTERN = re.compile(r"(?<![A-Za-z])[A-Z]{3,}s?(?![a-z])")
+_VARIABLE_PATTERN = re.compile(r"\b([xyzδ])\s*=\s*(\d+(?:\.\d+)?|\.\d+)")
+_WORD_PATTERN = re.compile(r"[A-Za-zδ]+")
+# 下标：常数项与变量项的线性组合，如 0.15、20、x、1-x、0.5x、2-2y
+_AMOUNT_PATTERN = re.compile(
+    r"(?:\d+(?:\.\d+)?|\.\d+)?[xyzδ]?(?:[-+](?:(?:\d+(?:\.\d+)?|\.\d+)[xyzδ]?|[xyzδ]))*"
+)
+_SUBSCRIPT_START_PATTERN = re.compile(r"\.?\d")
+_TERM_PATTERN = re.compile(r"([-+]?)(\d+(?:\.\d+)?|\.\d+)?([xyzδ]?)")
+_CLOSING = {"(": ")", "[": "]"}
+
+
+def _evaluate_amount(text: str, variables: Dict[str, float]) -> Optional[float]:
+    """计算下标表达式，如 "1-x"（x=0.3）-> 0.7；空串返回 None"""
+    if not text:
+        return None
+    total = 0.0
+    position = 0
+    while position < len(text):
+        match = _TERM_PATTERN.match(text, position)
+        if not match or match.end() == position:
+            break
+        sign, number, variable = match.groups()
+        if number is None and not variable:
+            break
+        value = float(number) if number is not None else 1.0
+        if variable:
+            value *= variables.get(variable, DEFAULT_VARIABLE_VALUE)
+        total += -value if sign == "-" else value
+        position = match.end()
+    return total
+
+
+def _split_word(word: str) -> Optional[List[str]]:
+    """
+    把一个单词拆为元素符号，元素后可以紧跟一个变量（Alx、Bx），如 "CoCrFeNi" -> [Co, Cr, Fe, Ni]
+    不能完整拆分时（"Sample"、"Commercial"）返回 None
+    """
+    symbols = []
+    position = 0
+    while position < len(word):
+        pair = word[position:position + 2]
+        if len(pair) == 2 and pair[1].islower() and pair in ELEMENT_INDEX:
+            symbol = pair
+        elif word[position] in ELEMENT_INDEX:
+            symbol = word[position]
+        else:
+            return None
+        symbols.append(symbol)
+        position += len(symbol)
+        if position < len(word) and word[position] in VARIABLES:
+            position += 1
+    return symbols
+
+
+def _clean(text: str) -> Tuple[str, Dict[str, float]]:
+    """去掉 LaTeX / 缩写 / 载体部分，返回 (待解析的组成式, 组成式中给出的变量取值)"""
+    variables = {name: float(value) for name, value in _VARIABLE_PATTERN.findall(text)}
+    text = _LATEX_WRAPPER_PATTERN.sub("", text)
+    text = _LATEX_COMMAND_PATTERN.sub(" ", text)
+    text = _VARIABLE_PATTERN.sub("", text)
+    text = _ACRONYM_PATTERN.sub(" ", text)
+    text = text.translate(_CHAR_TRANSLATION)
+    # 载体 / 核壳：PtRu/C、NiMo/NF、FeCoNi@CC 只取主体部分
+    return re.split(r"[/@]", text, maxsplit=1)[0], variables
+
+
+class _Parser:
+    """组成式的递归下降解析器：term := (元素 | '(' 组成式 ')' | '[' 组成式 ']') 下标?"""
+
+    def __init__(self, text: str, variables: Dict[str, float]):
+        self.text = text
+        self.variables = variables
+        self.position = 0
+
+    def parse_group(self, closing: Optional[str] = None) -> Dict[str, float]:
+        amounts: Dict[str, float] = {}
+        while self.position < len(self.text):
+            char = self.text[self.position]
+            if closing and char == closing:
+                self.position += 1
+                return amounts
+            if char in _CLOSING:
+                self.position += 1
+                inner = self.parse_group(_CLOSING[char])
+                factor = self._read_amount()
+                # 括号整体的下标表示该基体合金所占份额：(FeCoNi)0.9Mo0.1 中 Mo 占 0.1
+                inner_total = sum(amount for amount in inner.values() if amount > 0)
+                for symbol, amount in inner.items():
+                    if amount > 0 and inner_total > 0:
+                        amounts[symbol] = amounts.get(symbol, 0.0) + amount / inner_total * factor
+                continue
+            word = _WORD_PATTERN.match(self.text, self.position)
+            if word:
+                symbols = _split_word(word.group(0))
+                if symbols is None:
+                    # 不是组成式的单词（说明文字、样品名）整体跳过
+                    self.position = word.end()
+                    continue
+                for symbol in symbols:
+                    self.position += len(symbol)
+                    amounts[symbol] = amounts.get(symbol, 0.0) + self._read_amount()
+                continue
+            # 分隔符与无法识别的字符直接跳过
+            self.position += 1
+        return amounts
+
+    def _read_amount(self) -> float:
+        match = _AMOUNT_PATTERN.match(self.text, self.position)
+        text = match.group(0) if match else ""
+        self.position += len(text)
+        value = _evaluate_amount(text, self.variables)
+        return 1.0 if value is None else value
+
+
+def parse_composition(text: str, variables: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """
+    解析组成式为归一化摩尔分数
+
+    参数:
+        text: 组成式，如 "Fe0.15Co0.40Ni0.45" / "Alx(CoCrFeNi)1-x" / "$\\mathrm{Fe}_{0.2}\\mathrm{Co}_{0.8}$"
+        variables: 变量取值，如 {"x": 0.3}；未给出时先取组成式中的 "x = 0.3"，再取 DEFAULT_VARIABLE_VALUE
+
+    返回:
+        {元素: 摩尔分数}（按原子序数排列），分数之和为 1；无法解析出元素时返回空字典
+    """
+    if not text or not isinstance(text, str):
+        return {}
+    cleaned, found = _clean(text)
+    found.update(variables or {})
+    amounts = _Parser(cleaned, found).parse_group()
+    amounts = {symbol: amount for symbol, amount in amounts.items() if amount > 0}
+    total = sum(amounts.values())
+    if total <= 0:
+        return {}
+    return {symbol: amount / total for symbol, amount in sorted(amounts.items(), key=lambda item: ELEMENT_INDEX[item[0]])}
+
+
+def _is_formula_like(text: str) -> bool:
+    """
+    合金 id 是否像组成式：含双字母元素符号（FeCoNi、Ni2P），或每个元素符号后都有下标（C3N4）
+    样品标签（S1、NF、CC）返回 False
+    """
+    cleaned, _ = _clean(text)
+    subscripts = []
+    has_pair = False
+    for word in _WORD_PATTERN.finditer(cleaned):
+        symbols = _split_word(word.group(0))
+        if symbols is None:
+            continue
+        position = word.start()
+        for symbol in symbols:
+            has_pair = has_pair or len(symbol) == 2
+            position += len(symbol)
+            if position < word.end() and cleaned[position] in VARIABLES:
+                position += 1
+                subscripts.append(True)
+            else:
+                subscripts.append(position == word.end() and bool(_SUBSCRIPT_START_PATTERN.match(cleaned, position)))
+    return has_pair or (bool(subscripts) and all(subscripts))
+
+
+def composition_elements(composition: Optional[str], *alloy_ids) -> List[str]:
+    """
+    元素集合（按字母排序）：优先解析组成式，解析不出元素时依次尝试合金 id
+
+    合金 id 常是样品标签（S1、NF、CC），只有解析出至少两种元素且看起来像组成式时才采用，否则返回空列表
+    如 "Fe0.2Co0.2Ni0.2Cr0.2Mn0.2" -> ["Co", "Cr", "Fe", "Mn", "Ni"]，"NiMo/NF" -> ["Mo", "Ni"]
+    """
+    fractions = parse_composition(composition)
+    if fractions:
+        return sorted(fractions)
+    for alloy_id in alloy_ids:
+        if not isinstance(alloy_id, str):
+            continue
+        fractions = parse_composition(alloy_id)
+        if len(fractions) >= 2 and _is_formula_like(alloy_id):
+            return sorted(fractions)
+    return []
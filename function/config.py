@@ -16,4 +16,37 @@ CHATANYWHERE_MODEL = "deepseek-v3.2"
 # 其他配置
 MAX_RETRIES = 5
 MAX_TOKENS = 16384
-TEMPERATURE = 0.1
\ No newline at end of file
+TEMPERATURE = 0.1
+
+# 性能分析配置（HEA_PROFILE=1 开启，见 profiler.py）
+PROFILE_ENABLED = os.getenv("HEA_PROFILE", "0") == "1"
+PROFILE_OUTPUT_DIR = os.getenv("HEA_PROFILE_DIR", ".")
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("HEA_PROFILE_INTERVAL", "0.005"))  # 采样间隔（秒）
+PROFILE_TOP_N = 15
+
+# 分句并行配置（write_sentence.py，HEA_SENTENCE_WORKERS > 1 时启用多进程模式）
+SENTENCE_WORKERS = int(os.getenv("HEA_SENTENCE_WORKERS", "1"))
+SENTENCE_FETCH_SIZE = int(os.getenv("HEA_SENTENCE_FETCH_SIZE", "500"))    # 每次从数据库读取的行数
+SENTENCE_CHUNK_SIZE = int(os.getenv("HEA_SENTENCE_CHUNK_SIZE", "4"))      # 每次分发给单个进程的文档数
+SENTENCE_WRITE_BATCH = int(os.getenv("HEA_SENTENCE_WRITE_BATCH", "200"))  # 每次批量写回的行数
+# sentence_list 存储格式：offsets（列式字符区间 + token 数，文本按需从 ex_info.text 切片）或 legacy（复制句子文本）
+SENTENCE_LIST_FORMAT = os.getenv("HEA_SENTENCE_FORMAT", "offsets")
+
+# 长文档 prompt 分窗配置（write_alloy_prompt.py / write_per_prompt.py，见 prompt_window.py）
+# 句子列表超过 PROMPT_WINDOW_TOKENS 时切成重叠窗口分别抽取再合并；设为 0 关闭分窗
+PROMPT_WINDOW_TOKENS = int(os.getenv("HEA_PROMPT_WINDOW_TOKENS", "32000"))
+PROMPT_WINDOW_OVERLAP = int(os.getenv("HEA_PROMPT_WINDOW_OVERLAP", "1500"))  # 相邻窗口重叠的 token 数
+PROMPT_WINDOW_WORKERS = int(os.getenv("HEA_PROMPT_WINDOW_WORKERS", "4"))     # 单篇论文各窗口的并发请求数
+
+# 表格 prompt 压缩配置（write_table_prompt.py，见 table_grid.py）
+# HTML 表格解析为单元格网格后以 markdown / tsv 发送；设为 html 时保留原文
+TABLE_PROMPT_FORMAT = os.getenv("HEA_TABLE_PROMPT_FORMAT", "markdown")
+
+# 表格规则抽取（write_table_result.py，见 table_rules.py）：能按规则确定的表格不调用大模型；HEA_TABLE_RULES=0 关闭
+TABLE_RULES_ENABLED = os.getenv("HEA_TABLE_RULES", "1") == "1"
+
+# data_api 响应缓存失效（write_merge_result.py 写入 merge_result 后调用 POST /cache/invalidate）
+# 如 http://127.0.0.1:8003；为空时不通知（API 仍会按行版本发现数据变化）
+API_URL = os.getenv("HEA_API_URL", "")
+# 与 data_api 共享的令牌（请求头 X-Cache-Token）；API 未配置令牌时只接受本机请求
+API_TOKEN = os.getenv("HEA_API_TOKEN", "")
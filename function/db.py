@@ -1,9 +1,15 @@
+import os
+
 DB_HOST = '10.0.32.32'       # 你的 Ubuntu 服务器 IP
 DB_NAME = 'hea'             # 数据库名称
 DB_USER = 'root'            # 数据库用户名
 DB_PASSWORD = '123456'      # 数据库密码
 DB_PORT = 5432              # PostgreSQL 默认端口
 
+# 存储后端：'postgres'（共享服务器）或 'sqlite'（本地单机运行/性能分析）
+DB_BACKEND = os.getenv('HEA_DB_BACKEND', 'postgres')
+SQLITE_PATH = os.getenv('HEA_SQLITE_PATH', 'hea_local.db')
+
 # -----------------------------------------------------------
 # 用于连接的参数字典
 # -----------------------------------------------------------
@@ -15,5 +21,7 @@ def get_connection_params():
         'database': DB_NAME,
         'user': DB_USER,
         'password': DB_PASSWORD,
-        'port': DB_PORT
+        'port': DB_PORT,
+        'backend': DB_BACKEND,
+        'sqlite_path': SQLITE_PATH
     }
\ No newline at end of file
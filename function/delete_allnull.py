@@ -4,27 +4,20 @@
 输出对应的 identifier 和 alloy_id
 注意：本脚本只做统计，不对数据本身做任何操作（不修改、不删除）
 """
-import psycopg2
 import json
 from tqdm import tqdm
 import pandas as pd
 from datetime import datetime
 from db import get_connection_params
+from storage import DatabaseError, connect
 
 
 def create_connection(db_config):
-    """创建PostgreSQL数据库连接"""
+    """创建数据库连接（PostgreSQL 或本地 SQLite，由 db.DB_BACKEND 决定）"""
     try:
-        conn = psycopg2.connect(
-            host=db_config.get('host'),
-            port=db_config.get('port'),
-            database=db_config.get('database'),
-            user=db_config.get('user'),
-            password=db_config.get('password'),
-            connect_timeout=30
-        )
+        conn = connect(db_config)
         return conn
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库连接失败: {str(e)}")
         raise
 
@@ -247,7 +240,7 @@ def check_allnull_fields():
         
         print("\n统计完成！（纯统计，未修改任何数据）")
         
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库错误: {str(e)}")
         import traceback
         traceback.print_exc()
@@ -1,27 +1,20 @@
 """
 导出 result_merge 表的完整数据到 xlsx 文件
 """
-import psycopg2
 import json
 import pandas as pd
 from datetime import datetime
 from tqdm import tqdm
 from db import get_connection_params
+from storage import DatabaseError, connect
 
 
 def create_connection(db_config):
-    """创建PostgreSQL数据库连接"""
+    """创建数据库连接（PostgreSQL 或本地 SQLite，由 db.DB_BACKEND 决定）"""
     try:
-        conn = psycopg2.connect(
-            host=db_config.get('host'),
-            port=db_config.get('port'),
-            database=db_config.get('database'),
-            user=db_config.get('user'),
-            password=db_config.get('password'),
-            connect_timeout=30
-        )
+        conn = connect(db_config)
         return conn
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库连接失败: {str(e)}")
         raise
 
@@ -107,7 +100,7 @@ def export_result_merge_data():
         print(f"  总记录数: {len(records)}")
         print(f"  列数: {len(df.columns)}")
         
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库错误: {str(e)}")
         import traceback
         traceback.print_exc()
@@ -0,0 +1,428 @@
+"""
+流水线阶段性能分析：按行统计 DB / LLM / JSON 序列化 / Python 计算(cpu) 的耗时构成
+并通过采样线程统计热点函数，运行结束时输出可读报告和 JSON 报告（便于跨次运行对比）
+
+开启方式：
+    HEA_PROFILE=1 python write_merge_result.py
+    HEA_PROFILE=1 HEA_PROFILE_DIR=profiles HEA_DB_BACKEND=sqlite python write_text_table_result.py
+
+在阶段脚本中的用法：
+    @profile_stage("write_merge_result")      # 阶段入口：开始/结束分析并输出报告
+    for identifier in PROFILER.rows(ids):     # 行边界：统计每行耗时及构成
+    @profiled("llm")                          # 将函数耗时计入指定类别
+    with PROFILER.timed("db"): ...            # 将代码块耗时计入指定类别
+数据库耗时由 storage.connect 返回的连接自动计入 db，json.loads/json.dumps 自动计入 json
+（包括 psycopg2 读取 JSON / JSONB 列时的解码，该部分从 db 中扣除）
+工作线程中的计时（如分窗 prompt 的并发 LLM 调用）按墙钟时间合并：多个调用重叠的时间只计一次
+"""
+import contextlib
+import functools
+import json
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from config import (
+    PROFILE_ENABLED,
+    PROFILE_OUTPUT_DIR,
+    PROFILE_SAMPLE_INTERVAL,
+    PROFILE_TOP_N
+)
+
+# 耗时类别：cpu 为行总耗时减去其余类别后的 Python 计算时间
+CATEGORIES = ("db", "llm", "json", "cpu")
+PERCENTILES = (50, 90, 95, 99)
+
+_NULL_CONTEXT = contextlib.nullcontext()
+
+
+def percentile(sorted_values, pct):
+    """最近秩法计算百分位数，sorted_values 需已排序"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _latency_summary(values_ms):
+    """汇总一组耗时（毫秒）：均值、各百分位数、最大值"""
+    ordered = sorted(values_ms)
+    summary = {"mean": round(sum(ordered) / len(ordered), 3) if ordered else 0.0}
+    for pct in PERCENTILES:
+        summary[f"p{pct}"] = round(percentile(ordered, pct), 3)
+    summary["max"] = round(ordered[-1], 3) if ordered else 0.0
+    return summary
+
+
+def _register_psycopg2_json(loads):
+    """将 psycopg2 全局的 JSON / JSONB 解码函数设为 loads（未安装 psycopg2 时跳过）"""
+    try:
+        import psycopg2.extras
+    except ImportError:
+        return
+    psycopg2.extras.register_default_json(loads=loads, globally=True)
+    psycopg2.extras.register_default_jsonb(loads=loads, globally=True)
+
+
+class _Sampler(threading.Thread):
+    """采样线程：定期抓取目标线程的调用栈，统计自身(self)与累计(inclusive)命中次数"""
+
+    def __init__(self, target_thread_id, interval):
+        super().__init__(name="hea-profile-sampler", daemon=True)
+        self.target_thread_id = target_thread_id
+        self.interval = interval
+        self.samples = 0
+        self.self_counts = Counter()
+        self.inclusive_counts = Counter()
+        self._stop_event = threading.Event()
+
+    @staticmethod
+    def _frame_key(frame):
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.target_thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            self.self_counts[self._frame_key(frame)] += 1
+            seen = set()
+            while frame is not None:
+                key = self._frame_key(frame)
+                if key not in seen:
+                    seen.add(key)
+                    self.inclusive_counts[key] += 1
+                frame = frame.f_back
+
+    def stop(self):
+        self._stop_event.set()
+        self.join(timeout=1)
+
+
+class StageProfiler:
+    """单个阶段的性能分析器（进程内全局单例 PROFILER）"""
+
+    def __init__(self, enabled=False, output_dir=".", sample_interval=0.005, top_n=15):
+        self.enabled = enabled
+        self.output_dir = output_dir
+        self.sample_interval = sample_interval
+        self.top_n = top_n
+        self._local = threading.local()
+        self._reset(None)
+
+    def _reset(self, stage):
+        self.stage = stage
+        self.started_at = None
+        self._start_time = None
+        self._totals = defaultdict(float)
+        self._row_latencies_ms = []
+        self._row_category_ms = defaultdict(list)
+        self._sampler = None
+        self._json_originals = None
+        self._main_thread = None
+        self._concurrent_lock = threading.Lock()
+        self._active = defaultdict(int)
+        self._active_since = {}
+
+    # ========== 计时 ==========
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextlib.contextmanager
+    def _timed(self, category):
+        if threading.get_ident() != self._main_thread:
+            with self._concurrent(category):
+                yield
+            return
+        # 嵌套计时只把“独占时间”计入内层类别，外层扣除内层耗时
+        stack = self._stack()
+        frame = [category, 0.0]
+        stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            stack.pop()
+            self._totals[category] += elapsed - frame[1]
+            if stack:
+                stack[-1][1] += elapsed
+
+    @contextlib.contextmanager
+    def _concurrent(self, category):
+        # 工作线程：同一类别有任一调用在进行的墙钟时间计入该类别，避免并发调用重叠累加后超过行耗时
+        with self._concurrent_lock:
+            if self._active[category] == 0:
+                self._active_since[category] = time.perf_counter()
+            self._active[category] += 1
+        try:
+            yield
+        finally:
+            with self._concurrent_lock:
+                self._active[category] -= 1
+                if self._active[category] == 0:
+                    self._totals[category] += time.perf_counter() - self._active_since.pop(category)
+
+    def timed(self, category):
+        """返回一个上下文管理器，将代码块耗时计入 category；未开启时为空操作"""
+        if not self.enabled or self.stage is None:
+            return _NULL_CONTEXT
+        return self._timed(category)
+
+    def rows(self, iterable):
+        """
+        包装阶段主循环的迭代对象，相邻两次取值之间的耗时即为一行的处理耗时
+
+        参数:
+            iterable: 主循环迭代对象（记录列表、identifier 列表等）
+
+        返回:
+            未开启时原样返回，开启时返回计时生成器
+        """
+        if not self.enabled or self.stage is None:
+            return iterable
+        return self._iter_rows(iterable)
+
+    def _iter_rows(self, iterable):
+        for item in iterable:
+            before = {category: self._totals[category] for category in CATEGORIES}
+            start = time.perf_counter()
+            try:
+                yield item
+            finally:
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                self._row_latencies_ms.append(elapsed_ms)
+                accounted = 0.0
+                for category in ("db", "llm", "json"):
+                    delta_ms = (self._totals[category] - before[category]) * 1000
+                    accounted += delta_ms
+                    self._row_category_ms[category].append(delta_ms)
+                self._row_category_ms["cpu"].append(max(elapsed_ms - accounted, 0.0))
+
+    # ========== JSON 钩子 ==========
+
+    def _install_json_hooks(self):
+        original_loads, original_dumps = json.loads, json.dumps
+        self._json_originals = (original_loads, original_dumps)
+
+        @functools.wraps(original_loads)
+        def loads(*args, **kwargs):
+            with self.timed("json"):
+                return original_loads(*args, **kwargs)
+
+        @functools.wraps(original_dumps)
+        def dumps(*args, **kwargs):
+            with self.timed("json"):
+                return original_dumps(*args, **kwargs)
+
+        json.loads, json.dumps = loads, dumps
+        # psycopg2 的 JSON / JSONB 类型转换器在导入时保存了 json.loads 的引用，需要单独注册
+        _register_psycopg2_json(loads)
+
+    def _remove_json_hooks(self):
+        if self._json_originals:
+            json.loads, json.dumps = self._json_originals
+            _register_psycopg2_json(self._json_originals[0])
+            self._json_originals = None
+
+    # ========== 阶段生命周期 ==========
+
+    def start(self, stage):
+        """开始分析一个阶段"""
+        if not self.enabled:
+            return
+        self._reset(stage)
+        self.started_at = datetime.now()
+        self._start_time = time.perf_counter()
+        self._main_thread = threading.get_ident()
+        self._install_json_hooks()
+        self._sampler = _Sampler(self._main_thread, self.sample_interval)
+        self._sampler.start()
+
+    def finish(self):
+        """结束当前阶段，打印可读报告并写出 JSON 报告，返回报告字典"""
+        if not self.enabled or self.stage is None:
+            return None
+        wall_seconds = time.perf_counter() - self._start_time
+        if self._sampler:
+            self._sampler.stop()
+        self._remove_json_hooks()
+
+        report = self.build_report(wall_seconds)
+        print(format_report(report))
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        timestamp = self.started_at.strftime("%Y%m%d_%H%M%S")
+        output_file = os.path.join(self.output_dir, f"profile_{self.stage}_{timestamp}.json")
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"✓ 性能分析报告已保存到: {output_file}")
+
+        self._reset(None)
+        return report
+
+    def build_report(self, wall_seconds):
+        """汇总当前阶段的统计数据"""
+        row_count = len(self._row_latencies_ms)
+        row_seconds = sum(self._row_latencies_ms) / 1000
+
+        category_seconds = {category: self._totals[category] for category in ("db", "llm", "json")}
+        category_seconds["cpu"] = max(row_seconds - sum(category_seconds.values()), 0.0)
+        total_seconds = sum(category_seconds.values()) or 1.0
+
+        categories = {}
+        for category in CATEGORIES:
+            categories[category] = {
+                "seconds": round(category_seconds[category], 4),
+                "share": round(category_seconds[category] / total_seconds, 4),
+                "per_row_ms": _latency_summary(self._row_category_ms[category])
+            }
+
+        hot_functions = {"self": [], "inclusive": []}
+        samples = self._sampler.samples if self._sampler else 0
+        if samples:
+            for kind, counter in (("self", self._sampler.self_counts),
+                                  ("inclusive", self._sampler.inclusive_counts)):
+                for function, count in counter.most_common(self.top_n):
+                    hot_functions[kind].append({
+                        "function": function,
+                        "samples": count,
+                        "share": round(count / samples, 4)
+                    })
+
+        return {
+            "stage": self.stage,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "wall_seconds": round(wall_seconds, 4),
+            "rows": row_count,
+            "rows_per_sec": round(row_count / row_seconds, 3) if row_seconds > 0 else 0.0,
+            "row_latency_ms": _latency_summary(self._row_latencies_ms),
+            "categories": categories,
+            "sample_interval_ms": round(self.sample_interval * 1000, 3),
+            "samples": samples,
+            "hot_functions": hot_functions
+        }
+
+
+def format_report(report):
+    """将报告字典格式化为可读文本"""
+    lines = [
+        "=" * 80,
+        f"性能分析报告: {report['stage']}  (开始于 {report['started_at']})",
+        "=" * 80,
+        f"总耗时: {report['wall_seconds']:.2f} s    处理行数: {report['rows']}    吞吐: {report['rows_per_sec']:.2f} 行/秒",
+    ]
+    latency = report["row_latency_ms"]
+    lines.append(
+        "行耗时 (ms): " + "  ".join(f"{key}={latency[key]:.1f}" for key in ("mean", "p50", "p90", "p95", "p99", "max"))
+    )
+    lines.append("-" * 80)
+    lines.append(f"{'类别':<8}{'总耗时(s)':>12}{'占比':>10}{'均值(ms/行)':>14}{'p95(ms/行)':>14}")
+    for category in CATEGORIES:
+        item = report["categories"][category]
+        lines.append(
+            f"{category:<8}{item['seconds']:>12.3f}{item['share'] * 100:>9.1f}%"
+            f"{item['per_row_ms']['mean']:>14.2f}{item['per_row_ms']['p95']:>14.2f}"
+        )
+    for kind, title in (("self", "热点函数（自身）"), ("inclusive", "热点函数（累计）")):
+        entries = report["hot_functions"][kind]
+        if not entries:
+            continue
+        lines.append("-" * 80)
+        lines.append(f"{title}  采样数: {report['samples']}，间隔 {report['sample_interval_ms']} ms")
+        for entry in entries:
+            lines.append(f"  {entry['share'] * 100:>6.1f}%  {entry['samples']:>7}  {entry['function']}")
+    lines.append("=" * 80)
+    return "\n".join(lines)
+
+
+PROFILER = StageProfiler(
+    enabled=PROFILE_ENABLED,
+    output_dir=PROFILE_OUTPUT_DIR,
+    sample_interval=PROFILE_SAMPLE_INTERVAL,
+    top_n=PROFILE_TOP_N
+)
+
+
+def profiled(category):
+    """装饰器：将函数耗时计入指定类别"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with PROFILER.timed(category):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def profile_stage(stage):
+    """装饰器：标记阶段入口函数，开启分析时在结束后输出报告"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            PROFILER.start(stage)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                PROFILER.finish()
+        return wrapper
+    return decorator
+
+
+class ProfiledCursor:
+    """包装数据库游标，将 execute/fetch 耗时计入 db 类别"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, query, params=None):
+        with PROFILER.timed("db"):
+            return self._cursor.execute(query, params)
+
+    def executemany(self, query, seq_of_params):
+        with PROFILER.timed("db"):
+            return self._cursor.executemany(query, seq_of_params)
+
+    def fetchone(self):
+        with PROFILER.timed("db"):
+            return self._cursor.fetchone()
+
+    def fetchmany(self, *args):
+        with PROFILER.timed("db"):
+            return self._cursor.fetchmany(*args)
+
+    def fetchall(self):
+        with PROFILER.timed("db"):
+            return self._cursor.fetchall()
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class ProfiledConnection:
+    """包装数据库连接，cursor() 返回 ProfiledCursor，commit 耗时计入 db 类别"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, *args, **kwargs):
+        return ProfiledCursor(self._conn.cursor(*args, **kwargs))
+
+    def commit(self):
+        with PROFILER.timed("db"):
+            return self._conn.commit()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
@@ -0,0 +1,313 @@
+"""
+长文档 prompt 分窗：
+1. 按句子 token 数（offsets 格式直接使用已存储的 token_count）把句子列表切成若干重叠窗口，
+   每个窗口由完整句子组成且不超过 token 预算，句子 id 保持全文编号
+2. 多窗口 prompt 打包存入原有的 prompt 字段；只有一个窗口时仍存纯文本 prompt，与旧数据兼容
+3. 结果阶段并发调用各窗口，并按 id/别称合并 core_alloys 与 extraction_results
+"""
+import copy
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from config import PROMPT_WINDOW_OVERLAP, PROMPT_WINDOW_TOKENS, PROMPT_WINDOW_WORKERS
+from sentence_format import parse_sentence_list, resolve_sentence_list, sentence_offsets
+from split_tool import ENCODING
+
+WINDOWED_PROMPT_FORMAT = "windows"
+_WINDOWED_PROMPT_PREFIX = '{"format": "%s"' % WINDOWED_PROMPT_FORMAT
+
+# 每个句子在 prompt 中的 JSON 包装（{"id": ..., "sentence": ...}、缩进与换行）大约占用的 token 数
+SENTENCE_JSON_OVERHEAD = 12
+
+
+def sentence_token_counts(sentence_list, text: Optional[str] = None) -> Tuple[List[Dict], List[int]]:
+    """
+    解析句子列表并给出每句 token 数
+
+    参数:
+        sentence_list: 任一格式的 sentence_list
+        text: ex_info.text 原文（offsets 格式必需）
+
+    返回:
+        ([{"id", "sentence"}, ...], [token 数, ...])；legacy 格式没有存储 token 数，批量编码计算
+    """
+    sentence_list = parse_sentence_list(sentence_list)
+    sentences = resolve_sentence_list(sentence_list, text)
+    offsets = sentence_offsets(sentence_list)
+    if offsets:
+        return sentences, [item["token_count"] for item in offsets]
+    encoded = ENCODING.encode_batch([str(item.get("sentence") or "") for item in sentences])
+    return sentences, [len(tokens) for tokens in encoded]
+
+
+def build_sentence_windows(sentences: List[Dict], token_counts: List[int],
+                           budget: int = PROMPT_WINDOW_TOKENS,
+                           overlap: int = PROMPT_WINDOW_OVERLAP) -> List[List[Dict]]:
+    """
+    将句子列表切成重叠窗口
+
+    参数:
+        sentences: [{"id", "sentence"}, ...]
+        token_counts: 每句 token 数
+        budget: 单个窗口的句子 token 预算，<= 0 时不分窗
+        overlap: 相邻窗口重叠的 token 数（按整句回退，至少前进一句）
+
+    返回:
+        窗口列表；全文不超过预算时只有一个窗口。单句超过预算时独占一个窗口
+    """
+    if not sentences:
+        return []
+    costs = [count + SENTENCE_JSON_OVERHEAD for count in token_counts]
+    if budget <= 0 or sum(costs) <= budget:
+        return [sentences]
+
+    windows = []
+    start = 0
+    total = len(sentences)
+    while start < total:
+        end = start
+        used = 0
+        while end < total and (end == start or used + costs[end] <= budget):
+            used += costs[end]
+            end += 1
+        windows.append(sentences[start:end])
+        if end >= total:
+            break
+
+        # 下一个窗口从末尾回退若干整句开始，保证跨窗口的上下文（代词指代、条件说明）不被切断
+        next_start = end
+        carried = 0
+        while next_start - 1 > start and carried + costs[next_start - 1] <= overlap:
+            next_start -= 1
+            carried += costs[next_start]
+        start = next_start
+    return windows
+
+
+def sentence_windows(sentence_list, text: Optional[str] = None,
+                     budget: int = PROMPT_WINDOW_TOKENS,
+                     overlap: int = PROMPT_WINDOW_OVERLAP) -> List[List[Dict]]:
+    """解析句子列表并切成重叠窗口（不分窗时不计算 token 数）"""
+    if budget <= 0:
+        sentences = resolve_sentence_list(parse_sentence_list(sentence_list), text)
+        return [sentences] if sentences else []
+    sentences, token_counts = sentence_token_counts(sentence_list, text)
+    return build_sentence_windows(sentences, token_counts, budget, overlap)
+
+
+def pack_prompts(prompts: List[str], **meta) -> Optional[str]:
+    """
+    将窗口 prompt 打包为可存入单个文本字段的字符串
+
+    参数:
+        prompts: 各窗口的 prompt
+        meta: 合并结果时需要的附加信息（如 core_alloys）
+
+    返回:
+        单个窗口时原样返回 prompt；多个窗口时返回 {"format": "windows", "prompts": [...], ...} 的 JSON
+    """
+    if not prompts:
+        return None
+    if len(prompts) == 1:
+        return prompts[0]
+    payload = {"format": WINDOWED_PROMPT_FORMAT, "prompts": prompts}
+    payload.update(meta)
+    return json.dumps(payload, ensure_ascii=False)
+
+
+def unpack_prompts(stored: str) -> Tuple[List[str], Dict]:
+    """
+    解析 pack_prompts 的结果
+
+    返回:
+        (prompt 列表, 附加信息)；普通 prompt 返回 ([stored], {})
+    """
+    if isinstance(stored, str) and stored.startswith(_WINDOWED_PROMPT_PREFIX):
+        try:
+            payload = json.loads(stored)
+        except json.JSONDecodeError:
+            return [stored], {}
+        prompts = payload.pop("prompts", [])
+        payload.pop("format", None)
+        return prompts, payload
+    return [stored], {}
+
+
+def run_windowed_extraction(prompts: List[str], call: Callable[[str], Optional[str]],
+                            merge: Callable[[List[Dict]], Dict],
+                            workers: int = PROMPT_WINDOW_WORKERS) -> Optional[str]:
+    """
+    并发调用各窗口 prompt 并合并结果
+
+    参数:
+        prompts: 各窗口的 prompt
+        call: 单个 prompt 的调用函数（返回 JSON 字符串，失败返回 None）
+        merge: 合并各窗口解析结果的函数
+        workers: 并发请求数
+
+    返回:
+        合并后的 JSON 字符串；任一窗口失败时返回 None（与单个 prompt 失败时写入 NULL 的语义一致）
+    """
+    if len(prompts) == 1:
+        return call(prompts[0])
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(prompts)))) as executor:
+        responses = list(executor.map(call, prompts))
+    if any(response is None for response in responses):
+        return None
+    return json.dumps(merge([json.loads(response) for response in responses]), ensure_ascii=False)
+
+
+def alias_key(name) -> str:
+    """合并时比较合金名称/别称用的键：忽略大小写与空白"""
+    if name is None:
+        return ""
+    return "".join(str(name).lower().split())
+
+
+def _alloy_keys(alloy: Dict) -> List[str]:
+    """合金的 id 与全部别称对应的键"""
+    names = [alloy.get("id")] + list(alloy.get("aliases") or [])
+    return [key for key in (alias_key(name) for name in names) if key]
+
+
+def _merge_alloy(target: Dict, alloy: Dict) -> None:
+    """把 alloy 合并进 target：别称取并集，空字段补齐，evidence_source 取并集"""
+    target_key = alias_key(target.get("id"))
+    aliases = list(target.get("aliases") or [])
+    seen = {alias_key(alias) for alias in aliases} | {target_key}
+    for name in [alloy.get("id")] + list(alloy.get("aliases") or []):
+        key = alias_key(name)
+        if key and key not in seen:
+            aliases.append(name)
+            seen.add(key)
+    target["aliases"] = aliases
+
+    for field in ("type", "precursor_id", "composition"):
+        if not target.get(field) and alloy.get(field):
+            target[field] = alloy[field]
+
+    evidence = list(target.get("evidence_source") or [])
+    evidence.extend(item for item in alloy.get("evidence_source") or [] if item not in evidence)
+    if all(isinstance(item, int) for item in evidence):
+        evidence.sort()
+    target["evidence_source"] = evidence
+
+
+def merge_core_alloys(results: List[Dict]) -> Dict:
+    """
+    合并各窗口的 core_alloys：id 或任一别称相同（忽略大小写与空白）即视为同一合金
+
+    参数:
+        results: 各窗口解析后的结果 [{"core_alloys": [...]}, ...]（按窗口顺序）
+
+    返回:
+        {"core_alloys": [...]}，合金顺序为首次出现的顺序
+    """
+    merged = []
+    key_to_group = {}
+    for result in results:
+        for alloy in (result or {}).get("core_alloys") or []:
+            if not isinstance(alloy, dict):
+                continue
+            keys = _alloy_keys(alloy)
+            groups = sorted({key_to_group[key] for key in keys if key in key_to_group})
+            if not groups:
+                group = len(merged)
+                merged.append(copy.deepcopy(alloy))
+            else:
+                group = groups[0]
+                _merge_alloy(merged[group], alloy)
+                # 新合金的别称把此前分开的几组连接起来时，合并为一组
+                for other in groups[1:]:
+                    _merge_alloy(merged[group], merged[other])
+                    merged[other] = None
+                    for key, value in key_to_group.items():
+                        if value == other:
+                            key_to_group[key] = group
+            for key in _alloy_keys(merged[group]):
+                key_to_group[key] = group
+
+    return {"core_alloys": [alloy for alloy in merged if alloy is not None]}
+
+
+def _content_key(item) -> str:
+    """列表项去掉 source 后的内容，用于判断两个窗口抽出的是否为同一条数据"""
+    if isinstance(item, dict):
+        item = {key: value for key, value in item.items() if key != "source"}
+    return json.dumps(item, ensure_ascii=False, sort_keys=True)
+
+
+def _merge_sources(left, right):
+    """source 句子 ID 列表取并集（保持先后顺序）"""
+    if isinstance(left, list) and isinstance(right, list):
+        return left + [item for item in right if item not in left]
+    return left if left else right
+
+
+def _merge_values(left, right):
+    """
+    递归合并两个窗口对同一合金的抽取结果：
+    - 字典逐键合并，source 取并集
+    - 列表按内容（不含 source）去重追加，重复项合并 source
+    - 标量保留先出现的非空值
+    """
+    if left is None or left == "":
+        return copy.deepcopy(right)
+    if right is None or right == "":
+        return left
+
+    if isinstance(left, dict) and isinstance(right, dict):
+        for key, value in right.items():
+            if key == "source":
+                left[key] = _merge_sources(left.get(key), copy.deepcopy(value))
+            else:
+                left[key] = _merge_values(left.get(key), value)
+        return left
+
+    if isinstance(left, list) and isinstance(right, list):
+        index = {_content_key(item): item for item in left}
+        for item in right:
+            existing = index.get(_content_key(item))
+            if existing is None:
+                item = copy.deepcopy(item)
+                left.append(item)
+                index[_content_key(item)] = item
+            elif isinstance(existing, dict) and isinstance(item, dict) and "source" in item:
+                existing["source"] = _merge_sources(existing.get("source"), copy.deepcopy(item["source"]))
+        return left
+
+    return left
+
+
+def merge_extraction_results(results: List[Dict], core_alloys: Optional[List[Dict]] = None) -> Dict:
+    """
+    合并各窗口的 extraction_results
+
+    参数:
+        results: 各窗口解析后的结果 [{"extraction_results": [...]}, ...]（按窗口顺序）
+        core_alloys: 合金名册，用于把窗口中以别称给出的 alloy_id 归一到名册 id
+
+    返回:
+        {"extraction_results": [...]}，每个合金一条，顺序为首次出现的顺序
+    """
+    canonical = {}
+    for alloy in core_alloys or []:
+        if isinstance(alloy, dict) and alloy.get("id"):
+            for key in _alloy_keys(alloy):
+                canonical.setdefault(key, alloy["id"])
+
+    merged = {}
+    for result in results:
+        for item in (result or {}).get("extraction_results") or []:
+            if not isinstance(item, dict):
+                continue
+            alloy_id = canonical.get(alias_key(item.get("alloy_id")), item.get("alloy_id"))
+            key = alias_key(alloy_id)
+            if key in merged:
+                _merge_values(merged[key], item)
+            else:
+                merged[key] = copy.deepcopy(item)
+            merged[key]["alloy_id"] = alloy_id
+
+    return {"extraction_results": list(merged.values())}
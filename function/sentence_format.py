@@ -0,0 +1,157 @@
+"""
+sentence_list 存储格式：
+1. legacy：[{"id": 1, "sentence": "..."}, ...]，句子文本整段复制
+2. offsets：{"format": "offsets", "start": [...], "end": [...], "token_count": [...]}
+   列式存储字符区间与 token 数，句子 id 为下标 + 1，文本在读取时由 ex_info.text 切片得到
+
+读取方统一调用 resolve_sentence_list / build_sentence_map，两种格式都可处理
+"""
+import json
+from typing import Dict, List, Optional, Union
+
+OFFSETS_FORMAT = "offsets"
+
+
+def encode_sentence_list(spans: List[Dict[str, int]]) -> Union[Dict[str, list], list]:
+    """
+    将 split_tool.split_text_to_spans 的结果编码为列式 offsets 格式
+
+    参数:
+        spans: [{"id", "start", "end", "token_count"}, ...]，id 从 1 连续递增
+
+    返回:
+        列式字典；没有句子时返回空列表（与 legacy 格式的空值判断保持一致）
+    """
+    if not spans:
+        return []
+    return {
+        "format": OFFSETS_FORMAT,
+        "start": [span["start"] for span in spans],
+        "end": [span["end"] for span in spans],
+        "token_count": [span["token_count"] for span in spans]
+    }
+
+
+def parse_sentence_list(sentence_list):
+    """将数据库读出的 sentence_list（字符串/列表/字典）解析为 Python 对象，无法解析时返回 None"""
+    if isinstance(sentence_list, str):
+        try:
+            return json.loads(sentence_list)
+        except json.JSONDecodeError:
+            return None
+    return sentence_list
+
+
+def is_offsets_format(sentence_list) -> bool:
+    """是否为列式 offsets 格式"""
+    return isinstance(sentence_list, dict) and sentence_list.get("format") == OFFSETS_FORMAT
+
+
+def sentence_count(sentence_list) -> int:
+    """句子数量"""
+    sentence_list = parse_sentence_list(sentence_list)
+    if is_offsets_format(sentence_list):
+        return len(sentence_list.get("start", []))
+    return len(sentence_list) if isinstance(sentence_list, list) else 0
+
+
+def resolve_sentence(sentence_list, text: Optional[str], sentence_id: int) -> Optional[str]:
+    """
+    按 id 取单个句子文本（offsets 格式只切片这一句）
+
+    参数:
+        sentence_list: 任一格式的 sentence_list
+        text: ex_info.text 原文（offsets 格式必需）
+        sentence_id: 句子 id（从 1 开始）
+
+    返回:
+        句子文本，不存在时返回 None
+    """
+    sentence_list = parse_sentence_list(sentence_list)
+    if is_offsets_format(sentence_list):
+        index = sentence_id - 1 if isinstance(sentence_id, int) else -1
+        if text is None or not 0 <= index < len(sentence_list["start"]):
+            return None
+        return text[sentence_list["start"][index]:sentence_list["end"][index]]
+
+    if isinstance(sentence_list, list):
+        for item in sentence_list:
+            if isinstance(item, dict) and item.get("id") == sentence_id:
+                return item.get("sentence")
+    return None
+
+
+def resolve_sentence_list(sentence_list, text: Optional[str] = None) -> List[Dict[str, Union[int, str]]]:
+    """
+    转换为 legacy 形式 [{"id", "sentence"}]，供 prompt 构造等需要句子文本的场景使用
+
+    参数:
+        sentence_list: 任一格式的 sentence_list
+        text: ex_info.text 原文（offsets 格式必需，缺失时返回空列表）
+
+    返回:
+        [{"id": 1, "sentence": "..."}, ...]
+    """
+    sentence_list = parse_sentence_list(sentence_list)
+    if is_offsets_format(sentence_list):
+        if text is None:
+            return []
+        return [
+            {"id": idx, "sentence": text[start:end]}
+            for idx, (start, end) in enumerate(zip(sentence_list["start"], sentence_list["end"]), 1)
+        ]
+    return sentence_list if isinstance(sentence_list, list) else []
+
+
+def build_sentence_map(sentence_list, text: Optional[str] = None) -> Dict[int, str]:
+    """
+    构建 id -> sentence 的映射字典
+
+    参数:
+        sentence_list: 任一格式的 sentence_list
+        text: ex_info.text 原文（offsets 格式必需）
+
+    返回:
+        {1: "句子内容1", 2: "句子内容2", ...}
+    """
+    sentence_map = {}
+    for item in resolve_sentence_list(sentence_list, text):
+        if isinstance(item, dict) and "id" in item:
+            sentence_map[item["id"]] = item.get("sentence", "")
+    return sentence_map
+
+
+def sentence_offsets(sentence_list) -> List[Dict[str, int]]:
+    """
+    返回每个句子在原文中的字符区间与 token 数（供前端高亮证据、prompt token 预算使用）
+    legacy 格式没有位置信息，返回空列表
+
+    返回:
+        [{"id", "start", "end", "token_count"}, ...]
+    """
+    sentence_list = parse_sentence_list(sentence_list)
+    if not is_offsets_format(sentence_list):
+        return []
+    return [
+        {"id": idx, "start": start, "end": end, "token_count": token_count}
+        for idx, (start, end, token_count) in enumerate(
+            zip(sentence_list["start"], sentence_list["end"], sentence_list["token_count"]), 1
+        )
+    ]
+
+
+def total_token_count(sentence_list, sentence_ids=None) -> Optional[int]:
+    """
+    累加已存储的 token 数，无需重新编码；legacy 格式没有 token 数时返回 None
+
+    参数:
+        sentence_list: 任一格式的 sentence_list
+        sentence_ids: 只统计这些句子 id，默认统计全部
+    """
+    sentence_list = parse_sentence_list(sentence_list)
+    if not is_offsets_format(sentence_list):
+        return None
+    counts = sentence_list["token_count"]
+    if sentence_ids is None:
+        return sum(counts)
+    return sum(counts[i - 1] for i in sentence_ids if isinstance(i, int) and 0 < i <= len(counts))
@@ -0,0 +1,246 @@
+"""
+句子索引表 sentence_index：(identifier, sentence_id) -> 句子文本、字符区间与 token 数
+1. write_sentence 写回 sentence_list 时在同一事务内同步重建该论文的索引行
+2. write_source / write_alloy_info / API 按 (identifier, sentence_id) 主键批量查询句子，
+   不再为取几个证据句读取并解析整篇论文的 sentence_list 与原文
+3. 尚未建立索引的论文由调用方回退到 ex_info.sentence_list 解析
+
+用法：
+    python sentence_index.py            # 从 ex_info 现有的 sentence_list 全量重建索引
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+from tqdm import tqdm
+from db import get_connection_params
+from storage import DatabaseError, connect
+from sentence_format import parse_sentence_list, resolve_sentence_list, sentence_offsets
+
+SENTENCE_INDEX_DDL = """
+    CREATE TABLE IF NOT EXISTS sentence_index (
+        identifier VARCHAR(32) NOT NULL,
+        sentence_id INTEGER NOT NULL,
+        start_offset INTEGER,
+        end_offset INTEGER,
+        token_count INTEGER,
+        sentence TEXT,
+        PRIMARY KEY (identifier, sentence_id)
+    )
+"""
+
+# 单条查询语句中 (identifier, sentence_id) 键的最大数量（控制 SQL 参数个数）
+LOOKUP_BATCH = 400
+REBUILD_FETCH_SIZE = 200
+
+
+def ensure_sentence_index(conn) -> None:
+    """创建 sentence_index 表（已存在时不做任何事）"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(SENTENCE_INDEX_DDL)
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def sentence_index_rows(identifier: str, sentence_list, text: Optional[str] = None) -> List[Tuple]:
+    """
+    将一篇论文的 sentence_list 展开为索引行
+
+    参数:
+        identifier: 论文 identifier
+        sentence_list: 任一格式的 sentence_list
+        text: ex_info.text 原文（offsets 格式必需）
+
+    返回:
+        [(identifier, sentence_id, start_offset, end_offset, token_count, sentence), ...]
+        legacy 格式没有位置信息，start_offset/end_offset/token_count 为 None
+    """
+    sentence_list = parse_sentence_list(sentence_list)
+    offsets = sentence_offsets(sentence_list)
+    if offsets:
+        if text is None:
+            return []
+        return [
+            (identifier, item["id"], item["start"], item["end"], item["token_count"],
+             text[item["start"]:item["end"]])
+            for item in offsets
+        ]
+
+    rows = []
+    for item in resolve_sentence_list(sentence_list):
+        if isinstance(item, dict) and isinstance(item.get("id"), int):
+            rows.append((identifier, item["id"], None, None, None, item.get("sentence")))
+    return rows
+
+
+def replace_sentence_index(conn, papers: Iterable[Tuple[str, object, Optional[str]]]) -> int:
+    """
+    重建若干论文的索引行（先删后插，不提交，由调用方与 sentence_list 的写回一起提交）
+
+    参数:
+        conn: 数据库连接
+        papers: [(identifier, sentence_list, text), ...]；同一 identifier 出现多次时以最后一次为准
+
+    返回:
+        写入的索引行数
+    """
+    # ex_info 中同一 identifier 可能有多行，同一批出现多次时只保留最后一行，避免主键冲突导致整批回滚
+    latest = {}
+    for identifier, sentence_list, text in papers:
+        if identifier:
+            latest[identifier] = (sentence_list, text)
+
+    identifiers = [(identifier,) for identifier in latest]
+    rows = []
+    for identifier, (sentence_list, text) in latest.items():
+        rows.extend(sentence_index_rows(identifier, sentence_list, text))
+
+    if not identifiers:
+        return 0
+
+    cursor = conn.cursor()
+    try:
+        cursor.executemany("DELETE FROM sentence_index WHERE identifier = %s", identifiers)
+        if rows:
+            cursor.executemany("""
+                INSERT INTO sentence_index
+                    (identifier, sentence_id, start_offset, end_offset, token_count, sentence)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, rows)
+    finally:
+        cursor.close()
+    return len(rows)
+
+
+def lookup_sentences(conn, requests: Dict[str, Iterable[int]]) -> Dict[str, Dict[int, str]]:
+    """
+    按主键批量查询多篇论文的若干句子
+
+    参数:
+        conn: 数据库连接
+        requests: {identifier: [sentence_id, ...]}
+
+    返回:
+        {identifier: {sentence_id: sentence}}，只包含索引中存在的论文；
+        论文整篇未建立索引时不出现在结果中，调用方据此回退到 sentence_list 解析
+    """
+    keys = []
+    for identifier, sentence_ids in requests.items():
+        for sentence_id in set(sentence_ids or []):
+            # 大模型偶尔把 id 写成 60.0，与 dict 查找语义保持一致
+            if isinstance(sentence_id, float) and sentence_id.is_integer():
+                sentence_id = int(sentence_id)
+            if isinstance(sentence_id, int) and not isinstance(sentence_id, bool):
+                keys.append((identifier, sentence_id))
+
+    found = {}
+    cursor = conn.cursor()
+    try:
+        for i in range(0, len(keys), LOOKUP_BATCH):
+            batch = keys[i:i + LOOKUP_BATCH]
+            placeholders = ", ".join(["(%s, %s)"] * len(batch))
+            cursor.execute(f"""
+                SELECT identifier, sentence_id, sentence
+                FROM sentence_index
+                WHERE (identifier, sentence_id) IN (VALUES {placeholders})
+            """, [value for key in batch for value in key])
+            for identifier, sentence_id, sentence in cursor.fetchall():
+                found.setdefault(identifier, {})[sentence_id] = sentence
+
+        # 请求的 id 全部不存在时，区分“论文未建索引”与“id 越界”
+        missing = [identifier for identifier in requests if identifier not in found and requests[identifier]]
+        for i in range(0, len(missing), LOOKUP_BATCH):
+            batch = missing[i:i + LOOKUP_BATCH]
+            placeholders = ", ".join(["%s"] * len(batch))
+            cursor.execute(f"""
+                SELECT DISTINCT identifier FROM sentence_index
+                WHERE identifier IN ({placeholders})
+            """, batch)
+            for (identifier,) in cursor.fetchall():
+                found[identifier] = {}
+    finally:
+        cursor.close()
+    return found
+
+
+def lookup_sentence_map(conn, identifier: str, sentence_ids: Optional[Iterable[int]] = None) -> Optional[Dict[int, str]]:
+    """
+    查询单篇论文的句子
+
+    参数:
+        conn: 数据库连接
+        identifier: 论文 identifier
+        sentence_ids: 句子 id 列表，默认整篇
+
+    返回:
+        {sentence_id: sentence}；论文未建立索引时返回 None
+    """
+    if sentence_ids is not None:
+        return lookup_sentences(conn, {identifier: list(sentence_ids)}).get(identifier)
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT sentence_id, sentence FROM sentence_index
+            WHERE identifier = %s
+            ORDER BY sentence_id
+        """, (identifier,))
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    return {sentence_id: sentence for sentence_id, sentence in rows} if rows else None
+
+
+def rebuild_sentence_index(conn, fetch_size: int = REBUILD_FETCH_SIZE) -> int:
+    """
+    从 ex_info 现有的 sentence_list 全量重建索引（按 id 分页读取，每页提交一次）
+
+    返回:
+        写入的索引行数
+    """
+    ensure_sentence_index(conn)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT COUNT(*) FROM ex_info
+            WHERE identifier IS NOT NULL AND sentence_list IS NOT NULL
+        """)
+        total = cursor.fetchone()[0]
+
+        written = 0
+        last_id = 0
+        with tqdm(total=total, desc="重建句子索引", unit="doc") as pbar:
+            while True:
+                cursor.execute("""
+                    SELECT id, identifier, sentence_list, text FROM ex_info
+                    WHERE identifier IS NOT NULL AND sentence_list IS NOT NULL AND id > %s
+                    ORDER BY id
+                    LIMIT %s
+                """, (last_id, fetch_size))
+                page = cursor.fetchall()
+                if not page:
+                    break
+                written += replace_sentence_index(conn, [(row[1], row[2], row[3]) for row in page])
+                conn.commit()
+                last_id = page[-1][0]
+                pbar.update(len(page))
+    finally:
+        cursor.close()
+    return written
+
+
+def main():
+    """命令行入口：全量重建句子索引"""
+    conn = None
+    try:
+        conn = connect(get_connection_params())
+        written = rebuild_sentence_index(conn)
+        print(f"✓ 句子索引重建完成，共 {written} 个句子")
+    except DatabaseError as e:
+        print(f"✗ 数据库错误: {str(e)}")
+    finally:
+        if conn:
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,26 +2,22 @@
 拆分 match 字段：根据 identifier 读取 match 字段，按 alloy_id 拆分
 返回每个 alloy_id 需要对齐的表-文信息列表
 """
-import psycopg2
 import json
+from typing import Dict, Iterable, List, Optional
 from db import get_connection_params
+from storage import DatabaseError, connect
 
 # ========== 配置参数 ==========
+# 批量拆分时单条 IN 查询包含的 identifier / table_id 数量上限（控制 SQL 参数个数）
+QUERY_BATCH = 500
 
 
 def create_connection(db_config):
-    """创建PostgreSQL数据库连接"""
+    """创建数据库连接（PostgreSQL 或本地 SQLite，由 db.DB_BACKEND 决定）"""
     try:
-        conn = psycopg2.connect(
-            host=db_config.get('host'),
-            port=db_config.get('port'),
-            database=db_config.get('database'),
-            user=db_config.get('user'),
-            password=db_config.get('password'),
-            connect_timeout=30
-        )
+        conn = connect(db_config)
         return conn
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库连接失败: {str(e)}")
         raise
 
@@ -126,16 +122,137 @@ def replace_source_with_content(obj, identifier, table_info_cache=None):
     return obj
 
 
-def process_table_source(table_obj):
+def fetch_match_data(cursor, identifiers: Iterable[str]) -> Dict[str, object]:
+    """
+    批量查询多个 identifier 的 match 字段（按 QUERY_BATCH 分批的 IN 查询）
+    
+    参数:
+        cursor: 数据库游标
+        identifiers: identifier 列表
+    
+    返回:
+        {identifier: match}，同一 identifier 有多行时取第一行（与单篇查询的 LIMIT 1 一致）
+    """
+    identifiers = list(dict.fromkeys(identifier for identifier in identifiers if identifier))
+    match_map = {}
+    for i in range(0, len(identifiers), QUERY_BATCH):
+        batch = identifiers[i:i + QUERY_BATCH]
+        placeholders = ", ".join(["%s"] * len(batch))
+        cursor.execute(f"""
+            SELECT identifier, match
+            FROM result_merge
+            WHERE identifier IN ({placeholders})
+            AND match IS NOT NULL
+            AND match::text != 'null'::text
+        """, batch)
+        for identifier, match_data in cursor.fetchall():
+            if identifier not in match_map and match_data is not None:
+                match_map[identifier] = match_data
+    return match_map
+
+
+def fetch_table_info_map(cursor, table_ids: Iterable[str]) -> Dict[str, object]:
+    """
+    批量查询多个 table_id 的 table_info（按 QUERY_BATCH 分批的 IN 查询）
+    
+    参数:
+        cursor: 数据库游标
+        table_ids: table_id 列表
+    
+    返回:
+        {table_id: table_info}，不存在或为空的 table_id 不出现在结果中
+    """
+    table_ids = list(dict.fromkeys(table_id for table_id in table_ids if table_id))
+    table_info_map = {}
+    for i in range(0, len(table_ids), QUERY_BATCH):
+        batch = table_ids[i:i + QUERY_BATCH]
+        placeholders = ", ".join(["%s"] * len(batch))
+        cursor.execute(f"""
+            SELECT table_id, table_info
+            FROM new_table_info
+            WHERE table_id IN ({placeholders})
+            AND table_info IS NOT NULL
+        """, batch)
+        for table_id, table_info in cursor.fetchall():
+            if table_id not in table_info_map and table_info is not None:
+                table_info_map[table_id] = table_info
+    return table_info_map
+
+
+def parse_extraction_results(match_data) -> List[dict]:
+    """
+    解析 match 字段，返回其中带 alloy_id 的 extraction_results 项
+    
+    参数:
+        match_data: match 字段（dict 或 JSON 字符串）
+    
+    返回:
+        extraction_results 中的合金项列表，格式不正确时返回空列表
+    """
+    if isinstance(match_data, dict):
+        match_dict = match_data
+    elif isinstance(match_data, str):
+        try:
+            match_dict = json.loads(match_data)
+        except json.JSONDecodeError:
+            return []
+    else:
+        return []
+    
+    # 检查是否有 extraction_results 字段
+    if not isinstance(match_dict, dict) or "extraction_results" not in match_dict:
+        return []
+    
+    extraction_results = match_dict["extraction_results"]
+    if not isinstance(extraction_results, list):
+        return []
+    
+    # 每个 item 应该包含 alloy_id, text, table
+    return [item for item in extraction_results if isinstance(item, dict) and "alloy_id" in item]
+
+
+def build_split_items(extraction_results: List[dict], table_info_map: Optional[Dict[str, object]] = None) -> List[dict]:
+    """
+    按 alloy_id 拆分 extraction_results，每个元素就是一个需要对齐的信息
+    
+    参数:
+        extraction_results: parse_extraction_results 的返回值
+        table_info_map: 预取的 {table_id: table_info}；为 None 时逐个查询数据库
+    
+    返回:
+        拆分后的列表（格式见 split_match_by_identifier）
+    """
+    split_results = []
+    for item in extraction_results:
+        # 构造拆分后的字典
+        split_item = {
+            "alloy_id": item.get("alloy_id"),
+            "text": item.get("text"),  # text 部分的 source 已经是句子内容列表，不需要处理
+            "table": item.get("table")
+        }
+        
+        # 处理 table 部分的 source：
+        # 1. 提取 table_id（所有 source 都相同，只查询一次）
+        # 2. 删除所有子字段中的 source 字段
+        # 3. 在 table 对象最外层添加统一的 source 字段，值为 table_info，放在最后
+        if split_item["table"]:
+            split_item["table"] = process_table_source(split_item["table"], table_info_map)
+        
+        split_results.append(split_item)
+    return split_results
+
+
+def process_table_source(table_obj, table_info_map=None):
     """
     处理 table 对象的 source 字段：
     1. 提取所有 source 字段中的 table_id（应该都相同）
-    2. 查询一次 table_info
+    2. 查询一次 table_info（提供 table_info_map 时直接从预取结果中读取）
     3. 删除所有子字段中的 source 字段
     4. 在 table 对象最外层添加 source 字段，值为 table_info，放在最后
     
     参数:
         table_obj: table 对象
+        table_info_map: 预取的 {table_id: table_info}，默认 None（单独查询数据库）
     
     返回:
         处理后的 table 对象
@@ -149,7 +266,10 @@ def process_table_source(table_obj):
     # 2. 查询 table_info（如果找到 table_id）
     table_info = None
     if table_id:
-        table_info = get_table_info_by_table_id(table_id)
+        if table_info_map is not None:
+            table_info = table_info_map.get(table_id)
+        else:
+            table_info = get_table_info_by_table_id(table_id)
     
     # 3. 删除所有子字段中的 source 字段
     cleaned_table = remove_source_fields(table_obj)
@@ -166,104 +286,53 @@ def process_table_source(table_obj):
         return cleaned_table
 
 
-def split_match_by_identifier(identifier):
+def split_match_by_identifiers(identifiers: Iterable[str], conn=None) -> Dict[str, List[dict]]:
     """
-    根据 identifier 读取 match 字段，按 alloy_id 拆分，并将 table 的 source 替换为实际 table_info
+    批量拆分多个 identifier 的 match 字段：
+    一次查询取回全部 match，再一次查询取回全部被引用的 new_table_info.table_info
+    （数量超过 QUERY_BATCH 时分批，每批仍是两条查询）
     
     参数:
-        identifier: 要查询的 identifier（字符串）
+        identifiers: identifier 列表
+        conn: 复用的数据库连接，默认 None（新建连接并在结束后关闭）
     
     返回:
-        列表，每个元素是一个字典，包含：
-        {
-            "alloy_id": "...",
-            "text": {...},  # 来自 text_result 的数据，source 已经是句子内容列表
-            "table": {...}  # 来自 table_result 的数据，source 已替换为实际 table_info
-        }
-        如果 match 字段为空或不存在，返回空列表
-    
-    示例:
-        >>> results = split_match_by_identifier("0641dcdc064abf0da0c0b376c1bdcecf")
-        >>> print(len(results))
+        {identifier: 拆分结果列表}，每个请求的 identifier 都会出现，没有 match 数据时为空列表
     """
-    # 从 db.py 获取连接配置
-    db_config = get_connection_params()
-    
-    conn = None
+    identifiers = list(identifiers)
+    own_conn = conn is None
     cursor = None
     
     try:
-        # 连接数据库
-        conn = create_connection(db_config)
+        if own_conn:
+            conn = create_connection(get_connection_params())
         cursor = conn.cursor()
         
-        # 查询指定 identifier 的 match 字段
-        cursor.execute("""
-            SELECT match
-            FROM result_merge
-            WHERE identifier = %s
-            AND match IS NOT NULL
-            AND match::text != 'null'::text
-            LIMIT 1
-        """, (identifier,))
-        
-        result = cursor.fetchone()
-        
-        if result is None or result[0] is None:
-            return []
-        
-        match_data = result[0]
-        
-        # 解析 match 数据
-        if isinstance(match_data, dict):
-            match_dict = match_data
-        elif isinstance(match_data, str):
-            try:
-                match_dict = json.loads(match_data)
-            except json.JSONDecodeError:
-                return []
-        else:
-            return []
-        
-        # 检查是否有 extraction_results 字段
-        if not isinstance(match_dict, dict) or "extraction_results" not in match_dict:
-            return []
-        
-        extraction_results = match_dict["extraction_results"]
-        
-        if not isinstance(extraction_results, list):
-            return []
+        # 1. 批量查询 match，并解析出每篇论文的合金项
+        match_map = fetch_match_data(cursor, identifiers)
+        extraction_map = {
+            identifier: parse_extraction_results(match_data)
+            for identifier, match_data in match_map.items()
+        }
         
-        # 按 alloy_id 拆分，每个元素就是一个需要对齐的信息
-        split_results = []
+        # 2. 收集所有 table 对象引用的 table_id，批量查询 table_info
+        table_ids = set()
+        for extraction_results in extraction_map.values():
+            for item in extraction_results:
+                table_obj = item.get("table")
+                if table_obj and isinstance(table_obj, dict):
+                    table_id = extract_table_id_from_source(table_obj)
+                    if table_id:
+                        table_ids.add(table_id)
+        table_info_map = fetch_table_info_map(cursor, table_ids)
         
-        for item in extraction_results:
-            if not isinstance(item, dict):
-                continue
-            
-            # 每个 item 应该包含 alloy_id, text, table
-            if "alloy_id" not in item:
-                continue
-            
-            # 构造拆分后的字典
-            split_item = {
-                "alloy_id": item.get("alloy_id"),
-                "text": item.get("text"),  # text 部分的 source 已经是句子内容列表，不需要处理
-                "table": item.get("table")
-            }
-            
-            # 处理 table 部分的 source：
-            # 1. 提取 table_id（所有 source 都相同，只查询一次）
-            # 2. 删除所有子字段中的 source 字段
-            # 3. 在 table 对象最外层添加统一的 source 字段，值为 table_info，放在最后
-            if split_item["table"]:
-                split_item["table"] = process_table_source(split_item["table"])
-            
-            split_results.append(split_item)
-        
-        return split_results
+        # 3. 拆分
+        return {
+            identifier: build_split_items(extraction_map.get(identifier, []), table_info_map)
+            for identifier in identifiers
+        }
         
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库错误: {str(e)}")
         raise
         
@@ -272,13 +341,36 @@ def split_match_by_identifier(identifier):
         raise
         
     finally:
-        # 关闭数据库连接
         if cursor:
             cursor.close()
-        if conn:
+        if own_conn and conn:
             conn.close()
 
 
+def split_match_by_identifier(identifier, conn=None):
+    """
+    根据 identifier 读取 match 字段，按 alloy_id 拆分，并将 table 的 source 替换为实际 table_info
+    
+    参数:
+        identifier: 要查询的 identifier（字符串）
+        conn: 复用的数据库连接，默认 None（新建连接）
+    
+    返回:
+        列表，每个元素是一个字典，包含：
+        {
+            "alloy_id": "...",
+            "text": {...},  # 来自 text_result 的数据，source 已经是句子内容列表
+            "table": {...}  # 来自 table_result 的数据，source 已替换为实际 table_info
+        }
+        如果 match 字段为空或不存在，返回空列表
+    
+    示例:
+        >>> results = split_match_by_identifier("0641dcdc064abf0da0c0b376c1bdcecf")
+        >>> print(len(results))
+    """
+    return split_match_by_identifiers([identifier], conn).get(identifier, [])
+
+
 def get_all_identifiers_with_match():
     """
     获取所有有 match 字段的 identifier 列表
@@ -311,7 +403,7 @@ def get_all_identifiers_with_match():
         
         return identifiers
         
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库错误: {str(e)}")
         raise
         
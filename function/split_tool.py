@@ -2,10 +2,11 @@
 分句工具：在不修改原始文本内容的前提下完成句子切分
 输出包含 text/start/end/token_count 的字典列表，位置索引对应原始文本
 """
+import bisect
 import json
 import re
 import tiktoken
-from typing import Dict, List, Tuple, Union, Any
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
 # 初始化tiktoken编码器
 ENCODING = tiktoken.get_encoding("cl100k_base")
@@ -56,6 +57,156 @@ SENT_END_CANDIDATE_WITH_SPACE = re.compile(r'([.?!])(?=\s+["\'(\[{<]*[A-Z0-9])')
 SENT_END_CANDIDATE_NO_SPACE = re.compile(r'([.?!])(?=["\'(\[{<]*[A-Z])')
 
 
+# 断句判断只依赖句末符号附近的有限上下文，以下常量为各规则使用的窗口长度
+# 前一个 token 的初始回看窗口（不足时倍增，结果与整段匹配一致）
+_TOKEN_WINDOW = 32
+# 图表前缀 (Fig|Tab|Scheme|Eq|Ref|Chart) 的最长长度 + 1 个字符用于判断单词边界
+_FIG_PREFIX_WINDOW = 7
+# 合并 chunk 时在接缝两侧搜索 token 硬切分点的窗口（字符数）
+HARD_CUT_WINDOW = 64
+# token 数低于该值的句子向下合并
+MIN_CHUNK_TOKENS = 20
+# 流式分句时每批编码的基础 chunk 数
+STREAM_ENCODE_BATCH = 64
+
+# 小数/科学计数法/图表引用/单位规则的最大回看窗口（这些规则都要求窗口内有数字）
+_DIGIT_RULE_WINDOW = 30
+
+DIGIT_PATTERN = re.compile(r'\d')
+PREV_TOKEN_PATTERN = re.compile(r'([\w\\\{\}\^\-\+\%\·]+)$')
+PREV_TOKEN_NO_SPACE_PATTERN = re.compile(r'([\w\\\{\}\^\-\+\%\·\[\]]+)$')
+FIG_PREFIX_PATTERN = re.compile(r'\b(Fig|Tab|Scheme|Eq|Ref|Chart)$', re.IGNORECASE)
+REF_CITATION_PATTERN = re.compile(r'\[[\d\-,]+\]|\([\d\-,]+\)')
+LAST_WORD_PATTERN = re.compile(r'([a-zA-Z]+)$')
+LAST_WORDS_PATTERN = re.compile(r'([a-zA-Z\s]+)$')
+FORMULA_START_PATTERN = re.compile(r'\s*[\^\_\{\}\(\)\[\]\\]')
+
+COMMON_SENTENCE_ENDINGS = frozenset([
+    'result', 'conclusion', 'method', 'experiment', 'analysis',
+    'study', 'finding', 'work', 'treatment', 'electrolysis',
+    'schedules', 'content', 'alloy', 'alloys', 'phase', 'phases',
+    'cost', 'production', 'way', 'role', 'target', 'agreement',
+    'source', 'kinetics', 'overpotentials', 'resistance',
+    'efficiency', 'applications', 'catalysis', 'proportions',
+    'activities', 'durability', 'overpotential',
+    'increase', 'decrease', 'change', 'transition', 'transitioned'
+])
+SENTENCE_ENDING_PATTERNS = (
+    'with the increase of', 'with the decrease of',
+    'with increase of', 'with decrease of',
+    'with the increase', 'with the decrease',
+    'of content', 'of phase', 'of phases', 'of alloy', 'of alloys',
+    'mo content', 'mo phase', 'mo phases'
+)
+SENTENCE_ENDING_PHRASES = (
+    'with the increase of', 'with the decrease of',
+    'with increase of', 'with decrease of',
+    'with the increase', 'with the decrease',
+    'according to', 'due to', 'based on',
+    'of content', 'of phase', 'of phases', 'of alloy', 'of alloys',
+    'the microstructure', 'the structure', 'the properties'
+)
+FIG_REF_TOKENS = ('fig', 'tab', 'eq', 'ref', 'no', 'dr', 'mr', 'ms', 'prof')
+
+
+class SuffixTrie:
+    """
+    反向后缀字典树：从右向左扫描一次，判断字符串是否以任一词条结尾。
+    替代逐个 endswith 的循环，扫描长度不超过最长词条。
+    """
+
+    def __init__(self, words):
+        self.root = {}
+        self.max_len = 0
+        for word in words:
+            node = self.root
+            for char in reversed(word):
+                node = node.setdefault(char, {})
+            node[None] = True  # 词条终点
+            self.max_len = max(self.max_len, len(word))
+
+    def endswith_any(self, text: str, end: int = None) -> bool:
+        """text[:end] 是否以任一词条结尾（end 默认为 len(text)）"""
+        node = self.root
+        if None in node:
+            return True
+        pos = len(text) if end is None else end
+        while pos > 0:
+            node = node.get(text[pos - 1])
+            if node is None:
+                return False
+            if None in node:
+                return True
+            pos -= 1
+        return False
+
+
+class _DigitIndex:
+    """
+    一次扫描记录 [start, end) 内所有数字的位置。
+    小数/科学计数法/图表引用/单位规则都要求回看窗口内有数字，没有数字时可直接跳过这些正则。
+    """
+
+    def __init__(self, text: str, start: int, end: int):
+        self.start = start
+        self.positions = [match.start() for match in DIGIT_PATTERN.finditer(text, start, end)]
+
+    def has_digit(self, lo: int, hi: int) -> bool:
+        """[lo, hi) 内是否可能有数字（超出扫描范围时保守返回 True）"""
+        if lo < self.start:
+            return True
+        i = bisect.bisect_left(self.positions, hi)
+        return i > 0 and self.positions[i - 1] >= lo
+
+
+# 缩写与句末短语的后缀匹配器
+ABBREVIATION_MATCHER = SuffixTrie(COMMON_ABBREVIATIONS)
+ENDING_PATTERN_MATCHER = SuffixTrie(SENTENCE_ENDING_PATTERNS)
+ENDING_PHRASE_MATCHER = SuffixTrie(SENTENCE_ENDING_PHRASES)
+
+
+def configure_abbreviations(abbreviations) -> None:
+    """
+    替换断句时使用的缩写列表（例如按领域增补），默认使用 COMMON_ABBREVIATIONS
+
+    参数:
+        abbreviations: 缩写字符串集合，如 {"e.g.", "Fig.", "wt.%"}
+    """
+    global ABBREVIATION_MATCHER
+    ABBREVIATION_MATCHER = SuffixTrie(abbreviations)
+
+
+class _IntervalUnion:
+    """已保护区域的并集（有序、互不相交的半开区间），支持 O(log n) 的点查询"""
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+
+    def covers(self, pos: int) -> bool:
+        """pos 是否落在某个已保护区域 [s, e) 内"""
+        i = bisect.bisect_right(self.starts, pos) - 1
+        return i >= 0 and pos < self.ends[i]
+
+    def add(self, start: int, end: int) -> None:
+        """加入区间 [start, end)，与相交或相邻的区间合并"""
+        lo = bisect.bisect_left(self.ends, start)
+        hi = bisect.bisect_right(self.starts, end)
+        if lo < hi:
+            start = min(start, self.starts[lo])
+            end = max(end, self.ends[hi - 1])
+        self.starts[lo:hi] = [start]
+        self.ends[lo:hi] = [end]
+
+
+# 受保护区域的三轮扫描：$$...$$ 块级公式、$...$ 行内公式、LaTeX 命令 \command{...}
+PROTECTED_REGION_PATTERNS = (
+    re.compile(r'\$\$(?:[^$]|\$(?!\$))*?\$\$', flags=re.DOTALL),
+    re.compile(r'\$(?:[^$\n]|\\\$)*?\$'),
+    re.compile(r'\\[a-zA-Z]+\{[^}]*\}'),
+)
+
+
 def _mask_protected_regions(text: str) -> Tuple[str, List[Tuple[int, int]]]:
     """
     将需要保护的区域（数学表达式、LaTeX 等）用空格替换，
@@ -64,71 +215,126 @@ def _mask_protected_regions(text: str) -> Tuple[str, List[Tuple[int, int]]]:
     """
     masked = list(text)
     protected_regions = []
+    # 重叠判断：起点落在某个区域 [s, e) 内，或终点落在某个区域 (s, e] 内
+    covered = _IntervalUnion()
 
-    # 1. 保护 $$...$$ (块级数学表达式)
-    for match in re.finditer(r'\$\$(?:[^$]|\$(?!\$))*?\$\$', text, flags=re.DOTALL):
-        start, end = match.start(), match.end()
+    def protect(start, end):
         protected_regions.append((start, end))
-        for i in range(start, end):
-            masked[i] = ' '
+        covered.add(start, end)
+        masked[start:end] = ' ' * (end - start)
+
+    # 1. 保护 $$...$$ (块级数学表达式)
+    for match in PROTECTED_REGION_PATTERNS[0].finditer(text):
+        protect(match.start(), match.end())
 
     # 2. 保护 $...$ (行内数学表达式)
-    for match in re.finditer(r'\$(?:[^$\n]|\\\$)*?\$', text):
+    for match in PROTECTED_REGION_PATTERNS[1].finditer(text):
         start, end = match.start(), match.end()
         # 检查是否与已保护区域重叠
-        if not any(s <= start < e or s < end <= e for s, e in protected_regions):
-            protected_regions.append((start, end))
-            for i in range(start, end):
-                masked[i] = ' '
+        if not (covered.covers(start) or covered.covers(end - 1)):
+            protect(start, end)
 
     # 3. 保护 LaTeX 命令 \command{...}
-    for match in re.finditer(r'\\[a-zA-Z]+\{[^}]*\}', text):
+    for match in PROTECTED_REGION_PATTERNS[2].finditer(text):
         start, end = match.start(), match.end()
-        if not any(s <= start < e or s < end <= e for s, e in protected_regions):
-            protected_regions.append((start, end))
-            for i in range(start, end):
-                masked[i] = ' '
+        if not (covered.covers(start) or covered.covers(end - 1)):
+            protect(start, end)
 
     return ''.join(masked), protected_regions
 
 
-def should_split(text: str, idx: int) -> bool:
+def _rstrip_end(text: str, idx: int) -> int:
+    """返回 text[:idx].rstrip() 的长度，不复制前文"""
+    end = idx
+    while end > 0 and text[end - 1].isspace():
+        end -= 1
+    return end
+
+
+def _next_char(text: str, idx: int) -> str:
+    """返回 text[idx + 1:].lstrip() 的首字符，不存在时返回空串"""
+    pos = idx + 1
+    n = len(text)
+    while pos < n and text[pos].isspace():
+        pos += 1
+    return text[pos] if pos < n else ''
+
+
+def _trailing_token(pattern: re.Pattern, text: str, end: int) -> str:
+    """
+    在 text[:end] 末尾匹配形如 (...)+$ 的 token 模式。
+    先在有限窗口内匹配，只有当 token 顶到窗口起点时才倍增窗口，结果与整段匹配一致。
+    """
+    window = _TOKEN_WINDOW
+    while True:
+        start = max(0, end - window)
+        match = pattern.search(text, start, end)
+        if match is None:
+            return ""
+        if match.start() > start or start == 0:
+            return match.group(1)
+        window *= 2
+
+
+def _trailing_words(text: str, end: int) -> Union[str, None]:
+    """
+    返回 text[:end].rstrip('.,!?;:') 末尾连续字母/空白片段归一化（小写、单空格）后的结果。
+    只用于 endswith 判断，因此归一化长度超过最长句末短语后即可停止向前扩展。
+    """
+    while end > 0 and text[end - 1] in '.,!?;:':
+        end -= 1
+    window = _TOKEN_WINDOW * 2
+    while True:
+        start = max(0, end - window)
+        match = LAST_WORDS_PATTERN.search(text, start, end)
+        if match is None:
+            return None
+        last_words = ' '.join(match.group(1).lower().split())
+        if match.start() > start or start == 0 or len(last_words) > ENDING_PATTERN_MATCHER.max_len:
+            return last_words
+        window *= 2
+
+
+def should_split(text: str, idx: int, digits: _DigitIndex = None) -> bool:
     """
     idx 指向句末符号（., !, ?）。
     根据上下文决定是否切句（有空格的情况）。
     与 sentence_splitter.py 保持一致的逻辑。
+    只读取 idx 前后的有限窗口，单次判断与文本长度无关。
+    digits 为预先扫描的数字位置，窗口内无数字时跳过依赖数字的正则规则。
     """
-    prev_chunk = text[:idx].rstrip()
-    next_chunk = text[idx + 1:].lstrip()
+    # prev_end: text[:idx].rstrip() 的长度；next_char: text[idx + 1:].lstrip() 的首字符
+    prev_end = _rstrip_end(text, idx)
+    next_char = _next_char(text, idx)
 
     # 1. 若前面为空，直接返回 False
-    if not prev_chunk:
+    if prev_end == 0:
         return False
 
     # 2. 获取前一个 token
-    prev_token_match = re.search(r'([\w\\\{\}\^\-\+\%\·]+)$', prev_chunk)
-    prev_token = prev_token_match.group(1) if prev_token_match else ""
+    prev_token = _trailing_token(PREV_TOKEN_PATTERN, text, prev_end)
+
+    # 窗口内没有数字时，科学计数法/图表引用/单位规则都不可能命中
+    digit_rules = digits is None or digits.has_digit(max(0, prev_end - _DIGIT_RULE_WINDOW), prev_end)
 
     # 3. 小数 / 科学计数法
     if DECIMAL_PATTERN.search(prev_token):
         return False
-    if SCIENTIFIC_PATTERN.search(prev_chunk[-12:]):
+    if digit_rules and SCIENTIFIC_PATTERN.search(text[max(0, prev_end - 12):prev_end]):
         return False
 
     # 4. 图表/方程引用
-    if FIG_TAB_PATTERN.search(prev_chunk[-20:]):
+    if digit_rules and FIG_TAB_PATTERN.search(text[max(0, prev_end - 20):prev_end]):
         return False
 
     # 4.5 检查是否是 "Fig. 2f" 这种模式的开始部分
-    # 如果 prev_chunk 以 Fig/Tab/Scheme 等结尾，且 next_chunk 以数字或 S（补充材料）开头
-    fig_prefix_match = re.search(r'\b(Fig|Tab|Scheme|Eq|Ref|Chart)$', prev_chunk, re.IGNORECASE)
-    if fig_prefix_match and next_chunk:
-        # 检查 next_chunk 是否以数字或 S（如 S1, S2 等补充材料图）开头
-        if re.match(r'^[S\d]', next_chunk):
+    # 如果前文以 Fig/Tab/Scheme 等结尾，且后文以数字或 S（补充材料）开头
+    if next_char and (next_char == 'S' or next_char.isdecimal()):
+        if FIG_PREFIX_PATTERN.search(text[max(0, prev_end - _FIG_PREFIX_WINDOW):prev_end]):
             return False
 
     # 5. 单位表达式
-    if UNIT_PATTERN.search(prev_chunk[-30:]):
+    if digit_rules and UNIT_PATTERN.search(text[max(0, prev_end - 30):prev_end]):
         return False
 
     # 6. LaTeX/化学式结构
@@ -136,7 +342,7 @@ def should_split(text: str, idx: int) -> bool:
         return False
 
     # 7. 缩写列表
-    if any(prev_chunk.endswith(abbrev) for abbrev in COMMON_ABBREVIATIONS):
+    if ABBREVIATION_MATCHER.endswith_any(text, prev_end):
         return False
 
     # 8. 元素符号结尾（例如 "Mo."），避免误切
@@ -144,53 +350,54 @@ def should_split(text: str, idx: int) -> bool:
         return False
 
     # 9. 下一个 token 若以小写字母开头，极可能是量纲缩写或公式延续
-    if next_chunk and next_chunk[0].islower():
+    if next_char and next_char.islower():
         return False
 
-    # 10. 若 next_chunk 以 ) } ] 等闭合符号开头，也倾向于不切
-    if next_chunk and next_chunk[0] in ")]}":
+    # 10. 若下一个 token 以 ) } ] 等闭合符号开头，也倾向于不切
+    if next_char and next_char in ")]}":
         return False
 
     return True
 
 
-def should_split_no_space(text: str, idx: int) -> bool:
+def should_split_no_space(text: str, idx: int, digits: _DigitIndex = None) -> bool:
     """
     idx 指向句末符号（., !, ?），且后面直接跟大写字母（无空格）。
     需要更仔细判断，避免误判小数、缩写等。
     与 sentence_splitter.py 保持一致的逻辑。
+    只读取 idx 前的有限窗口，单次判断与文本长度无关。
+    digits 为预先扫描的数字位置，窗口内无数字时跳过依赖数字的正则规则。
     """
-    prev_chunk = text[:idx].rstrip()
-    next_chunk = text[idx + 1:].lstrip()
+    # prev_end: text[:idx].rstrip() 的长度
+    prev_end = _rstrip_end(text, idx)
 
     # 1. 若前面为空，直接返回 False
-    if not prev_chunk:
+    if prev_end == 0:
         return False
 
     # 2. 获取前一个 token（更长的上下文）
-    prev_token_match = re.search(r'([\w\\\{\}\^\-\+\%\·\[\]]+)$', prev_chunk)
-    prev_token = prev_token_match.group(1) if prev_token_match else ""
+    prev_token = _trailing_token(PREV_TOKEN_NO_SPACE_PATTERN, text, prev_end)
 
     # 3. 检查是否是小数
     if DECIMAL_PATTERN.search(prev_token):
         return False
 
     # 4. 检查是否是引用格式（例如 "[1].Electrolyzing"）
-    if prev_chunk and prev_chunk[-1] in '])':
-        ref_match = re.search(r'\[[\d\-,]+\]|\([\d\-,]+\)', prev_chunk[-10:])
-        if ref_match:
+    if text[prev_end - 1] in '])':
+        if REF_CITATION_PATTERN.search(text[max(0, prev_end - 10):prev_end]):
             return True
 
     # 5. 检查是否是缩写
-    if any(prev_chunk.endswith(abbrev) for abbrev in COMMON_ABBREVIATIONS):
+    if ABBREVIATION_MATCHER.endswith_any(text, prev_end):
         return False
 
     # 6. 检查是否是元素符号
     if prev_token.rstrip(".") in ELEMENT_SYMBOLS and prev_token.endswith("."):
         return False
 
-    # 7. 检查是否是图表引用
-    if FIG_TAB_PATTERN.search(prev_chunk[-20:]):
+    # 7. 检查是否是图表引用（窗口内没有数字时不可能命中）
+    if (digits is None or digits.has_digit(max(0, prev_end - 20), prev_end)) \
+            and FIG_TAB_PATTERN.search(text[max(0, prev_end - 20):prev_end]):
         return False
 
     # 8. 检查前一个 token 是否以数字结尾
@@ -199,60 +406,29 @@ def should_split_no_space(text: str, idx: int) -> bool:
             return True
 
     # 9. 检查前一个 token 是否以常见句末词结尾
-    last_word_match = re.search(r'([a-zA-Z]+)$', prev_token)
+    last_word_match = LAST_WORD_PATTERN.search(prev_token)
     if last_word_match:
-        last_word = last_word_match.group(1).lower()
-        common_sentence_endings = [
-            'result', 'conclusion', 'method', 'experiment', 'analysis',
-            'study', 'finding', 'work', 'treatment', 'electrolysis',
-            'schedules', 'content', 'alloy', 'alloys', 'phase', 'phases',
-            'cost', 'production', 'way', 'role', 'target', 'agreement',
-            'source', 'kinetics', 'overpotentials', 'resistance',
-            'efficiency', 'applications', 'catalysis', 'proportions',
-            'activities', 'durability', 'overpotential',
-            'increase', 'decrease', 'change', 'transition', 'transitioned'
-        ]
-        if last_word in common_sentence_endings:
+        if last_word_match.group(1).lower() in COMMON_SENTENCE_ENDINGS:
             return True
 
     # 10. 检查更大的上下文，看是否以常见句末短语结尾
-    if prev_chunk:
-        last_words_match = re.search(r'([a-zA-Z\s]+)$', prev_chunk.rstrip('.,!?;:'))
-        if last_words_match:
-            last_words = ' '.join(last_words_match.group(1).lower().split())
-            sentence_ending_patterns = [
-                'with the increase of', 'with the decrease of',
-                'with increase of', 'with decrease of',
-                'with the increase', 'with the decrease',
-                'of content', 'of phase', 'of phases', 'of alloy', 'of alloys',
-                'mo content', 'mo phase', 'mo phases'
-            ]
-            for pattern in sentence_ending_patterns:
-                if last_words.endswith(pattern):
-                    return True
+    last_words = _trailing_words(text, prev_end)
+    if last_words is not None and ENDING_PATTERN_MATCHER.endswith_any(last_words):
+        return True
 
     # 11. 如果前一个 token 是单个大写字母加句号
     if len(prev_token) == 2 and prev_token[0].isupper() and prev_token[1] == '.':
         return True
 
     # 12. 检查更大的上下文
-    if prev_chunk:
-        last_context = prev_chunk[-30:].lower()
-        sentence_ending_phrases = [
-            'with the increase of', 'with the decrease of',
-            'with increase of', 'with decrease of',
-            'with the increase', 'with the decrease',
-            'according to', 'due to', 'based on',
-            'of content', 'of phase', 'of phases', 'of alloy', 'of alloys',
-            'the microstructure', 'the structure', 'the properties'
-        ]
-        for phrase in sentence_ending_phrases:
-            if last_context.endswith(phrase) or last_context.rstrip('.,!?;:').endswith(phrase):
-                return True
+    last_context = text[max(0, prev_end - 30):prev_end].lower()
+    stripped_context = last_context.rstrip('.,!?;:')
+    if ENDING_PHRASE_MATCHER.endswith_any(last_context) or ENDING_PHRASE_MATCHER.endswith_any(stripped_context):
+        return True
 
     # 13. 默认情况：如果前面看起来像完整句子，且后面跟大写字母，倾向于分句
-    if len(prev_token) > 3 and prev_chunk.rstrip()[-1] == '.':
-        if prev_token.lower() not in ['fig', 'tab', 'eq', 'ref', 'no', 'dr', 'mr', 'ms', 'prof']:
+    if len(prev_token) > 3 and text[prev_end - 1] == '.':
+        if prev_token.lower() not in FIG_REF_TOKENS:
             return True
 
     return False
@@ -260,11 +436,7 @@ def should_split_no_space(text: str, idx: int) -> bool:
 
 def _find_newline_positions(text: str) -> List[int]:
     """找到所有换行符的位置"""
-    positions = []
-    for i, char in enumerate(text):
-        if char == '\n':
-            positions.append(i)
-    return positions
+    return [match.start() for match in re.finditer('\n', text)]
 
 
 def _collect_sentence_boundaries(text: str, masked_text: str, block_start: int, block_end: int) -> List[int]:
@@ -274,40 +446,31 @@ def _collect_sentence_boundaries(text: str, masked_text: str, block_start: int,
     """
     boundaries = []
     block_text = masked_text[block_start:block_end]
+    # 一次扫描标记块内（含前方回看窗口）的数字位置，供各候选点常数时间查询
+    digits = _DigitIndex(masked_text, max(0, block_start - _DIGIT_RULE_WINDOW), block_end)
 
     # 1. 有空格的情况
     for match in SENT_END_CANDIDATE_WITH_SPACE.finditer(block_text):
         local_idx = match.start(1)
         global_idx = block_start + local_idx
-        if should_split(masked_text, global_idx):
+        if should_split(masked_text, global_idx, digits):
             boundaries.append(global_idx)
 
     # 2. 无空格但直接跟大写字母的情况
     for match in SENT_END_CANDIDATE_NO_SPACE.finditer(block_text):
         local_idx = match.start(1)
         global_idx = block_start + local_idx
-        if should_split_no_space(masked_text, global_idx):
+        if should_split_no_space(masked_text, global_idx, digits):
             boundaries.append(global_idx)
 
     return sorted(set(boundaries))
 
 
-def split_text_to_chunks(text: str) -> List[Dict[str, Union[int, str]]]:
+def collect_boundaries(text: str) -> List[int]:
     """
-    按照句子级别切分文本，并返回包含 text/start/end/token_count 的字典列表。
-    start 为起始字符索引，end 为结束字符索引（不含）。
-    token_count 为使用 tiktoken (cl100k_base) 编码计算的 token 数量。
-
-    核心逻辑：
-    1. 换行符是最高优先级的分割点
-    2. 在每个文本块内，保护数学表达式后进行断句
-    3. 返回的 text 是原始文本的切片，位置索引不变
-    4. 每个 chunk 包含使用 tiktoken 计算的 token 数量
-    5. 合并 token_count < 20 的小句子
+    收集整篇文本的全部断点（句末符号位置），已排序。
+    断点判断只读取候选位置附近的有限窗口，整体耗时与文本长度线性相关。
     """
-    if not text:
-        return []
-
     # 第一步：创建掩码文本（保护数学表达式等）
     masked_text, _ = _mask_protected_regions(text)
 
@@ -337,12 +500,194 @@ def split_text_to_chunks(text: str) -> List[Dict[str, Union[int, str]]]:
         block_boundaries = _collect_sentence_boundaries(text, masked_text, block_start, block_end)
         all_boundaries.update(block_boundaries)
 
-    # 第五步：根据断点生成 chunks
-    sorted_boundaries = sorted(all_boundaries)
-    chunks = []
+    return sorted(all_boundaries)
+
+
+class _ProtectedRegionStream:
+    """
+    按位置顺序惰性生成受保护区域，接受/跳过规则与 _mask_protected_regions 完全一致：
+    第 1 轮全部保护；第 2、3 轮的匹配若起点或终点落在前几轮已保护区域内则跳过。
+    只保留可能与后续文本块相交的区域，内存与当前块相关而与全文长度无关。
+    """
+
+    def __init__(self, text: str):
+        self._text = text
+        self._iters = [pattern.finditer(text) for pattern in PROTECTED_REGION_PATTERNS]
+        self._peeked = [None] * len(PROTECTED_REGION_PATTERNS)
+        self._accepted = [[] for _ in PROTECTED_REGION_PATTERNS]
+
+    def _peek(self, k: int):
+        """第 k 轮的下一个匹配（不消费），没有时返回 None"""
+        if self._peeked[k] is None:
+            self._peeked[k] = next(self._iters[k], False)
+        return self._peeked[k] or None
+
+    def _covered(self, k: int, pos: int) -> bool:
+        """pos 是否落在前 k 轮已保护的某个区域内（同一轮的区域互不重叠且按起点有序，可二分）"""
+        for regions in self._accepted[:k]:
+            idx = bisect.bisect_right(regions, (pos, float('inf'))) - 1
+            if idx >= 0 and regions[idx][1] > pos:
+                return True
+        return False
+
+    def _advance(self, k: int, limit: int) -> None:
+        """处理第 k 轮中起点 < limit 的全部匹配"""
+        match = self._peek(k)
+        while match is not None and match.start() < limit:
+            self._peeked[k] = None
+            start, end = match.start(), match.end()
+            # 判断重叠前，先确保前几轮中可能覆盖 [start, end) 的区域都已生成
+            for j in range(k):
+                self._advance(j, end)
+            if k == 0 or not (self._covered(k, start) or self._covered(k, end - 1)):
+                self._accepted[k].append((start, end))
+            match = self._peek(k)
+
+    def regions(self, lo: int, hi: int) -> List[Tuple[int, int]]:
+        """返回与 [lo, hi) 相交的全部受保护区域（按起点排序）"""
+        for k in range(len(PROTECTED_REGION_PATTERNS)):
+            self._advance(k, hi)
+        return sorted((s, e) for regions in self._accepted for s, e in regions if s < hi and e > lo)
+
+    def prune(self, lo: int) -> None:
+        """丢弃终点不超过 lo 的区域（之后的文本块与重叠判断都不会再用到）"""
+        self._accepted = [[(s, e) for s, e in regions if e > lo] for regions in self._accepted]
+
+    def mask(self, lo: int, hi: int) -> str:
+        """返回 text[lo:hi] 的掩码版本（受保护区域替换为空格）"""
+        pieces = []
+        current = lo
+        for start, end in self.regions(lo, hi):
+            start = max(start, current)
+            end = min(end, hi)
+            if start >= end:
+                continue
+            pieces.append(self._text[current:start])
+            pieces.append(' ' * (end - start))
+            current = end
+        pieces.append(self._text[current:hi])
+        return ''.join(pieces)
+
+
+def _segment_is_safe(masked_segment: str, local_block_start: int) -> bool:
+    """
+    以换行后的位置作为掩码片段起点时，块内断句判断的回看是否都落在片段内
+    （片段前一个字符是空白，前一个 token 不会越界；只需检查 rstrip、固定窗口与句末短语）
+
+    参数:
+        masked_segment: 从某行行首到当前块末尾的掩码文本
+        local_block_start: 当前块在片段内的起点
+    """
+    prev_end = _rstrip_end(masked_segment, local_block_start)
+    if prev_end < max(_DIGIT_RULE_WINDOW, ABBREVIATION_MATCHER.max_len, 1):
+        return False
+
+    end = prev_end
+    while end > 0 and masked_segment[end - 1] in '.,!?;:':
+        end -= 1
+    if end == 0:
+        return False
+    match = LAST_WORDS_PATTERN.search(masked_segment, 0, end)
+    if match is None or match.start() > 0:
+        return True
+    return len(' '.join(match.group(1).lower().split())) > ENDING_PATTERN_MATCHER.max_len
+
+
+def iter_boundaries(text: str) -> Iterator[int]:
+    """
+    流式版 collect_boundaries：逐个换行分隔的文本块产出断点（升序），结果完全一致。
+    只为当前块及其前方必要的几行构造掩码文本，不生成全文掩码副本与完整断点集合。
+    """
+    regions = _ProtectedRegionStream(text)
+    pos = 0
+    while True:
+        newline = text.find('\n', pos)
+        block_end = len(text) if newline == -1 else newline
+        boundaries = []
+
+        if block_end > pos:
+            # 向前扩展到能覆盖全部回看窗口的行首
+            segment_start = pos
+            while True:
+                masked_segment = regions.mask(segment_start, block_end)
+                if segment_start == 0 or _segment_is_safe(masked_segment, pos - segment_start):
+                    break
+                segment_start = text.rfind('\n', 0, segment_start - 1) + 1
+            regions.prune(segment_start)
+
+            local_start = pos - segment_start
+            local_boundaries = _collect_sentence_boundaries(
+                masked_segment, masked_segment, local_start, local_start + block_end - pos
+            )
+            boundaries = [segment_start + boundary for boundary in local_boundaries]
+
+        # 换行符之前强制断开
+        if newline > 0:
+            boundaries.append(newline - 1)
+        yield from sorted(set(boundaries))
+
+        if newline == -1:
+            return
+        pos = newline + 1
+
+
+def _count_tokens(text: str) -> int:
+    """使用 tiktoken 计算文本的 token 数量"""
+    return len(ENCODING.encode(text))
+
+
+def _is_hard_cut(text: str, pos: int) -> bool:
+    """
+    pos 处是否为 cl100k 预分词的硬切分点：字母 + 空格 + 字母，空格归入后一个词。
+    无论两侧如何拼接，预分词都在 pos 处断开，左右两段单独编码的结果与整体编码一致。
+    """
+    return text[pos] == ' ' and text[pos - 1].isalpha() and text[pos + 1].isalpha()
+
+
+def _joined_token_count(text: str, start: int, left_end: int, left_count: int,
+                        right_start: int, end: int, right_count: int) -> int:
+    """
+    计算 text[start:end] 的 token 数量，已知 text[start:left_end] 与 text[right_start:end] 的 token 数量。
+    只重新编码接缝两侧最近的硬切分点之间的片段，其余部分复用已有计数。
+
+    参数:
+        text: 原始文本
+        start, left_end, left_count: 左段范围及其 token 数
+        right_start, end, right_count: 右段范围及其 token 数（left_end <= right_start，中间可有空白间隔）
+
+    返回:
+        text[start:end] 的 token 数量（与直接编码完全一致）
+    """
+    # 左段内距接缝最近的硬切分点（找不到时退化为左段起点，即整段重新编码）
+    cut_left = start
+    for pos in range(left_end - 2, max(start, left_end - HARD_CUT_WINDOW), -1):
+        if _is_hard_cut(text, pos):
+            cut_left = pos
+            break
+
+    # 右段内距接缝最近的硬切分点（找不到时退化为右段终点）
+    cut_right = end
+    for pos in range(right_start + 1, min(end - 1, right_start + HARD_CUT_WINDOW)):
+        if _is_hard_cut(text, pos):
+            cut_right = pos
+            break
+
+    left_tail = left_count if cut_left == start else _count_tokens(text[cut_left:left_end])
+    right_head = right_count if cut_right == end else _count_tokens(text[right_start:cut_right])
+    return left_count - left_tail + _count_tokens(text[cut_left:cut_right]) + right_count - right_head
+
+
+def _iter_chunk_ranges(text: str, boundaries) -> Iterator[Tuple[int, int]]:
+    """
+    第五步：根据有序断点生成基础 chunk 的 (start, end)，跳过纯空白片段
+
+    参数:
+        text: 原始文本
+        boundaries: 按升序产出的断点（句末符号位置）
+    """
     current_start = 0
 
-    for boundary in sorted_boundaries:
+    for boundary in boundaries:
         # boundary 是句末符号的位置，切分点在 boundary + 1
         end_idx = boundary + 1
 
@@ -353,92 +698,195 @@ def split_text_to_chunks(text: str) -> List[Dict[str, Union[int, str]]]:
         while end_idx < len(text) and text[end_idx] == ' ':
             end_idx += 1
 
-        chunk_text = text[current_start:end_idx]
-        if chunk_text.strip():  # 只添加非空的 chunk
-            token_count = len(ENCODING.encode(chunk_text))
-            chunks.append({
-                "text": chunk_text,
-                "start": current_start,
-                "end": end_idx,
-                "token_count": token_count
-            })
+        if not text[current_start:end_idx].isspace():  # 只添加非空的 chunk
+            yield current_start, end_idx
 
         current_start = end_idx
 
     # 处理剩余部分
-    if current_start < len(text):
-        remaining = text[current_start:]
-        if remaining.strip():
-            token_count = len(ENCODING.encode(remaining))
-            chunks.append({
-                "text": remaining,
-                "start": current_start,
-                "end": len(text),
-                "token_count": token_count
-            })
-
-    # 第六步：后处理 - 将以公式符号开头的 chunk 合并回上一个 chunk
-    merged_chunks = []
+    if current_start < len(text) and not text[current_start:].isspace():
+        yield current_start, len(text)
+
+
+def _merge_small_chunk(text: str, pending: Optional[Dict[str, int]], chunk: Dict[str, int]):
+    """
+    第七步的单步合并：pending 为正在向下合并、token 数仍不足的 chunk
+
+    返回:
+        (可以输出的 chunk 或 None, 新的 pending)
+    """
+    if pending is None:
+        if chunk["token_count"] >= MIN_CHUNK_TOKENS:
+            return chunk, None
+        return None, chunk
+
+    merged = {
+        "start": pending["start"],
+        "end": chunk["end"],
+        "token_count": _joined_token_count(
+            text, pending["start"], pending["end"], pending["token_count"],
+            chunk["start"], chunk["end"], chunk["token_count"]
+        )
+    }
+    if merged["token_count"] >= MIN_CHUNK_TOKENS:
+        return merged, None
+    return None, merged
+
+
+def _iter_merged_chunks(text: str, chunks) -> Iterator[Dict[str, int]]:
+    """
+    合并公式开头的 chunk 与 token 过少的 chunk，逐个产出最终的 chunk（start/end/token_count）。
+    只保留常数个待定 chunk，批量与流式分句共用；合并时只在接缝处修正 token 数，不重新编码整段文本。
+
+    参数:
+        text: 原始文本
+        chunks: 按顺序产出的基础 chunk（start/end/token_count）
+    """
+    last = None     # 第六步：可能还会并入公式开头 chunk 的上一个 chunk
+    pending = None  # 第七步：token 数不足、继续向下合并的 chunk
+
     for chunk in chunks:
-        chunk_text = chunk["text"].lstrip()
-        if merged_chunks and re.match(r'^[\^\_\{\}\(\)\[\]\\]', chunk_text):
-            # 合并到上一个 chunk
-            prev = merged_chunks[-1]
-            merged_text = text[prev["start"]:chunk["end"]]
-            prev["text"] = merged_text
-            prev["end"] = chunk["end"]
-            prev["token_count"] = len(ENCODING.encode(merged_text))
-        else:
-            merged_chunks.append(chunk)
-
-    # 第七步：合并 token_count 过小的句子
-    final_chunks = []
-    i = 0
-    while i < len(merged_chunks):
-        current_chunk = merged_chunks[i]
-        current_token_count = current_chunk["token_count"]
-
-        # 如果当前句子的 token_count >= 20，直接保留
-        if current_token_count >= 20:
-            final_chunks.append(current_chunk)
-            i += 1
+        # 第六步：以公式符号开头的 chunk 合并回上一个 chunk
+        if last is not None and FORMULA_START_PATTERN.match(text, chunk["start"], chunk["end"]):
+            last = {
+                "start": last["start"],
+                "end": chunk["end"],
+                "token_count": _joined_token_count(
+                    text, last["start"], last["end"], last["token_count"],
+                    chunk["start"], chunk["end"], chunk["token_count"]
+                )
+            }
             continue
 
-        # 如果当前句子的 token_count < 20，需要向下合并
-        merged_text = current_chunk["text"]
-        merged_end = current_chunk["end"]
-        merged_token_count = current_token_count
-
-        # 继续合并后续句子，直到 token_count >= 20 或没有更多句子
-        j = i + 1
-        while j < len(merged_chunks) and merged_token_count < 20:
-            next_chunk = merged_chunks[j]
-            merged_text = text[current_chunk["start"]:next_chunk["end"]]
-            merged_end = next_chunk["end"]
-            merged_token_count = len(ENCODING.encode(merged_text))
-            j += 1
-
-        # 创建合并后的 chunk
-        final_chunk = {
-            "text": merged_text,
-            "start": current_chunk["start"],
-            "end": merged_end,
-            "token_count": merged_token_count
-        }
-        final_chunks.append(final_chunk)
-
-        # 更新索引，跳过已合并的句子
-        i = j
-
-    # 转换为最终输出格式
-    result = []
-    for idx, chunk in enumerate(final_chunks, 1):
-        result.append({
-            "id": idx,
-            "sentence": chunk["text"]
-        })
-
-    return result
+        # 第七步：上一个 chunk 已确定，合并 token_count 过小的句子
+        if last is not None:
+            ready, pending = _merge_small_chunk(text, pending, last)
+            if ready is not None:
+                yield ready
+        last = chunk
+
+    if last is not None:
+        ready, pending = _merge_small_chunk(text, pending, last)
+        if ready is not None:
+            yield ready
+    if pending is not None:
+        yield pending
+
+
+def split_texts_to_spans(texts: List[str]) -> List[List[Dict[str, int]]]:
+    """
+    批量分句，返回每个句子在原文中的字符区间与 token 数（不复制句子文本）。
+    所有文档的基础 chunk 通过一次 encode_batch 计算 token 数量，
+    之后的合并步骤只在接缝处做局部修正。
+
+    参数:
+        texts: 文本列表
+
+    返回:
+        与 texts 一一对应的列表，每项为 [{"id", "start", "end", "token_count"}, ...]
+    """
+    # 第一步 ~ 第五步：掩码、按换行分块、收集断点、生成基础 chunks
+    all_chunks = [
+        [{"start": start, "end": end} for start, end in _iter_chunk_ranges(text, collect_boundaries(text))]
+        if text else []
+        for text in texts
+    ]
+
+    # 所有基础 chunk 只编码一次（批量、多线程）
+    chunk_texts = [text[chunk["start"]:chunk["end"]] for text, chunks in zip(texts, all_chunks) for chunk in chunks]
+    token_counts = iter([len(tokens) for tokens in ENCODING.encode_batch(chunk_texts)])
+    for chunks in all_chunks:
+        for chunk in chunks:
+            chunk["token_count"] = next(token_counts)
+
+    # 第六步 ~ 第七步：合并公式开头的 chunk 与过短的 chunk
+    results = []
+    for text, chunks in zip(texts, all_chunks):
+        results.append([
+            {"id": idx, "start": chunk["start"], "end": chunk["end"], "token_count": chunk["token_count"]}
+            for idx, chunk in enumerate(_iter_merged_chunks(text, chunks), 1)
+        ])
+    return results
+
+
+def split_text_to_spans(text: str) -> List[Dict[str, int]]:
+    """单篇文本的 split_texts_to_spans，句子文本为 text[start:end]"""
+    if not text:
+        return []
+    return split_texts_to_spans([text])[0]
+
+
+def split_texts_to_chunks(texts: List[str]) -> List[List[Dict[str, Union[int, str]]]]:
+    """
+    批量分句：结果与逐篇调用 split_text_to_chunks 完全一致。
+
+    参数:
+        texts: 文本列表
+
+    返回:
+        与 texts 一一对应的分句结果列表
+    """
+    return [
+        [{"id": span["id"], "sentence": text[span["start"]:span["end"]]} for span in spans]
+        for text, spans in zip(texts, split_texts_to_spans(texts))
+    ]
+
+
+def split_text_to_chunks(text: str) -> List[Dict[str, Union[int, str]]]:
+    """
+    按照句子级别切分文本，并返回包含 text/start/end/token_count 的字典列表。
+    start 为起始字符索引，end 为结束字符索引（不含）。
+    token_count 为使用 tiktoken (cl100k_base) 编码计算的 token 数量。
+
+    核心逻辑：
+    1. 换行符是最高优先级的分割点
+    2. 在每个文本块内，保护数学表达式后进行断句
+    3. 返回的 text 是原始文本的切片，位置索引不变
+    4. 每个 chunk 包含使用 tiktoken 计算的 token 数量（每个基础 chunk 只编码一次）
+    5. 合并 token_count < 20 的小句子
+    """
+    if not text:
+        return []
+    return split_texts_to_chunks([text])[0]
+
+
+def iter_text_spans(text: str) -> Iterator[Dict[str, int]]:
+    """
+    流式分句：按换行分隔的文本块逐个产出句子区间 {"id", "start", "end", "token_count"}，
+    合并状态跨块传递，结果与 split_text_to_spans 完全一致。
+    中间数据只与最大的文本块相关，适合补充材料等超长文本。
+    """
+    if not text:
+        return
+
+    def counted_chunks():
+        batch = []
+        for start, end in _iter_chunk_ranges(text, iter_boundaries(text)):
+            batch.append((start, end))
+            if len(batch) >= STREAM_ENCODE_BATCH:
+                yield from _with_token_counts(text, batch)
+                batch = []
+        yield from _with_token_counts(text, batch)
+
+    for idx, chunk in enumerate(_iter_merged_chunks(text, counted_chunks()), 1):
+        yield {"id": idx, "start": chunk["start"], "end": chunk["end"], "token_count": chunk["token_count"]}
+
+
+def _with_token_counts(text: str, ranges: List[Tuple[int, int]]) -> List[Dict[str, int]]:
+    """批量编码一组基础 chunk，返回带 token_count 的 chunk 列表"""
+    if not ranges:
+        return []
+    encoded = ENCODING.encode_batch([text[start:end] for start, end in ranges])
+    return [
+        {"start": start, "end": end, "token_count": len(tokens)}
+        for (start, end), tokens in zip(ranges, encoded)
+    ]
+
+
+def iter_text_chunks(text: str) -> Iterator[Dict[str, Union[int, str]]]:
+    """流式版 split_text_to_chunks：逐个产出 {"id", "sentence"}，结果完全一致"""
+    for span in iter_text_spans(text):
+        yield {"id": span["id"], "sentence": text[span["start"]:span["end"]]}
 
 
 def main():
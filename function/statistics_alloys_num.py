@@ -2,24 +2,17 @@
 统计 result_merge 表中 text_result 和 table_result 字段的合金实体数量
 将统计结果写入 alloy_num 字段
 """
-import psycopg2
 import json
 from db import get_connection_params
+from storage import DatabaseError, connect
 from tqdm import tqdm
 
 def create_connection(db_config):
-    """创建PostgreSQL数据库连接"""
+    """创建数据库连接（PostgreSQL 或本地 SQLite，由 db.DB_BACKEND 决定）"""
     try:
-        conn = psycopg2.connect(
-            host=db_config.get('host'),
-            port=db_config.get('port'),
-            database=db_config.get('database'),
-            user=db_config.get('user'),
-            password=db_config.get('password'),
-            connect_timeout=30 
-        )
+        conn = connect(db_config)
         return conn
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库连接失败: {str(e)}")
         raise
 
@@ -134,7 +127,7 @@ def statistics_alloys():
         print(f"跳过: {skipped_count} 条记录（处理错误）")
         print("=" * 80)
         
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库错误: {str(e)}")
         import traceback
         traceback.print_exc()
@@ -1,23 +1,16 @@
 """
 统计 result_merge 表中 text_result 字段，检查 performance 全为 null 的合金记录
 """
-import psycopg2
 import json
 from db import get_connection_params
+from storage import DatabaseError, connect
 
 def create_connection(db_config):
-    """创建PostgreSQL数据库连接"""
+    """创建数据库连接（PostgreSQL 或本地 SQLite，由 db.DB_BACKEND 决定）"""
     try:
-        conn = psycopg2.connect(
-            host=db_config.get('host'),
-            port=db_config.get('port'),
-            database=db_config.get('database'),
-            user=db_config.get('user'),
-            password=db_config.get('password'),
-            connect_timeout=30
-        )
+        conn = connect(db_config)
         return conn
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库连接失败: {str(e)}")
         raise
 
@@ -169,7 +162,7 @@ def check_null_performance():
         print(f"performance 全为 null 的合金数: {null_performance_count}")
         print(f"占比: {(null_performance_count / total_alloys * 100) if total_alloys > 0 else 0:.2f}%")
         
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库错误: {str(e)}")
         
     except Exception as e:
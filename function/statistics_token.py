@@ -1,10 +1,10 @@
 """
 统计 result_merge 表中 match 字段的 token 数量
 """
-import psycopg2
 import tiktoken
 import json
 from db import get_connection_params
+from storage import DatabaseError, connect
 from collections import Counter
 
 # 初始化tiktoken编码器
@@ -12,18 +12,11 @@ ENCODING = tiktoken.get_encoding("cl100k_base")
 
 
 def create_connection(db_config):
-    """创建PostgreSQL数据库连接"""
+    """创建数据库连接（PostgreSQL 或本地 SQLite，由 db.DB_BACKEND 决定）"""
     try:
-        conn = psycopg2.connect(
-            host=db_config.get('host'),
-            port=db_config.get('port'),
-            database=db_config.get('database'),
-            user=db_config.get('user'),
-            password=db_config.get('password'),
-            connect_timeout=30
-        )
+        conn = connect(db_config)
         return conn
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库连接失败: {str(e)}")
         raise
 
@@ -144,7 +137,7 @@ def statistics_match_tokens():
                 perc = (count_in_range / valid_records * 100) if valid_records else 0
                 print(f"  {label:15}: {count_in_range:4} 条记录 ({perc:5.1f}%)")
         
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库错误: {str(e)}")
     except Exception as e:
         print(f"发生错误: {str(e)}")
@@ -0,0 +1,365 @@
+"""
+存储后端抽象：根据 db.py 中的 DB_BACKEND 选择 PostgreSQL 或本地 SQLite（JSON1）
+SQLite 后端用于单机运行/性能分析，无需访问共享数据库服务器
+
+用法：
+    HEA_DB_BACKEND=sqlite HEA_SQLITE_PATH=hea_local.db python write_sentence.py
+    python storage.py --init                    # 仅创建本地库表结构
+    python storage.py --load dump.json          # 导入 {表名: [行字典, ...]} 格式的数据
+"""
+import json
+import re
+import sqlite3
+import sys
+from db import get_connection_params
+from profiler import PROFILER, ProfiledConnection
+
+try:
+    import psycopg2
+    # 两种后端的数据库异常，脚本统一用 except DatabaseError 捕获
+    DatabaseError = (psycopg2.Error, sqlite3.Error)
+except ImportError:
+    DatabaseError = (sqlite3.Error,)
+
+# ========== SQLite 表结构（与流水线用到的 PostgreSQL 表保持一致） ==========
+# JSON 字段声明为 JSONB，读取时由转换器解析为 Python 对象（与 psycopg2 行为一致）
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ex_info (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    identifier VARCHAR(32),
+    filename TEXT,
+    title TEXT,
+    alloy_elements JSONB,
+    text TEXT,
+    sentence_list JSONB,
+    text_alloy_result JSONB,
+    alloy_info JSONB
+);
+CREATE INDEX IF NOT EXISTS idx_ex_info_identifier ON ex_info(identifier);
+
+CREATE TABLE IF NOT EXISTS sentence_index (
+    identifier VARCHAR(32) NOT NULL,
+    sentence_id INTEGER NOT NULL,
+    start_offset INTEGER,
+    end_offset INTEGER,
+    token_count INTEGER,
+    sentence TEXT,
+    PRIMARY KEY (identifier, sentence_id)
+);
+
+CREATE TABLE IF NOT EXISTS new_prompt (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    identifier VARCHAR(32) UNIQUE,
+    alloy_prompt TEXT
+);
+
+CREATE TABLE IF NOT EXISTS ex_info_text (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    identifier VARCHAR(32),
+    filename TEXT,
+    title TEXT,
+    alloy_elements JSONB,
+    text_alloy_result JSONB
+);
+CREATE INDEX IF NOT EXISTS idx_ex_info_text_identifier ON ex_info_text(identifier);
+
+CREATE TABLE IF NOT EXISTS performance_prompt_text (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    identifier VARCHAR(32),
+    performance_prompt_text TEXT,
+    result JSONB
+);
+CREATE INDEX IF NOT EXISTS idx_performance_prompt_text_identifier ON performance_prompt_text(identifier);
+
+CREATE TABLE IF NOT EXISTS table_figure_info (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    identifier VARCHAR(32),
+    table_info JSONB,
+    figure_info JSONB
+);
+CREATE INDEX IF NOT EXISTS idx_table_figure_info_identifier ON table_figure_info(identifier);
+
+CREATE TABLE IF NOT EXISTS new_table_info (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    identifier VARCHAR(32),
+    table_id VARCHAR(64),
+    table_info JSONB,
+    table_prompt TEXT,
+    table_result JSONB,
+    table_grid JSONB
+);
+CREATE INDEX IF NOT EXISTS idx_new_table_info_identifier ON new_table_info(identifier);
+CREATE INDEX IF NOT EXISTS idx_new_table_info_table_id ON new_table_info(table_id);
+
+CREATE TABLE IF NOT EXISTS result_merge (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    identifier VARCHAR(32),
+    text_result JSONB,
+    table_result JSONB,
+    buffer JSONB,
+    match JSONB,
+    text_table_result JSONB,
+    merge_result JSONB,
+    alloy_num INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_result_merge_identifier ON result_merge(identifier);
+
+CREATE TABLE IF NOT EXISTS alloy_performance (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    identifier VARCHAR(32) NOT NULL,
+    alloy_id TEXT NOT NULL,
+    alloy_type TEXT,
+    composition TEXT,
+    elements JSONB,
+    element_count INTEGER,
+    electrolyte TEXT,
+    electrolyte_key TEXT,
+    electrolyte_molar REAL,
+    ph REAL,
+    overpotential_10 REAL,
+    overpotential_50 REAL,
+    overpotential_100 REAL,
+    overpotential_500 REAL,
+    overpotential_1000 REAL,
+    tafel_slope REAL,
+    stability_hours REAL,
+    stability_cycles INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_alloy_performance_identifier ON alloy_performance(identifier);
+"""
+
+# ========== PostgreSQL -> SQLite 的 SQL 改写规则 ==========
+_INFO_TABLES_PATTERN = re.compile(
+    r"FROM\s+information_schema\.tables\s+WHERE\s+table_schema\s*=\s*'public'\s+AND\s+table_name\s*=",
+    re.IGNORECASE
+)
+_INFO_COLUMNS_PATTERN = re.compile(
+    r"FROM\s+information_schema\.columns\s+WHERE\s+table_schema\s*=\s*'public'\s+AND\s+table_name\s*=\s*'(\w+)'",
+    re.IGNORECASE
+)
+_PG_INDEXES_PATTERN = re.compile(
+    r"FROM\s+pg_indexes\s+WHERE\s+tablename\s*=\s*('\w+')\s+AND\s+indexname",
+    re.IGNORECASE
+)
+_SCHEMA_PREFIX_PATTERN = re.compile(r'\b(?:hea\.)?public\.(?=\w)')
+_JSONB_PARAM_PATTERN = re.compile(r'%s::jsonb?\b', re.IGNORECASE)
+_CAST_PATTERN = re.compile(r'::(?:jsonb|json|text)\b', re.IGNORECASE)
+_SERIAL_PATTERN = re.compile(r'\bSERIAL\s+PRIMARY\s+KEY\b', re.IGNORECASE)
+_ILIKE_PATTERN = re.compile(r'\bILIKE\b', re.IGNORECASE)
+
+_translate_cache = {}
+
+
+def translate_sql(query):
+    """
+    将流水线中使用的 PostgreSQL 方言 SQL 改写为 SQLite 可执行的 SQL
+
+    参数:
+        query: PostgreSQL SQL 语句（%s 占位符）
+
+    返回:
+        SQLite SQL 语句（? 占位符）
+    """
+    cached = _translate_cache.get(query)
+    if cached is not None:
+        return cached
+
+    sql = query
+    # 1. 元数据查询：information_schema / pg_indexes -> sqlite_master / pragma_table_info
+    sql = _INFO_TABLES_PATTERN.sub("FROM sqlite_master WHERE type = 'table' AND name =", sql)
+    if _INFO_COLUMNS_PATTERN.search(sql):
+        sql = _INFO_COLUMNS_PATTERN.sub(r"FROM pragma_table_info('\1') WHERE 1 = 1", sql)
+        sql = re.sub(r'\bcolumn_name\b', 'name', sql)
+        sql = re.sub(r'\bdata_type\b', 'type', sql)
+        sql = re.sub(r'\bordinal_position\b', 'cid', sql)
+    sql = _PG_INDEXES_PATTERN.sub(r"FROM sqlite_master WHERE type = 'index' AND tbl_name = \1 AND name", sql)
+
+    # 2. 去掉 schema 前缀，JSON 参数使用 JSON1 的 json() 校验并压缩
+    sql = _SCHEMA_PREFIX_PATTERN.sub('', sql)
+    sql = _JSONB_PARAM_PATTERN.sub('json(?)', sql)
+    sql = _CAST_PATTERN.sub('', sql)
+
+    # 3. DDL 与运算符差异
+    sql = _SERIAL_PATTERN.sub('INTEGER PRIMARY KEY AUTOINCREMENT', sql)
+    sql = _ILIKE_PATTERN.sub('LIKE', sql)
+
+    # 4. 占位符
+    sql = sql.replace('%s', '?')
+
+    _translate_cache[query] = sql
+    return sql
+
+
+def _decode_json(value):
+    """JSONB 列转换器：bytes -> Python 对象，无法解析时返回原始字符串"""
+    text = value.decode('utf-8')
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return text
+
+
+sqlite3.register_converter("JSONB", _decode_json)
+
+
+class SQLiteCursor:
+    """包装 sqlite3.Cursor，执行前把 PostgreSQL 方言改写为 SQLite"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, query, params=None):
+        self._cursor.execute(translate_sql(query), tuple(params or ()))
+        return self
+
+    def executemany(self, query, seq_of_params):
+        self._cursor.executemany(translate_sql(query), [tuple(p) for p in seq_of_params])
+        return self
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size=None):
+        if size is None:
+            return self._cursor.fetchmany()
+        return self._cursor.fetchmany(size)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """包装 sqlite3.Connection，提供与 psycopg2 连接一致的 cursor/commit/rollback/close 接口"""
+
+    backend = 'sqlite'
+
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SQLITE_SCHEMA)
+        self.closed = 0
+
+    def cursor(self, cursor_factory=None):
+        return SQLiteCursor(self._conn.cursor())
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        if not self.closed:
+            self._conn.close()
+            self.closed = 1
+
+
+def connect(db_config=None, connect_timeout=30):
+    """
+    根据配置创建数据库连接
+
+    参数:
+        db_config: 连接参数字典（来自 db.get_connection_params），backend 字段决定后端
+        connect_timeout: PostgreSQL 连接超时时间（秒）
+
+    返回:
+        psycopg2 连接或 SQLiteConnection（二者接口一致），性能分析模式下外包一层 ProfiledConnection
+    """
+    db_config = db_config or get_connection_params()
+
+    if db_config.get('backend') == 'sqlite':
+        conn = SQLiteConnection(db_config.get('sqlite_path'))
+    else:
+        conn = psycopg2.connect(
+            host=db_config.get('host'),
+            port=db_config.get('port'),
+            database=db_config.get('database'),
+            user=db_config.get('user'),
+            password=db_config.get('password'),
+            connect_timeout=connect_timeout
+        )
+
+    # 性能分析模式下，数据库耗时计入 db 类别
+    if PROFILER.enabled:
+        return ProfiledConnection(conn)
+    return conn
+
+
+def load_rows(conn, table_name, rows):
+    """
+    批量写入行数据（用于构造可复现的本地基准数据）
+
+    参数:
+        conn: 数据库连接
+        table_name: 表名
+        rows: 行字典列表，dict/list 类型的值按 JSON 写入
+
+    返回:
+        写入的行数
+    """
+    if not rows:
+        return 0
+
+    columns = list(rows[0].keys())
+    placeholders = ', '.join(['%s'] * len(columns))
+    query = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders})"
+
+    batch = []
+    for row in rows:
+        values = []
+        for column in columns:
+            value = row.get(column)
+            if isinstance(value, (dict, list)):
+                value = json.dumps(value, ensure_ascii=False)
+            values.append(value)
+        batch.append(tuple(values))
+
+    cursor = conn.cursor()
+    try:
+        cursor.executemany(query, batch)
+        conn.commit()
+    finally:
+        cursor.close()
+    return len(batch)
+
+
+def main():
+    """命令行入口：初始化本地库，或导入 JSON 数据"""
+    db_config = get_connection_params()
+    if db_config.get('backend') != 'sqlite':
+        db_config = dict(db_config, backend='sqlite')
+
+    conn = connect(db_config)
+    try:
+        args = sys.argv[1:]
+        if len(args) == 2 and args[0] == '--load':
+            with open(args[1], 'r', encoding='utf-8') as f:
+                dump = json.load(f)
+            for table_name, rows in dump.items():
+                count = load_rows(conn, table_name, rows)
+                print(f"✓ {table_name}: 导入 {count} 行")
+        elif args and args[0] != '--init':
+            print("用法: python storage.py [--init | --load dump.json]")
+            return
+        print(f"✓ 本地 SQLite 数据库已就绪: {db_config.get('sqlite_path')}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
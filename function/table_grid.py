@@ -0,0 +1,356 @@
+"""
+HTML 表格 -> 单元格网格：
+1. 解析 table_info.source_content 中的 HTML 表格，按 rowspan / colspan 展开为二维网格
+   （跨行/跨列单元格的文本复制到其覆盖的每个位置）
+2. 识别表头行（<thead> / 全部为 <th> 的行；否则取首行及其 rowspan 覆盖的行），
+   多层表头按列合并为表头路径，如 "Overpotential / 10 mA cm-2"
+3. 输出紧凑的 markdown 或 tsv 文本，代替 HTML 原文送入大模型，去掉标签、属性与实体的 token 开销
+4. 网格可序列化为 dict，写入 new_table_info.table_grid 供后续规则抽取复用
+
+用法：
+    python table_grid.py table.html          # 打印解析后的 markdown 与 token 对比
+"""
+import copy
+import re
+import sys
+from html.parser import HTMLParser
+from typing import List, Optional, Tuple
+
+# ========== 配置参数 ==========
+TABLE_FORMATS = ("markdown", "tsv")
+HEADER_PATH_SEPARATOR = " / "
+# 单个单元格展开的上限（防御异常的 rowspan / colspan 属性）
+MAX_SPAN = 1000
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+_CELL_TAGS = ("td", "th")
+_LINE_BREAK_TAGS = ("br", "p", "div", "li")
+
+
+def _parse_span(value) -> int:
+    """解析 rowspan / colspan 属性，非法值按 1 处理"""
+    try:
+        span = int(str(value).strip())
+    except (TypeError, ValueError):
+        return 1
+    return min(max(span, 1), MAX_SPAN)
+
+
+def _clean_text(text: str) -> str:
+    """合并空白字符"""
+    return _WHITESPACE_PATTERN.sub(" ", text).strip()
+
+
+class _TableHTMLParser(HTMLParser):
+    """
+    收集第一个顶层 <table> 的行与单元格
+    嵌套表格的内容并入外层单元格的文本；同时统计顶层表格数，并收集表格之外的文字（标题、脚注）
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows = []          # [(是否表头行, [(text, rowspan, colspan, is_th), ...]), ...]
+        self._depth = 0         # <table> 嵌套深度
+        self._done = False
+        self._section = None    # thead / tbody / tfoot
+        self._row = None
+        self._cell = None       # [文本片段列表, rowspan, colspan, is_th]
+        self.table_count = 0    # 顶层 <table> 个数
+        self.text_before = []   # 第一个表格之前的文字片段
+        self.text_after = []    # 第一个表格之后的文字片段
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "table":
+            if self._depth == 0:
+                self.table_count += 1
+            self._depth += 1
+            return
+        if self._done or self._depth == 0:
+            return
+        if self._depth > 1:
+            if self._cell is not None and (tag in _LINE_BREAK_TAGS or tag in _CELL_TAGS or tag == "tr"):
+                self._cell[0].append(" ")
+            return
+
+        if tag in ("thead", "tbody", "tfoot"):
+            self._section = tag
+        elif tag == "tr":
+            self._close_row()
+            self._row = []
+        elif tag in _CELL_TAGS:
+            self._close_cell()
+            if self._row is None:
+                self._row = []
+            attributes = dict(attrs)
+            self._cell = [[], _parse_span(attributes.get("rowspan")),
+                          _parse_span(attributes.get("colspan")), tag == "th"]
+        elif tag in _LINE_BREAK_TAGS and self._cell is not None:
+            self._cell[0].append(" ")
+
+    def handle_endtag(self, tag):
+        if tag == "table" and self._depth > 0:
+            self._depth -= 1
+            if self._depth == 0 and not self._done:
+                self._close_row()
+                self._done = True
+            return
+        if self._done or self._depth == 0:
+            return
+        if self._depth > 1:
+            return
+
+        if tag in _CELL_TAGS:
+            self._close_cell()
+        elif tag == "tr":
+            self._close_row()
+        elif tag in ("thead", "tbody", "tfoot"):
+            self._close_row()
+            self._section = None
+
+    def handle_startendtag(self, tag, attrs):
+        # <br/> 等自闭合标签
+        if tag in _LINE_BREAK_TAGS and self._cell is not None and not self._done:
+            self._cell[0].append(" ")
+
+    def handle_data(self, data):
+        if self._depth == 0:
+            (self.text_after if self._done else self.text_before).append(data)
+        elif self._cell is not None and not self._done:
+            self._cell[0].append(data)
+
+    def _close_cell(self):
+        if self._cell is None:
+            return
+        parts, rowspan, colspan, is_th = self._cell
+        self._row.append((_clean_text("".join(parts)), rowspan, colspan, is_th))
+        self._cell = None
+
+    def _close_row(self):
+        self._close_cell()
+        if self._row is None:
+            return
+        if self._row:
+            self.rows.append((self._section == "thead", self._row))
+        self._row = None
+
+    def close(self):
+        super().close()
+        self._close_row()
+
+
+class TableGrid:
+    """
+    展开后的表格网格
+
+    属性:
+        cells: 二维列表，cells[行][列] 为单元格文本（跨行/跨列单元格在其覆盖的每个位置重复）
+        header_rows: 表头占用的行数（位于网格顶部）
+    """
+
+    def __init__(self, cells: List[List[str]], header_rows: int = 0):
+        self.cells = cells
+        self.header_rows = min(max(header_rows, 0), len(cells))
+
+    @property
+    def num_columns(self) -> int:
+        return len(self.cells[0]) if self.cells else 0
+
+    def header_paths(self) -> List[str]:
+        """
+        每列的表头路径：自上而下合并各表头行的文本，
+        跨行单元格造成的连续重复只保留一次，空文本跳过
+        """
+        paths = []
+        for col in range(self.num_columns):
+            parts = []
+            for row in range(self.header_rows):
+                text = self.cells[row][col]
+                if text and (not parts or parts[-1] != text):
+                    parts.append(text)
+            paths.append(HEADER_PATH_SEPARATOR.join(parts))
+        return paths
+
+    def body_rows(self) -> List[List[str]]:
+        """表头之后的数据行（跳过全空行）"""
+        return [row for row in self.cells[self.header_rows:] if any(row)]
+
+    def to_markdown(self) -> str:
+        """markdown 表格：首行为表头路径（无表头时用 Column 1, Column 2, ... 占位）"""
+        headers = self.header_paths() if self.header_rows else []
+        if not headers:
+            headers = [f"Column {col + 1}" for col in range(self.num_columns)]
+
+        def render(row):
+            return "| " + " | ".join(text.replace("|", "\\|") for text in row) + " |"
+
+        lines = [render(headers), "|" + "---|" * len(headers)]
+        lines.extend(render(row) for row in self.body_rows())
+        return "\n".join(lines)
+
+    def to_tsv(self) -> str:
+        """tsv：首行为表头路径（无表头时省略），单元格中的制表符替换为空格"""
+        rows = ([self.header_paths()] if self.header_rows else []) + self.body_rows()
+        return "\n".join("\t".join(text.replace("\t", " ") for text in row) for row in rows)
+
+    def render(self, fmt: str = "markdown") -> str:
+        """按格式输出紧凑文本"""
+        if fmt == "tsv":
+            return self.to_tsv()
+        return self.to_markdown()
+
+    def to_dict(self) -> dict:
+        """序列化为可写入 JSONB 的字典"""
+        return {
+            "header_rows": self.header_rows,
+            "header_paths": self.header_paths(),
+            "cells": self.cells
+        }
+
+    @classmethod
+    def from_dict(cls, data) -> Optional["TableGrid"]:
+        """从 to_dict 的结果恢复，格式不正确时返回 None"""
+        if not isinstance(data, dict) or not isinstance(data.get("cells"), list):
+            return None
+        return cls(data["cells"], data.get("header_rows") or 0)
+
+
+def _expand_rows(rows) -> Tuple[List[List[str]], List[bool]]:
+    """
+    按 rowspan / colspan 把单元格放入二维网格
+
+    返回:
+        (cells, 每行是否为表头行)
+    """
+    grid = []            # 每行是 {列: 文本}
+    row_is_header = []
+    for row_index, (in_thead, row_cells) in enumerate(rows):
+        while len(grid) <= row_index:
+            grid.append({})
+            row_is_header.append(False)
+        occupied = grid[row_index]
+        row_is_header[row_index] = in_thead or all(is_th for _, _, _, is_th in row_cells)
+
+        col = 0
+        for text, rowspan, colspan, _ in row_cells:
+            while col in occupied:
+                col += 1
+            # rowspan 不超出表格末尾
+            rowspan = min(rowspan, len(rows) - row_index)
+            for r in range(row_index, row_index + rowspan):
+                while len(grid) <= r:
+                    grid.append({})
+                    row_is_header.append(False)
+                for c in range(col, col + colspan):
+                    grid[r].setdefault(c, text)
+            col += colspan
+
+    width = max((max(row) + 1 for row in grid if row), default=0)
+    cells = [[row.get(col, "") for col in range(width)] for row in grid]
+    return cells, row_is_header
+
+
+def _count_header_rows(rows, row_is_header) -> int:
+    """
+    表头行数：
+    1. 顶部连续的 <thead> / 全 <th> 行
+    2. 没有显式表头时取首行，若首行单元格带 rowspan，则表头延伸到其覆盖的行
+    """
+    explicit = 0
+    for is_header in row_is_header:
+        if not is_header:
+            break
+        explicit += 1
+    if explicit:
+        return explicit
+    if not rows:
+        return 0
+    return max(rowspan for _, rowspan, _, _ in rows[0][1])
+
+
+def _parse_table(html: str) -> Tuple[Optional[TableGrid], str, str]:
+    """
+    解析 HTML 中唯一的顶层 <table>
+
+    返回:
+        (网格, 表格之前的文字, 表格之后的文字)；没有表格、表格为空或有多个顶层表格时网格为 None
+    """
+    if not isinstance(html, str) or "<t" not in html.lower():
+        return None, "", ""
+    parser = _TableHTMLParser()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception:
+        return None, "", ""
+    # 多个顶层表格无法合并为一个网格，交由调用方保留原文
+    if not parser.rows or parser.table_count > 1:
+        return None, "", ""
+
+    cells, row_is_header = _expand_rows(parser.rows)
+    if not cells or not any(any(row) for row in cells):
+        return None, "", ""
+    grid = TableGrid(cells, _count_header_rows(parser.rows, row_is_header))
+    return grid, _clean_text("".join(parser.text_before)), _clean_text("".join(parser.text_after))
+
+
+def parse_html_table(html: str) -> Optional[TableGrid]:
+    """
+    解析 HTML 中的 <table>
+
+    参数:
+        html: HTML 文本（MinerU 等工具输出的 source_content）
+
+    返回:
+        TableGrid；没有表格、表格为空或有多个顶层表格时返回 None
+    """
+    return _parse_table(html)[0]
+
+
+def compact_table_info(table_info: dict, fmt: str = "markdown") -> Tuple[dict, Optional[TableGrid]]:
+    """
+    将 table_info 的 source_content 替换为紧凑文本，表格之外的文字（标题、脚注）保留在表格前后
+
+    参数:
+        table_info: new_table_info.table_info（含 location / source_content / reference_text_list）
+        fmt: markdown / tsv；其他取值（如 html）保留原文
+
+    返回:
+        (新的 table_info, 网格)；无法解析或有多个顶层表格时返回 (原 table_info, None)
+    """
+    if fmt not in TABLE_FORMATS or not isinstance(table_info, dict):
+        return table_info, None
+    grid, text_before, text_after = _parse_table(table_info.get("source_content"))
+    if grid is None:
+        return table_info, None
+
+    compacted = copy.copy(table_info)
+    parts = [text_before, grid.render(fmt), text_after]
+    compacted["source_content"] = "\n\n".join(part for part in parts if part)
+    return compacted, grid
+
+
+def main():
+    """命令行入口：解析 HTML 文件并输出紧凑格式与 token 对比"""
+    if len(sys.argv) < 2:
+        print("用法: python table_grid.py table.html [markdown|tsv]")
+        return
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        html = f.read()
+    fmt = sys.argv[2] if len(sys.argv) > 2 else "markdown"
+
+    grid = parse_html_table(html)
+    if grid is None:
+        print("✗ 未找到 HTML 表格（或包含多个顶层表格）")
+        return
+    compact = grid.render(fmt)
+    print(compact)
+
+    from split_tool import ENCODING
+    raw_tokens = len(ENCODING.encode(html))
+    compact_tokens = len(ENCODING.encode(compact))
+    print(f"\n✓ {len(grid.cells)} 行 x {grid.num_columns} 列（表头 {grid.header_rows} 行）")
+    print(f"  token: HTML {raw_tokens} -> {fmt} {compact_tokens}（节省 {raw_tokens - compact_tokens}）")
+
+
+if __name__ == "__main__":
+    main()
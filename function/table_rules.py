@@ -0,0 +1,419 @@
+"""
+基于规则的表格数值抽取（不调用大模型）：
+1. 在 table_grid 解析出的网格上找到合金列：单元格按 id / 别称绑定到 core_alloys
+2. 按表头同义词把数值列映射到 overpotential（含电流密度）/ tafel_slope / supplementary_performance
+3. 从表格标题中识别电解液（成分、浓度、pH）
+4. 直接生成与 table prompt 输出 Schema 一致的 table_result；
+   不能确定的表格（转置表、文本列、无法绑定的行、同一合金多行等）返回原因，交给大模型处理
+
+用法：
+    python table_rules.py           # 统计 new_table_info 中可由规则处理的表格比例及回退原因
+"""
+import json
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from table_grid import TableGrid, parse_html_table
+from units import POTENTIAL, TAFEL_SLOPE, parse_quantity
+
+# ========== 配置参数 ==========
+# 合金列至少有这么多比例的数据行能绑定到 core_alloys
+MIN_BOUND_RATIO = 0.5
+# 未绑定但可以忽略的参比样（表格中常见的商业催化剂 / 基底对照）
+REFERENCE_SAMPLE_PATTERN = re.compile(
+    r"^(?:\d+\s*(?:wt)?\s*%\s*)?(?:pt\s*/\s*c|ir\s*o\s*2|ru\s*o\s*2|pt|ir/c|ru/c|nf|ni\s*foam|"
+    r"bare\s*\w*|blank|cf|cc|carbon\s*(?:cloth|paper))(?:\s*\(.*\))?$",
+    re.IGNORECASE
+)
+EMPTY_CELL_VALUES = {"", "-", "--", "—", "–", "/", "n/a", "na", "n.a.", "none", "null", "nd", "n.d.", "×"}
+
+# 数值单元格：可带正负号、± 误差、近似符号与百分号
+NUMERIC_CELL_PATTERN = re.compile(
+    r"^[~≈<>≤≥]?\s*[-+−–]?\d+(?:[.,]\d+)?(?:\s*(?:±|\+/-|\+-)\s*\d+(?:\.\d+)?)?\s*%?$"
+)
+# 表头中的单位：最后一对括号 / 方括号中的内容
+HEADER_UNIT_PATTERN = re.compile(r"[(\[]([^()\[\]]*)[)\]]\s*$")
+
+OVERPOTENTIAL_PATTERN = re.compile(r"overpotential|η|\beta\b|\bop\b", re.IGNORECASE)
+TAFEL_PATTERN = re.compile(r"tafel", re.IGNORECASE)
+# 电流密度：η10、η@10 mA cm-2、η_{10}、Overpotential / 100 mA cm-2
+CURRENT_DENSITY_PATTERN = re.compile(
+    r"(?:η|\beta|overpotential)\s*(?:[@_]|at)?\s*\{?\s*[-−]?(\d+(?:\.\d+)?)\s*\}?"
+    r"|(\d+(?:\.\d+)?)\s*mA\s*cm",
+    re.IGNORECASE
+)
+# 电流密度列（如 "j@η100 (mA cm-2)"、"Current density at 300 mV"）：表头中也常出现 η，但数值不是过电位
+CURRENT_DENSITY_HEADER_PATTERN = re.compile(r"^\s*(?:j\b|j\s*[@_(]|current\s+density)", re.IGNORECASE)
+# 单位本身是电流密度（括号中没有前导数值，区别于 "η (10 mA cm-2)" 这样的测试条件）
+CURRENT_DENSITY_UNIT_PATTERN = re.compile(r"^\s*[mµμ]?A\s*(?:/|\s|·)?\s*cm", re.IGNORECASE)
+# 不能按“数值及单位”简单处理、需要大模型理解的列
+UNSUPPORTED_HEADER_PATTERN = re.compile(
+    r"stabilit|durabilit|retention|electrolyte|substrate|method|synthesis|condition|ref\b|reference",
+    re.IGNORECASE
+)
+
+ELECTROLYTE_PATTERN = re.compile(
+    r"(\d+(?:\.\d+)?)\s*M\s+(KOH|NaOH|LiOH|H2SO4|H₂SO₄|HClO4|HCl|PBS|KHCO3|Na2SO4)",
+    re.IGNORECASE
+)
+PH_PATTERN = re.compile(r"pH\s*[=≈~]?\s*(\d+(?:\.\d+)?)", re.IGNORECASE)
+_LATEX_PATTERN = re.compile(r"\\(?:mathrm|rm|mathbf|text|mathsf)\b|[${}_^\\]")
+_SEPARATOR_PATTERN = re.compile(r"[-–—·~\s]")
+
+DEFAULT_OVERPOTENTIAL_UNIT = "mV"
+DEFAULT_TAFEL_UNIT = "mV dec^-1"
+
+
+def label_key(text) -> str:
+    """行标题与合金 id / 别称比较用的键：忽略大小写、空白、LaTeX 记号与连字符"""
+    if text is None:
+        return ""
+    text = _LATEX_PATTERN.sub("", str(text))
+    return _SEPARATOR_PATTERN.sub("", text.lower())
+
+
+def build_alias_map(core_alloys: List[dict]) -> Dict[str, str]:
+    """
+    {label_key: alloy_id}；同一个键对应多个合金时视为歧义，不参与绑定
+    """
+    alias_map = {}
+    ambiguous = set()
+    for alloy in core_alloys or []:
+        if not isinstance(alloy, dict) or not alloy.get("id"):
+            continue
+        for name in [alloy.get("id")] + list(alloy.get("aliases") or []):
+            key = label_key(name)
+            if not key:
+                continue
+            if key in alias_map and alias_map[key] != alloy["id"]:
+                ambiguous.add(key)
+            alias_map.setdefault(key, alloy["id"])
+    for key in ambiguous:
+        del alias_map[key]
+    return alias_map
+
+
+def is_empty_cell(text) -> bool:
+    """占位符单元格（空、横线、N/A 等）"""
+    return str(text).strip().lower() in EMPTY_CELL_VALUES
+
+
+def is_numeric_cell(text) -> bool:
+    """单元格是否为数值"""
+    return bool(NUMERIC_CELL_PATTERN.match(str(text).strip()))
+
+
+def split_header_unit(header: str) -> Tuple[str, Optional[str]]:
+    """
+    拆分单级表头的名称与单位，如 "Tafel slope (mV dec-1)" -> ("Tafel slope", "mV dec-1")
+    """
+    header = header.strip()
+    match = HEADER_UNIT_PATTERN.search(header)
+    if not match:
+        return header, None
+    unit = match.group(1).strip()
+    name = header[:match.start()].strip()
+    return (name or header), (unit or None)
+
+
+def _header_unit(header_path: str) -> Optional[str]:
+    """表头路径中任意一级的单位（自下而上查找）"""
+    for part in reversed(header_path.split(" / ")):
+        _, unit = split_header_unit(part)
+        if unit:
+            return unit
+    return None
+
+
+def _value_unit(header_path: str, kind: str, default: str) -> str:
+    """
+    数值列的单位：表头单位能被 units 按 kind 解析时使用，否则取默认单位
+    如 "η (10 mA cm-2)" 括号中是测试条件而不是单位，返回 default
+    """
+    unit = _header_unit(header_path)
+    if unit and parse_quantity("1", unit, kind) is not None:
+        return unit
+    return default
+
+
+def classify_column(header_path: str) -> Tuple[str, Optional[str]]:
+    """
+    按表头同义词判断列的类型
+    电流密度列（表头以 j / current density 开头，或单位为 mA cm^-2 等）即使含 η 也不作为过电位，交给大模型
+
+    返回:
+        (类型, 电流密度)：类型为 overpotential / tafel_slope / supplementary / unsupported
+    """
+    unit = _header_unit(header_path)
+    if (any(CURRENT_DENSITY_HEADER_PATTERN.match(part) for part in header_path.split(" / "))
+            or (unit and CURRENT_DENSITY_UNIT_PATTERN.match(unit))):
+        return "unsupported", None
+    if TAFEL_PATTERN.search(header_path):
+        return "tafel_slope", None
+    if OVERPOTENTIAL_PATTERN.search(header_path):
+        match = CURRENT_DENSITY_PATTERN.search(header_path)
+        if match:
+            density = match.group(1) or match.group(2)
+            return "overpotential", f"{density} mA cm^-2"
+        return "unsupported", None
+    if UNSUPPORTED_HEADER_PATTERN.search(header_path):
+        return "unsupported", None
+    return "supplementary", None
+
+
+def parse_electrolyte(*texts) -> dict:
+    """从表格标题 / 表头中识别电解液成分、浓度与 pH（无法识别的字段为 None）"""
+    electrolyte = {
+        "electrolyte_composition": None,
+        "concentration_molar": None,
+        "ph_value": None
+    }
+    for text in texts:
+        if not text:
+            continue
+        if electrolyte["electrolyte_composition"] is None:
+            match = ELECTROLYTE_PATTERN.search(text)
+            if match:
+                electrolyte["concentration_molar"] = f"{match.group(1)} M"
+                electrolyte["electrolyte_composition"] = match.group(2)
+        if electrolyte["ph_value"] is None:
+            match = PH_PATTERN.search(text)
+            if match:
+                electrolyte["ph_value"] = match.group(1)
+    return electrolyte
+
+
+def empty_extraction_result(alloy_id: str, electrolyte: dict) -> dict:
+    """与 table prompt 输出 Schema 一致的空结果"""
+    return {
+        "alloy_id": alloy_id,
+        "experimental_conditions": {
+            "electrolyte": dict(electrolyte),
+            "test_setup": {"substrate": None, "ir_compensation": None, "scan_rate": None},
+            "synthesis_method": {"method": None, "key_parameters": None},
+            "other_environmental_params": []
+        },
+        "performance": {
+            "overpotential": [],
+            "tafel_slope": {"value": None, "unit": None},
+            "stability": {
+                "test_method": None,
+                "duration_hours": None,
+                "cycle_count": None,
+                "performance_retention": None,
+                "degradation_details": None
+            },
+            "supplementary_performance": []
+        }
+    }
+
+
+def _find_alloy_column(grid: TableGrid, alias_map: Dict[str, str]) -> Tuple[Optional[int], int]:
+    """能绑定到 core_alloys 的单元格最多的列及其绑定数"""
+    body = grid.body_rows()
+    best_col, best_count = None, 0
+    for col in range(grid.num_columns):
+        count = sum(1 for row in body if label_key(row[col]) in alias_map)
+        if count > best_count:
+            best_col, best_count = col, count
+    return best_col, best_count
+
+
+def extract_table_result(grid: Optional[TableGrid], core_alloys: List[dict],
+                         location: Optional[str] = None) -> Tuple[Optional[dict], str]:
+    """
+    规则抽取一个表格
+
+    参数:
+        grid: 表格网格
+        core_alloys: 合金名册
+        location: 表格标题
+
+    返回:
+        (table_result, 原因)：能确定时返回 ({"extraction_results": [...]}, "ok")，
+        否则返回 (None, 回退原因)
+    """
+    if grid is None or not grid.cells:
+        return None, "no_grid"
+    if grid.header_rows == 0:
+        return None, "no_header"
+    alias_map = build_alias_map(core_alloys)
+    if not alias_map:
+        return None, "no_core_alloys"
+
+    body = grid.body_rows()
+    if not body:
+        return None, "no_rows"
+
+    # 1. 合金列：大部分数据行可绑定到名册，其余行只能是参比样
+    alloy_col, bound_count = _find_alloy_column(grid, alias_map)
+    if alloy_col is None:
+        return None, "no_alloy_column"
+    if bound_count < len(body) * MIN_BOUND_RATIO:
+        return None, "low_binding"
+
+    bound_rows = []
+    seen_alloys = set()
+    for row in body:
+        alloy_id = alias_map.get(label_key(row[alloy_col]))
+        if alloy_id is None:
+            if REFERENCE_SAMPLE_PATTERN.match(row[alloy_col].strip()) or is_empty_cell(row[alloy_col]):
+                continue
+            return None, "unbound_row"
+        if alloy_id in seen_alloys:
+            return None, "duplicate_alloy_row"
+        seen_alloys.add(alloy_id)
+        bound_rows.append((alloy_id, row))
+
+    # 2. 其余列按表头分类；列中所有非空单元格必须是数值
+    header_paths = grid.header_paths()
+    columns = []
+    for col in range(grid.num_columns):
+        if col == alloy_col:
+            continue
+        values = [row[col] for _, row in bound_rows if not is_empty_cell(row[col])]
+        if not values:
+            continue
+        header = header_paths[col]
+        if not header:
+            return None, "missing_header"
+        if not all(is_numeric_cell(value) for value in values):
+            return None, "text_column"
+        kind, current_density = classify_column(header)
+        if kind == "unsupported":
+            return None, "unsupported_column"
+        columns.append((col, kind, header, current_density))
+
+    if not columns:
+        return None, "no_value_columns"
+    if sum(1 for _, kind, _, _ in columns if kind == "tafel_slope") > 1:
+        return None, "multiple_tafel_columns"
+
+    # 3. 生成结果
+    electrolyte = parse_electrolyte(location, *header_paths)
+    results = []
+    for alloy_id, row in bound_rows:
+        result = empty_extraction_result(alloy_id, electrolyte)
+        performance = result["performance"]
+        for col, kind, header, current_density in columns:
+            value = row[col].strip()
+            if is_empty_cell(value):
+                continue
+            if kind == "overpotential":
+                performance["overpotential"].append({
+                    "value": value,
+                    "unit": _value_unit(header, POTENTIAL, DEFAULT_OVERPOTENTIAL_UNIT),
+                    "current_density": current_density
+                })
+            elif kind == "tafel_slope":
+                performance["tafel_slope"] = {"value": value,
+                                              "unit": _value_unit(header, TAFEL_SLOPE, DEFAULT_TAFEL_UNIT)}
+            else:
+                unit = _header_unit(header)
+                name = " / ".join(split_header_unit(part)[0] for part in header.split(" / "))
+                performance["supplementary_performance"].append({
+                    "key": name,
+                    "value": f"{value} {unit}" if unit else value
+                })
+        results.append(result)
+    return {"extraction_results": results}, "ok"
+
+
+def _parse_json(value):
+    """JSONB 字段：dict/list 原样返回，字符串尝试解析"""
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except json.JSONDecodeError:
+            return None
+    return value
+
+
+def core_alloys_from_result(text_alloy_result) -> List[dict]:
+    """从 ex_info.text_alloy_result 中取出 core_alloys 列表"""
+    data = _parse_json(text_alloy_result)
+    if isinstance(data, dict):
+        data = data.get("core_alloys")
+    return data if isinstance(data, list) else []
+
+
+def grid_for_table(table_info, table_grid=None) -> Optional[TableGrid]:
+    """优先使用 write_table_prompt 写入的 table_grid，否则现场解析 table_info.source_content"""
+    grid = TableGrid.from_dict(_parse_json(table_grid))
+    if grid is not None:
+        return grid
+    table_info = _parse_json(table_info)
+    if isinstance(table_info, dict):
+        return parse_html_table(table_info.get("source_content"))
+    return None
+
+
+def extract_from_record(table_info, table_grid, text_alloy_result) -> Tuple[Optional[dict], str]:
+    """
+    对 new_table_info 的一行做规则抽取
+
+    返回:
+        (table_result, 原因)，含义同 extract_table_result
+    """
+    table_info_data = _parse_json(table_info)
+    location = table_info_data.get("location") if isinstance(table_info_data, dict) else None
+    return extract_table_result(
+        grid_for_table(table_info_data, table_grid),
+        core_alloys_from_result(text_alloy_result),
+        location
+    )
+
+
+def has_table_grid_column(cursor) -> bool:
+    """new_table_info 是否已有 table_grid 字段（由 write_table_prompt 创建）"""
+    cursor.execute("""
+        SELECT column_name 
+        FROM information_schema.columns 
+        WHERE table_schema = 'public' 
+        AND table_name = 'new_table_info' 
+        AND column_name = 'table_grid'
+    """)
+    return cursor.fetchone() is not None
+
+
+def format_coverage(reasons: Counter) -> str:
+    """覆盖率报告：规则处理的比例及各回退原因的数量"""
+    total = sum(reasons.values())
+    handled = reasons.get("ok", 0)
+    ratio = handled / total * 100 if total else 0.0
+    lines = [f"规则抽取覆盖: {handled}/{total} 个表格（{ratio:.1f}%）"]
+    for reason, count in reasons.most_common():
+        if reason != "ok":
+            lines.append(f"  回退大模型 [{reason}]: {count}")
+    return "\n".join(lines)
+
+
+def main():
+    """统计 new_table_info 中可由规则处理的表格比例"""
+    from db import get_connection_params
+    from storage import connect
+
+    conn = connect(get_connection_params())
+    cursor = conn.cursor()
+    try:
+        grid_column = "nti.table_grid" if has_table_grid_column(cursor) else "NULL"
+        cursor.execute(f"""
+            SELECT nti.table_info, {grid_column},
+                (SELECT ei.text_alloy_result FROM ex_info ei
+                 WHERE ei.identifier = nti.identifier AND ei.text_alloy_result IS NOT NULL
+                 LIMIT 1)
+            FROM new_table_info nti
+            WHERE nti.table_info IS NOT NULL
+        """)
+        reasons = Counter()
+        for table_info, table_grid, text_alloy_result in cursor.fetchall():
+            _, reason = extract_from_record(table_info, table_grid, text_alloy_result)
+            reasons[reason] += 1
+        print(format_coverage(reasons))
+    finally:
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
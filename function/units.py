@@ -0,0 +1,369 @@
+"""
+性能数值与单位归一化：把 merge_result 中自由文本形式的数值（"28.04" + "mV"、"10 mA cm^-2"、
+"10 mA/cm2"、"-10 mA cm−2"、"50 h" / "1000 cycles" 等）转换为带规范单位的数值
+
+规范单位：
+    电位 / 过电位        mV（取绝对值）
+    电流密度             mA cm^-2（取绝对值，阴极电流的负号不影响比较）
+    Tafel 斜率           mV dec^-1
+    时长                 h
+    循环数               cycles
+    浓度                 M（mol/L）
+    保持率               %
+
+相同的 (数值文本, 单位文本) 只解析一次（LRU 缓存），normalize_extraction_results 批量处理整篇论文，
+输出供 alloy_performance 扁平表与统计分析直接使用
+
+用法：
+    python units.py         # 统计 result_merge 中各类数值的解析覆盖率
+"""
+import json
+import re
+from collections import namedtuple
+from functools import lru_cache
+from typing import Dict, List, Optional
+from tqdm import tqdm
+from db import get_connection_params
+from storage import DatabaseError, connect
+
+Quantity = namedtuple("Quantity", ["value", "unit"])
+
+# ========== 配置参数 ==========
+PARSE_CACHE_SIZE = 65536
+FETCH_SIZE = 200
+
+POTENTIAL = "mV"
+CURRENT_DENSITY = "mA cm^-2"
+TAFEL_SLOPE = "mV dec^-1"
+DURATION = "h"
+CYCLES = "cycles"
+CONCENTRATION = "M"
+PERCENT = "%"
+
+# 各物理量：规范单位、归一化后的单位写法 -> 换算系数、是否取绝对值
+UNIT_TABLES = {
+    POTENTIAL: ({"mv": 1.0, "v": 1000.0, "µv": 0.001}, True),
+    CURRENT_DENSITY: ({"macm^-2": 1.0, "acm^-2": 1000.0, "µacm^-2": 0.001}, True),
+    TAFEL_SLOPE: ({"mvdec^-1": 1.0, "vdec^-1": 1000.0, "mv": 1.0, "v": 1000.0}, False),
+    DURATION: ({"h": 1.0, "hr": 1.0, "hrs": 1.0, "hour": 1.0, "hours": 1.0,
+                "min": 1 / 60, "mins": 1 / 60, "minute": 1 / 60, "minutes": 1 / 60,
+                "s": 1 / 3600, "sec": 1 / 3600, "second": 1 / 3600, "seconds": 1 / 3600,
+                "d": 24.0, "day": 24.0, "days": 24.0}, False),
+    CYCLES: ({"cycle": 1.0, "cycles": 1.0, "cv": 1.0, "cvs": 1.0, "k": 1000.0, "kcycles": 1000.0}, False),
+    CONCENTRATION: ({"m": 1.0, "mol/l": 1.0, "moll^-1": 1.0, "moldm^-3": 1.0,
+                     "mm": 0.001, "mmol/l": 0.001, "mmoll^-1": 0.001}, False),
+    PERCENT: ({"%": 1.0, "percent": 1.0}, False),
+}
+
+STANDARD_CURRENT_DENSITIES = (10, 50, 100, 500, 1000)   # mA cm^-2
+
+_CHAR_TRANSLATION = str.maketrans({
+    "−": "-", "–": "-", "—": "-", "‐": "-",
+    "⁻": "^-", "¹": "1", "²": "2", "³": "3",
+    "₀": "0", "₁": "1", "₂": "2", "₃": "3", "₄": "4", "₅": "5", "₆": "6", "₇": "7", "₈": "8", "₉": "9",
+    "μ": "µ", "·": " ", "⋅": " ", "×": "x",
+})
+_NUMBER_PATTERN = re.compile(r"[-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?")
+# 面积 / 体积 / 数量级的各种写法统一为负指数：/cm2、cm-2、cm^{-2}、per cm^2 -> cm^-2
+_AREA_PATTERN = re.compile(r"(?:/|per\s*)(cm|dec|l|dm|s)\^?\{?(\d?)\}?|(cm|dec|l|dm|s)\^?\{?-(\d)\}?")
+_POWER_PATTERN = re.compile(r"\s*[x*]\s*10\^?\{?([-+]?\d+)\}?")
+
+
+def _normalize_unit(text: str) -> str:
+    """单位文本归一化：小写、去空白，"/cm2" "cm-2" "cm^{-2}" 统一为 "cm^-2" """
+    text = text.translate(_CHAR_TRANSLATION).lower()
+    text = text.replace("$", "").replace("\\mu", "µ").replace("{", "").replace("}", "")
+
+    def replace(match):
+        base = match.group(1) or match.group(3)
+        power = match.group(2) or match.group(4) or "1"
+        # mol/L 保留常见写法，其余统一为负指数
+        if base == "l" and match.group(1):
+            return "/l"
+        return f"{base}^-{power}"
+
+    text = _AREA_PATTERN.sub(replace, text)
+    return re.sub(r"\s+", "", text)
+
+
+def _split_value(text: str):
+    """把 "~ 28.04 mV" 拆成 (28.04, "mV")；处理 "1.2 × 10^3" 形式的科学计数"""
+    text = text.translate(_CHAR_TRANSLATION).replace(",", "")
+    match = _NUMBER_PATTERN.search(text)
+    if not match:
+        return None, ""
+    number = float(match.group(0))
+    rest = text[match.end():]
+    power = _POWER_PATTERN.match(rest)
+    if power:
+        number *= 10 ** int(power.group(1))
+        rest = rest[power.end():]
+    # 区间 "10-20 mV" / "10~20 mV" 取第一个数值，跳过第二个数
+    rest = re.sub(r"^\s*(?:-|~|to)\s*\d+(?:\.\d+)?", "", rest)
+    return number, rest.strip()
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_cached(kind: str, value_text: str, unit_text: str) -> Optional[Quantity]:
+    """解析并换算到 kind 对应的规范单位（结果按参数缓存）"""
+    number, inline_unit = _split_value(value_text)
+    if number is None:
+        return None
+    factors, absolute = UNIT_TABLES[kind]
+    unit = _normalize_unit(unit_text or inline_unit)
+    if unit:
+        factor = factors.get(unit)
+        if factor is None:
+            # 单位后面带有说明文字（如 "mV vs. RHE"）时按最长前缀匹配
+            candidates = [key for key in factors if unit.startswith(key)]
+            if not candidates:
+                return None
+            factor = factors[max(candidates, key=len)]
+    else:
+        factor = 1.0
+    value = number * factor
+    return Quantity(abs(value) if absolute else value, kind)
+
+
+def parse_quantity(value, unit=None, kind: str = POTENTIAL) -> Optional[Quantity]:
+    """
+    解析单个数值并换算为规范单位
+
+    参数:
+        value: 数值或包含单位的文本，如 28.04 / "28.04" / "10 mA/cm2"
+        unit: 单独给出的单位文本（为空时使用 value 中的单位，再没有时视为规范单位）
+        kind: 物理量，即规范单位（POTENTIAL / CURRENT_DENSITY / TAFEL_SLOPE / DURATION / CYCLES / CONCENTRATION / PERCENT）
+
+    返回:
+        Quantity(value, unit)；无法解析或单位不匹配时返回 None
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        value = repr(float(value))
+    elif not isinstance(value, str):
+        return None
+    unit = unit if isinstance(unit, str) else ""
+    return _parse_cached(kind, value.strip(), unit.strip())
+
+
+def _value(value, unit=None, kind: str = POTENTIAL) -> Optional[float]:
+    quantity = parse_quantity(value, unit, kind)
+    return quantity.value if quantity else None
+
+
+def parse_potential(value, unit=None) -> Optional[float]:
+    """电位 / 过电位 -> mV（绝对值）"""
+    return _value(value, unit, POTENTIAL)
+
+
+def parse_current_density(value, unit=None) -> Optional[float]:
+    """电流密度 -> mA cm^-2（绝对值），如 "-10 mA cm−2" -> 10.0，"1 A cm-2" -> 1000.0"""
+    return _value(value, unit, CURRENT_DENSITY)
+
+
+def parse_tafel_slope(value, unit=None) -> Optional[float]:
+    """Tafel 斜率 -> mV dec^-1"""
+    return _value(value, unit, TAFEL_SLOPE)
+
+
+def parse_concentration(value, unit=None) -> Optional[float]:
+    """浓度 -> mol/L，如 "0.5 M" / "100 mM" / "1 mol L-1" """
+    return _value(value, unit, CONCENTRATION)
+
+
+def parse_ph(value) -> Optional[float]:
+    """pH（无单位，取第一个数值），如 "14" / "pH = 13.6" """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+    number, _ = _split_value(re.sub(r"(?i)ph\s*=?", "", value))
+    return number
+
+
+def parse_stability(stability) -> Dict[str, Optional[float]]:
+    """
+    稳定性测试时长与循环数：duration_hours 中写的是循环数、或 cycle_count 中写的是时长时按单位归类
+
+    参数:
+        stability: performance.stability 字典
+
+    返回:
+        {"hours": 时长（h）, "cycles": 循环数, "retention": 保持率（%）}
+    """
+    hours = cycles = None
+    if isinstance(stability, dict):
+        for field, default_kind in (("duration_hours", DURATION), ("cycle_count", CYCLES)):
+            raw = stability.get(field)
+            if raw is None:
+                continue
+            text = str(raw).lower()
+            if "cycle" in text or "cv" in text:
+                kind = CYCLES
+            elif re.search(r"\d\s*(h|hrs?|hours?|mins?|minutes?|s|secs?|seconds?|d|days?)\b", text):
+                kind = DURATION
+            else:
+                kind = default_kind
+            value = _value(raw, None, kind)
+            if kind == DURATION and hours is None:
+                hours = value
+            elif kind == CYCLES and cycles is None:
+                cycles = value
+        retention = _value(stability.get("performance_retention"), None, PERCENT)
+    else:
+        retention = None
+    return {
+        "hours": hours,
+        "cycles": int(cycles) if cycles is not None else None,
+        "retention": retention
+    }
+
+
+def normalize_result(result: dict) -> Dict[str, object]:
+    """
+    把 extraction_results 中的一项转换为规范数值记录
+
+    参数:
+        result: {alloy_id, experimental_conditions, performance}
+
+    返回:
+        {
+            "alloy_id", "electrolyte", "electrolyte_molar", "ph",
+            "overpotentials": [(电流密度 mA cm^-2, 过电位 mV), ...]（按电流密度升序，缺任一项的条目跳过）,
+            "overpotential_at": {标准电流密度: 过电位 mV}（STANDARD_CURRENT_DENSITIES 中命中的，同一电流密度取第一个）,
+            "tafel_slope", "stability_hours", "stability_cycles", "retention"
+        }
+    """
+    conditions = result.get("experimental_conditions") or {}
+    electrolyte = conditions.get("electrolyte") if isinstance(conditions, dict) else None
+    electrolyte = electrolyte if isinstance(electrolyte, dict) else {}
+    performance = result.get("performance") or {}
+    performance = performance if isinstance(performance, dict) else {}
+
+    overpotentials = []
+    overpotential_at = {}
+    for item in performance.get("overpotential") or []:
+        if not isinstance(item, dict):
+            continue
+        density = parse_current_density(item.get("current_density"))
+        value = parse_potential(item.get("value"), item.get("unit"))
+        if density is None or value is None:
+            continue
+        overpotentials.append((density, value))
+        for standard in STANDARD_CURRENT_DENSITIES:
+            if abs(density - standard) < 1e-6:
+                overpotential_at.setdefault(standard, value)
+    overpotentials.sort(key=lambda pair: pair[0])
+
+    tafel = performance.get("tafel_slope")
+    tafel_slope = parse_tafel_slope(tafel.get("value"), tafel.get("unit")) if isinstance(tafel, dict) else None
+    stability = parse_stability(performance.get("stability"))
+
+    composition = electrolyte.get("electrolyte_composition")
+    return {
+        "alloy_id": result.get("alloy_id"),
+        "electrolyte": composition.translate(_CHAR_TRANSLATION).strip() if isinstance(composition, str) else None,
+        "electrolyte_molar": parse_concentration(electrolyte.get("concentration_molar")),
+        "ph": parse_ph(electrolyte.get("ph_value")),
+        "overpotentials": overpotentials,
+        "overpotential_at": overpotential_at,
+        "tafel_slope": tafel_slope,
+        "stability_hours": stability["hours"],
+        "stability_cycles": stability["cycles"],
+        "retention": stability["retention"]
+    }
+
+
+def normalize_extraction_results(results) -> List[Dict[str, object]]:
+    """
+    批量归一化一篇论文的 extraction_results（重复出现的数值文本命中解析缓存）
+
+    参数:
+        results: merge_result.extraction_results 列表（或 JSON 字符串）
+
+    返回:
+        [normalize_result(...), ...]，跳过非字典项
+    """
+    if isinstance(results, str):
+        try:
+            results = json.loads(results)
+        except (json.JSONDecodeError, TypeError):
+            return []
+    if not isinstance(results, list):
+        return []
+    return [normalize_result(result) for result in results if isinstance(result, dict)]
+
+
+def cache_info():
+    """解析缓存的命中统计"""
+    return _parse_cached.cache_info()
+
+
+def report_coverage(conn, fetch_size: int = FETCH_SIZE) -> Dict[str, List[int]]:
+    """
+    统计 result_merge 中各类数值的解析覆盖率
+
+    返回:
+        {字段: [非空条数, 成功解析条数]}
+    """
+    coverage = {name: [0, 0] for name in ("overpotential", "tafel_slope", "stability", "concentration")}
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT merge_result FROM result_merge
+            WHERE merge_result IS NOT NULL
+            AND merge_result::text != 'null'::text
+        """)
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            for (merge_result,) in tqdm(rows, desc="统计解析覆盖率", leave=False):
+                if isinstance(merge_result, str):
+                    merge_result = json.loads(merge_result)
+                results = merge_result.get("extraction_results") if isinstance(merge_result, dict) else None
+                for raw, record in zip(results or [], normalize_extraction_results(results)):
+                    performance = raw.get("performance") or {}
+                    raw_overpotentials = [item for item in performance.get("overpotential") or [] if isinstance(item, dict) and item.get("value")]
+                    coverage["overpotential"][0] += len(raw_overpotentials)
+                    coverage["overpotential"][1] += len(record["overpotentials"])
+                    tafel = performance.get("tafel_slope")
+                    if isinstance(tafel, dict) and tafel.get("value"):
+                        coverage["tafel_slope"][0] += 1
+                        coverage["tafel_slope"][1] += record["tafel_slope"] is not None
+                    stability = performance.get("stability")
+                    if isinstance(stability, dict) and (stability.get("duration_hours") or stability.get("cycle_count")):
+                        coverage["stability"][0] += 1
+                        coverage["stability"][1] += record["stability_hours"] is not None or record["stability_cycles"] is not None
+                    electrolyte = (raw.get("experimental_conditions") or {}).get("electrolyte")
+                    if isinstance(electrolyte, dict) and electrolyte.get("concentration_molar"):
+                        coverage["concentration"][0] += 1
+                        coverage["concentration"][1] += record["electrolyte_molar"] is not None
+    finally:
+        cursor.close()
+    return coverage
+
+
+def main():
+    """命令行入口：输出解析覆盖率与缓存命中情况"""
+    conn = None
+    try:
+        conn = connect(get_connection_params())
+        coverage = report_coverage(conn)
+        for name, (total, parsed) in coverage.items():
+            ratio = parsed / total * 100 if total else 0.0
+            print(f"✓ {name}: {parsed}/{total} ({ratio:.1f}%)")
+        info = cache_info()
+        print(f"解析缓存: 命中 {info.hits}，未命中 {info.misses}，缓存 {info.currsize} 条")
+    except DatabaseError as e:
+        print(f"✗ 数据库错误: {str(e)}")
+    finally:
+        if conn:
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
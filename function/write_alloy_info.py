@@ -1,31 +1,27 @@
 """
 从 ex_info 表读取 text_alloy_result，将 evidence_source 中的数字ID替换为句子文本，写入 alloy_info 列
 """
-import psycopg2
 import json
 import time
 from typing import Dict, List, Optional
 from tqdm import tqdm
 from db import get_connection_params
+from storage import DatabaseError, connect
+from profiler import PROFILER, profile_stage
+from sentence_format import resolve_sentence_list
+from sentence_index import ensure_sentence_index, lookup_sentences
 
 
 def create_connection(db_config):
-    """创建PostgreSQL数据库连接，带重试机制"""
+    """创建数据库连接（PostgreSQL 或本地 SQLite，由 db.DB_BACKEND 决定），带重试机制"""
     max_retries = 3
     retry_delay = 2
     
     for attempt in range(max_retries):
         try:
-            conn = psycopg2.connect(
-                host=db_config.get('host'),
-                port=db_config.get('port'),
-                database=db_config.get('database'),
-                user=db_config.get('user'),
-                password=db_config.get('password'),
-                connect_timeout=30
-            )
+            conn = connect(db_config)
             return conn
-        except psycopg2.Error as e:
+        except DatabaseError as e:
             if attempt < max_retries - 1:
                 print(f"连接失败，{retry_delay}秒后重试... (尝试 {attempt + 1}/{max_retries})")
                 time.sleep(retry_delay)
@@ -33,16 +29,18 @@ def create_connection(db_config):
                 raise
 
 
-def build_sentence_map(sentence_list: List[Dict]) -> Dict[int, str]:
+def build_sentence_map(sentence_list: List[Dict], text: Optional[str] = None) -> Dict[int, str]:
     """
     从 sentence_list 构建 id -> sentence 的映射字典
     
     Args:
-        sentence_list: 句子列表，格式如 [{"id": 1, "sentence": "..."}, ...]
+        sentence_list: 句子列表，格式如 [{"id": 1, "sentence": "..."}, ...]，或 offsets 格式
+        text: ex_info.text 原文（offsets 格式时用于切出句子）
     
     Returns:
         字典，key 为 id，value 为 sentence 文本
     """
+    sentence_list = resolve_sentence_list(sentence_list, text)
     sentence_map = {}
     if not sentence_list or not isinstance(sentence_list, list):
         return sentence_map
@@ -57,13 +55,69 @@ def build_sentence_map(sentence_list: List[Dict]) -> Dict[int, str]:
     return sentence_map
 
 
-def replace_evidence_source_with_text(text_alloy_result: Dict, sentence_list: List[Dict]) -> Optional[Dict]:
+def collect_evidence_ids(text_alloy_result) -> List[int]:
+    """收集 core_alloys 中全部 evidence_source 句子 ID"""
+    ids = []
+    if not isinstance(text_alloy_result, dict) or not isinstance(text_alloy_result.get('core_alloys'), list):
+        return ids
+    for alloy in text_alloy_result['core_alloys']:
+        if isinstance(alloy, dict) and isinstance(alloy.get('evidence_source'), list):
+            for evidence_id in alloy['evidence_source']:
+                try:
+                    ids.append(int(evidence_id))
+                except (ValueError, TypeError):
+                    pass
+    return ids
+
+
+def load_sentence_maps(conn, records) -> Dict[str, Dict[int, str]]:
+    """
+    按句子索引批量查询所有记录的证据句
+
+    Args:
+        conn: 数据库连接
+        records: [(identifier, text_alloy_result), ...]
+
+    Returns:
+        {identifier: {id: sentence}}，未建立索引的论文不在结果中
+    """
+    requests = {}
+    for identifier, text_alloy_result in records:
+        if isinstance(text_alloy_result, str):
+            try:
+                text_alloy_result = json.loads(text_alloy_result)
+            except json.JSONDecodeError:
+                continue
+        requests.setdefault(identifier, []).extend(collect_evidence_ids(text_alloy_result))
+    return lookup_sentences(conn, {identifier: ids for identifier, ids in requests.items() if ids})
+
+
+def load_sentence_map_from_ex_info(cursor, identifier: str) -> Dict[int, str]:
+    """回退路径：解析 ex_info.sentence_list 构建整篇论文的句子映射"""
+    cursor.execute("""
+        SELECT sentence_list, text
+        FROM hea.public.ex_info
+        WHERE identifier = %s
+        AND sentence_list IS NOT NULL
+        LIMIT 1
+    """, (identifier,))
+    row = cursor.fetchone()
+    if row is None:
+        return {}
+    return build_sentence_map(row[0], row[1])
+
+
+def replace_evidence_source_with_text(text_alloy_result: Dict, sentence_list: List[Dict],
+                                      text: Optional[str] = None,
+                                      sentence_map: Optional[Dict[int, str]] = None) -> Optional[Dict]:
     """
     将 text_alloy_result 中的 evidence_source 数字ID替换为句子文本
     
     Args:
         text_alloy_result: 合金结果字典，包含 core_alloys
         sentence_list: 句子列表，用于查找对应的句子文本
+        text: ex_info.text 原文（offsets 格式的 sentence_list 需要）
+        sentence_map: 已查好的 {id: sentence}（来自句子索引），提供时忽略 sentence_list
     
     Returns:
         处理后的字典，如果处理失败返回 None
@@ -72,7 +126,8 @@ def replace_evidence_source_with_text(text_alloy_result: Dict, sentence_list: Li
         return None
     
     # 构建句子映射
-    sentence_map = build_sentence_map(sentence_list)
+    if sentence_map is None:
+        sentence_map = build_sentence_map(sentence_list, text)
     
     # 深拷贝原字典，避免修改原始数据
     result = json.loads(json.dumps(text_alloy_result))
@@ -103,6 +158,7 @@ def replace_evidence_source_with_text(text_alloy_result: Dict, sentence_list: Li
     return result
 
 
+@profile_stage("write_alloy_info")
 def process_alloy_info():
     """处理所有记录，将 evidence_source 替换为文本并写入 alloy_info"""
     # 从 db.py 获取连接配置
@@ -121,7 +177,7 @@ def process_alloy_info():
         # 查询所有需要处理的记录
         print("查询需要处理的记录...")
         cursor.execute("""
-            SELECT identifier, text_alloy_result, sentence_list 
+            SELECT identifier, text_alloy_result
             FROM hea.public.ex_info 
             WHERE text_alloy_result IS NOT NULL 
             AND text_alloy_result::text != 'null'::text
@@ -156,6 +212,10 @@ def process_alloy_info():
             conn.commit()
             print("✓ 字段创建成功\n")
         
+        # 按句子索引一次性查询全部证据句，未建立索引的论文逐篇回退解析 sentence_list
+        ensure_sentence_index(conn)
+        sentence_maps = load_sentence_maps(conn, records)
+        
         # 统计信息
         processed_count = 0
         success_count = 0
@@ -164,11 +224,10 @@ def process_alloy_info():
         
         # 使用进度条处理每条记录
         with tqdm(total=len(records), desc="处理进度", unit="条") as pbar:
-            for record in records:
+            for record in PROFILER.rows(records):
                 try:
                     identifier = record[0]
                     text_alloy_result = record[1]
-                    sentence_list = record[2]
                     
                     pbar.set_description(f"处理 {identifier}")
                     
@@ -176,8 +235,6 @@ def process_alloy_info():
                     try:
                         if isinstance(text_alloy_result, str):
                             text_alloy_result = json.loads(text_alloy_result)
-                        if isinstance(sentence_list, str):
-                            sentence_list = json.loads(sentence_list)
                     except (json.JSONDecodeError, TypeError) as e:
                         print(f"\n  ✗ {identifier}: JSON 解析失败 - {str(e)}")
                         skipped_count += 1
@@ -186,7 +243,10 @@ def process_alloy_info():
                         continue
                     
                     # 替换 evidence_source
-                    alloy_info = replace_evidence_source_with_text(text_alloy_result, sentence_list)
+                    sentence_map = sentence_maps.get(identifier)
+                    if sentence_map is None:
+                        sentence_map = load_sentence_map_from_ex_info(cursor, identifier)
+                    alloy_info = replace_evidence_source_with_text(text_alloy_result, None, sentence_map=sentence_map)
                     
                     if alloy_info is None:
                         print(f"\n  ✗ {identifier}: 处理失败，跳过")
@@ -210,7 +270,7 @@ def process_alloy_info():
                     })
                     pbar.update(1)
                     
-                except psycopg2.Error as e:
+                except DatabaseError as e:
                     print(f"\n处理 identifier {identifier} 时数据库错误: {str(e)}")
                     # 尝试重新连接
                     try:
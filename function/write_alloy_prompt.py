@@ -1,12 +1,15 @@
 """
 从 ex_info 表读取 sentence_list，构造 alloy_prompt，插入到 new_prompt 表
 """
-import psycopg2
 import json
 import time
 from string import Template
 from tqdm import tqdm
 from db import get_connection_params
+from storage import DatabaseError, connect
+from profiler import PROFILER, profile_stage
+from prompt_window import pack_prompts, sentence_windows
+from config import PROMPT_WINDOW_TOKENS
 
 # Prompt 模板
 PROMPT_TEMPLATE = """# Role
@@ -81,22 +84,15 @@ $sentence_list"""
 
 
 def create_connection(db_config):
-    """创建PostgreSQL数据库连接，带重试机制"""
+    """创建数据库连接（PostgreSQL 或本地 SQLite，由 db.DB_BACKEND 决定），带重试机制"""
     max_retries = 3
     retry_delay = 2
     
     for attempt in range(max_retries):
         try:
-            conn = psycopg2.connect(
-                host=db_config.get('host'),
-                port=db_config.get('port'),
-                database=db_config.get('database'),
-                user=db_config.get('user'),
-                password=db_config.get('password'),
-                connect_timeout=30
-            )
+            conn = connect(db_config)
             return conn
-        except psycopg2.Error as e:
+        except DatabaseError as e:
             if attempt < max_retries - 1:
                 print(f"连接失败，{retry_delay}秒后重试... (尝试 {attempt + 1}/{max_retries})")
                 time.sleep(retry_delay)
@@ -116,30 +112,34 @@ def check_connection(conn):
         return False
 
 
-def build_prompt(sentence_list):
-    """根据 sentence_list 构造 prompt"""
-    # 如果 sentence_list 是字符串，先解析为 JSON
+def render_prompt(sentences):
+    """将 [{"id", "sentence"}] 句子列表填入模板"""
+    # 将句子列表格式化为 JSON 字符串（美化格式）
+    sentence_list_json = json.dumps(sentences, ensure_ascii=False, indent=2)
+
+    # 使用 Template 替换模板中的占位符（避免 JSON 中的花括号冲突）
+    template = Template(PROMPT_TEMPLATE)
+    return template.substitute(sentence_list=sentence_list_json)
+
+
+def build_prompts(sentence_list, text=None):
+    """
+    分窗构造 prompt：句子列表超过 PROMPT_WINDOW_TOKENS 时切成重叠窗口，每个窗口一个 prompt
+
+    返回:
+        prompt 列表（未超过预算时只有一个，包含全部句子）；无句子时返回空列表
+    """
     if isinstance(sentence_list, str):
         try:
             sentence_list = json.loads(sentence_list)
         except json.JSONDecodeError:
             print(f"警告: sentence_list 不是有效的 JSON 格式")
-            return None
-    
-    # 如果 sentence_list 是 None 或空列表，返回 None
-    if not sentence_list:
-        return None
-    
-    # 将 sentence_list 格式化为 JSON 字符串（美化格式）
-    sentence_list_json = json.dumps(sentence_list, ensure_ascii=False, indent=2)
-    
-    # 使用 Template 替换模板中的占位符（避免 JSON 中的花括号冲突）
-    template = Template(PROMPT_TEMPLATE)
-    prompt = template.substitute(sentence_list=sentence_list_json)
-    
-    return prompt
+            return []
+
+    return [render_prompt(window) for window in sentence_windows(sentence_list, text)]
 
 
+@profile_stage("write_alloy_prompt")
 def process_prompts():
     """从 ex_info 读取数据，构造 prompt，插入到 new_prompt 表"""
     # 从 db.py 获取连接配置
@@ -158,7 +158,7 @@ def process_prompts():
         # 查询所有有 sentence_list 的记录
         print("查询需要处理的记录...")
         cursor.execute("""
-            SELECT identifier, sentence_list 
+            SELECT identifier, sentence_list, text
             FROM ex_info 
             WHERE sentence_list IS NOT NULL 
             AND sentence_list::text != 'null'::text
@@ -214,10 +214,11 @@ def process_prompts():
         batch_size = 3
         processed_count = 0
         skipped_count = 0
+        windowed_count = 0
         
         # 使用进度条处理每条记录
         with tqdm(total=len(records), desc="处理 prompt") as pbar:
-            for idx, (identifier, sentence_list) in enumerate(records):
+            for idx, (identifier, sentence_list, text) in enumerate(PROFILER.rows(records)):
                 try:
                     # 每处理10条记录检查一次连接
                     if idx > 0 and idx % 10 == 0:
@@ -228,8 +229,11 @@ def process_prompts():
                             conn = create_connection(db_config)
                             cursor = conn.cursor()
                     
-                    # 构造 prompt
-                    alloy_prompt = build_prompt(sentence_list)
+                    # 构造 prompt（长文档分窗，多个窗口打包存储）
+                    prompts = build_prompts(sentence_list, text)
+                    alloy_prompt = pack_prompts(prompts)
+                    if len(prompts) > 1:
+                        windowed_count += 1
                     
                     if alloy_prompt is None:
                         skipped_count += 1
@@ -264,7 +268,7 @@ def process_prompts():
                         print(f"\n已处理 {len(batch_data)} 条记录 (总计: {processed_count}/{len(records)}, 跳过: {skipped_count})")
                         batch_data = []  # 清空批量数据
                 
-                except psycopg2.Error as e:
+                except DatabaseError as e:
                     print(f"\n处理 identifier {identifier} 时数据库错误: {str(e)}")
                     # 尝试重新连接
                     try:
@@ -291,8 +295,9 @@ def process_prompts():
         print(f"\n所有记录处理完成！")
         print(f"成功处理: {processed_count} 条")
         print(f"跳过: {skipped_count} 条")
+        print(f"分窗: {windowed_count} 条（超过 {PROMPT_WINDOW_TOKENS} tokens）")
         
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库错误: {str(e)}")
         
     except Exception as e:
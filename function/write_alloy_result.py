@@ -1,7 +1,6 @@
 """
 从 new_prompt 表读取 prompt，调用大模型获取结果，写入 ex_info 表
 """
-import psycopg2
 import json
 import re
 import time
@@ -10,6 +9,9 @@ from typing import List, Optional
 from pydantic import BaseModel, Field, field_validator
 from tqdm import tqdm
 from db import get_connection_params
+from storage import DatabaseError, connect
+from profiler import PROFILER, profile_stage, profiled
+from prompt_window import merge_core_alloys, run_windowed_extraction, unpack_prompts
 from config import (
     CHATANYWHERE_API_KEY,
     CHATANYWHERE_API_URL,
@@ -37,22 +39,15 @@ class AlloyResult(BaseModel):
 
 
 def create_connection(db_config):
-    """创建PostgreSQL数据库连接，带重试机制"""
+    """创建数据库连接（PostgreSQL 或本地 SQLite，由 db.DB_BACKEND 决定），带重试机制"""
     max_retries = 3
     retry_delay = 2
     
     for attempt in range(max_retries):
         try:
-            conn = psycopg2.connect(
-                host=db_config.get('host'),
-                port=db_config.get('port'),
-                database=db_config.get('database'),
-                user=db_config.get('user'),
-                password=db_config.get('password'),
-                connect_timeout=30
-            )
+            conn = connect(db_config)
             return conn
-        except psycopg2.Error as e:
+        except DatabaseError as e:
             if attempt < max_retries - 1:
                 print(f"连接失败，{retry_delay}秒后重试... (尝试 {attempt + 1}/{max_retries})")
                 time.sleep(retry_delay)
@@ -91,6 +86,7 @@ def extract_json_from_text(text: str) -> Optional[str]:
     return None
 
 
+@profiled("llm")
 def call_llm_api(prompt: str) -> Optional[str]:
     """调用大模型API"""
     headers = {
@@ -192,6 +188,7 @@ def get_llm_result_with_retry(prompt: str) -> Optional[str]:
     return None
 
 
+@profile_stage("write_alloy_result")
 def process_alloy_results():
     """处理所有prompt，调用大模型并写入结果"""
     # 从 db.py 获取连接配置
@@ -250,7 +247,7 @@ def process_alloy_results():
         
         # 使用进度条处理每条记录
         with tqdm(total=len(records), desc="处理大模型请求") as pbar:
-            for idx, (identifier, alloy_prompt) in enumerate(records):
+            for idx, (identifier, alloy_prompt) in enumerate(PROFILER.rows(records)):
                 try:
                     # 每处理10条记录检查一次连接
                     if idx > 0 and idx % 10 == 0:
@@ -281,7 +278,14 @@ def process_alloy_results():
                     
                     # 调用大模型
                     print(f"\n处理 identifier: {identifier}")
-                    result_json = get_llm_result_with_retry(alloy_prompt)
+                    # 长文档的多窗口 prompt 并发调用后按别称合并
+                    prompts, _ = unpack_prompts(alloy_prompt)
+                    if len(prompts) > 1:
+                        print(f"  长文档分 {len(prompts)} 个窗口并发抽取")
+                    result_json = run_windowed_extraction(
+                        prompts, get_llm_result_with_retry,
+                        merge_core_alloys
+                    )
                     
                     # 立即写入数据库
                     if result_json:
@@ -314,7 +318,7 @@ def process_alloy_results():
                     # 避免请求过快，添加短暂延迟
                     time.sleep(0.5)
                 
-                except psycopg2.Error as e:
+                except DatabaseError as e:
                     print(f"\n处理 identifier {identifier} 时数据库错误: {str(e)}")
                     # 尝试重新连接
                     try:
@@ -347,7 +351,7 @@ def process_alloy_results():
         print(f"跳过: {skipped_count} 条（已有结果）")
         print("=" * 60)
         
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库错误: {str(e)}")
         
     except Exception as e:
@@ -4,25 +4,19 @@
 2. 将 table_result 中 buffer 没有的 alloy_id 添加到 buffer
 3. 匹配 text_result 和 table_result 中相同的 alloy_id，写入 match 列
 """
-import psycopg2
 import json
 from tqdm import tqdm
 from db import get_connection_params
+from storage import DatabaseError, connect
+from profiler import PROFILER, profile_stage
 
 
 def create_connection(db_config):
-    """创建PostgreSQL数据库连接"""
+    """创建数据库连接（PostgreSQL 或本地 SQLite，由 db.DB_BACKEND 决定）"""
     try:
-        conn = psycopg2.connect(
-            host=db_config.get('host'),
-            port=db_config.get('port'),
-            database=db_config.get('database'),
-            user=db_config.get('user'),
-            password=db_config.get('password'),
-            connect_timeout=30
-        )
+        conn = connect(db_config)
         return conn
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库连接失败: {str(e)}")
         raise
 
@@ -169,6 +163,7 @@ def create_match_result(text_result_data, table_result_data):
     return match_data
 
 
+@profile_stage("write_arbitration")
 def process_arbitration():
     """处理仲裁逻辑"""
     # 从 db.py 获取连接配置
@@ -202,7 +197,7 @@ def process_arbitration():
         
         if len(text_records) > 0:
             with tqdm(total=len(text_records), desc="步骤1: 复制 text_result 到 buffer") as pbar:
-                for record_id, identifier, text_result in text_records:
+                for record_id, identifier, text_result in PROFILER.rows(text_records):
                     try:
                         # 解析 text_result
                         text_result_data = parse_result(text_result)
@@ -264,7 +259,7 @@ def process_arbitration():
         
         # 使用进度条处理每条记录
         with tqdm(total=len(table_records), desc="步骤2和3: 合并和匹配") as pbar:
-            for record_id, identifier, text_result, table_result, buffer, match in table_records:
+            for record_id, identifier, text_result, table_result, buffer, match in PROFILER.rows(table_records):
                 try:
                     # 解析数据
                     text_result_data = parse_result(text_result)
@@ -334,7 +329,7 @@ def process_arbitration():
         print(f"  跳过记录数: {step2_skipped}")
         print("=" * 80)
         
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库错误: {str(e)}")
         import traceback
         traceback.print_exc()
@@ -1,26 +1,23 @@
 """
 匹配图片信息：读取 text_table_result，匹配 figure_info，更新 merge_result 字段
 """
-import psycopg2
 import json
 import re
+import urllib.request
 from tqdm import tqdm
+from config import API_TOKEN, API_URL
 from db import get_connection_params
+from storage import DatabaseError, connect
+from alloy_performance import sync_alloy_performance
+from profiler import PROFILER, profile_stage
 
 
 def create_connection(db_config):
-    """创建PostgreSQL数据库连接"""
+    """创建数据库连接（PostgreSQL 或本地 SQLite，由 db.DB_BACKEND 决定）"""
     try:
-        conn = psycopg2.connect(
-            host=db_config.get('host'),
-            port=db_config.get('port'),
-            database=db_config.get('database'),
-            user=db_config.get('user'),
-            password=db_config.get('password'),
-            connect_timeout=30
-        )
+        conn = connect(db_config)
         return conn
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库连接失败: {str(e)}")
         raise
 
@@ -98,17 +95,146 @@ def texts_match(text1, text2):
     return False
 
 
-def match_figure_to_source(source_list, figure_info_list):
+# 关键词：标准化文本中长度 >= 4 的单词（与 texts_match 一致）
+KEYWORD_PATTERN = re.compile(r'\b\w{4,}\b')
+# 包含匹配要求较短文本长度 >= 10
+CONTAINMENT_MIN_LENGTH = 10
+
+
+def _extract_keywords(norm_text):
+    """提取标准化文本的关键词集合"""
+    return set(KEYWORD_PATTERN.findall(norm_text))
+
+
+class FigureIndex:
+    """
+    单篇论文的图片匹配索引：
+    图片的 location 与 reference_text_list 只标准化、提取关键词一次，
+    并建立 标准化文本 -> 条目、关键词 -> 条目 两个倒排索引：
+    1. 完全匹配直接查表，并限定后续扫描的范围
+    2. 关键词匹配只对至少 2 个共同关键词的条目计算重叠度
+    3. 包含匹配在预先标准化的文本上按图片顺序扫描（C 层子串查找），命中即停
+    同一 source 文本的结果按论文缓存。结果与逐对调用 texts_match 完全一致
+    """
+
+    def __init__(self, figure_info_list):
+        self.figure_info_list = figure_info_list or []
+        # 条目按图片顺序排列：(图片下标, 标准化文本, 关键词集合)
+        self._entries = []
+        self._exact = {}
+        self._keywords = {}
+        # 同一句 source 在一篇论文的多个字段中反复出现，缓存其最优匹配
+        self._source_cache = {}
+
+        for figure_idx, figure_info in enumerate(self.figure_info_list):
+            if not isinstance(figure_info, dict):
+                continue
+            texts = []
+            location = figure_info.get('location', '')
+            if location:
+                texts.append(location)
+            reference_text_list = figure_info.get('reference_text_list', [])
+            if isinstance(reference_text_list, list):
+                texts.extend(ref_text for ref_text in reference_text_list if isinstance(ref_text, str))
+            for text in texts:
+                self._add_entry(figure_idx, normalize_text(text))
+
+    def _add_entry(self, figure_idx, norm_text):
+        """登记一条图片文本"""
+        if not norm_text:
+            return
+        entry_id = len(self._entries)
+        words = _extract_keywords(norm_text)
+        self._entries.append((figure_idx, norm_text, words))
+        self._exact.setdefault(norm_text, entry_id)
+        for word in words:
+            self._keywords.setdefault(word, []).append(entry_id)
+
+    def _keyword_matches(self, norm_text, words):
+        """关键词重叠度 >= 0.3 且至少 2 个共同关键词的条目"""
+        shared = {}
+        for word in words:
+            for entry_id in self._keywords.get(word, ()):
+                shared[entry_id] = shared.get(entry_id, 0) + 1
+
+        matches = set()
+        for entry_id, common in shared.items():
+            if common < 2:
+                continue
+            _, entry_norm, entry_words = self._entries[entry_id]
+            if len(norm_text) <= 30 and len(entry_norm) <= 30:
+                continue
+            if common / (len(words) + len(entry_words) - common) >= 0.3:
+                matches.add(entry_id)
+        return matches
+
+    def best_figure_for_text(self, source_text):
+        """返回与单个 source 文本匹配的最小图片下标，没有匹配返回 None"""
+        if source_text in self._source_cache:
+            return self._source_cache[source_text]
+
+        best = None
+        norm_text = normalize_text(source_text)
+        if norm_text:
+            # 完全匹配的条目之后无需再扫描
+            exact = self._exact.get(norm_text)
+            limit = exact if exact is not None else len(self._entries)
+            keyword_matches = self._keyword_matches(norm_text, _extract_keywords(norm_text))
+            check_containment = len(norm_text) >= CONTAINMENT_MIN_LENGTH
+
+            for entry_id in range(limit):
+                figure_idx, entry_norm, _ = self._entries[entry_id]
+                if entry_id in keyword_matches or (
+                        check_containment and len(entry_norm) >= CONTAINMENT_MIN_LENGTH
+                        and (entry_norm in norm_text or norm_text in entry_norm)):
+                    best = figure_idx
+                    break
+            else:
+                if exact is not None:
+                    best = self._entries[exact][0]
+
+        self._source_cache[source_text] = best
+        return best
+
+    def match(self, source_list):
+        """
+        与 match_figure_to_source 语义一致：按 figure_info 列表顺序返回第一个与任一 source 文本匹配的图片
+        """
+        if not source_list or not self.figure_info_list:
+            return None
+        best = None
+        for source_text in source_list:
+            if not isinstance(source_text, str):
+                continue
+            figure_idx = self.best_figure_for_text(source_text)
+            if figure_idx is not None and (best is None or figure_idx < best):
+                best = figure_idx
+        return self.figure_info_list[best] if best is not None else None
+
+
+def match_figure_to_source(source_list, figure_info_list, figure_index=None):
     """
     匹配 source 列表中的文本与 figure_info 列表
     
     参数:
         source_list: source 文本列表，如 ["sentence 1", "sentence 2"]
         figure_info_list: figure_info 列表，每个元素包含 location 和 reference_text_list
+        figure_index: 已构建的 FigureIndex（同一篇论文多次匹配时复用）
     
     返回:
         匹配到的 figure_info 字典，如果没有匹配返回 None
     """
+    if not source_list or not figure_info_list:
+        return None
+    if figure_index is None:
+        figure_index = FigureIndex(figure_info_list)
+    return figure_index.match(source_list)
+
+
+def match_figure_to_source_pairwise(source_list, figure_info_list):
+    """
+    逐对调用 texts_match 的参考实现（用于 FigureIndex 的一致性校验，见 bench_figure_match.py）
+    """
     if not source_list or not figure_info_list:
         return None
     
@@ -138,17 +264,21 @@ def match_figure_to_source(source_list, figure_info_list):
     return None
 
 
-def add_figure_source_to_data(data, figure_info_list):
+def add_figure_source_to_data(data, figure_info_list, figure_index=None):
     """
     递归遍历数据结构，为匹配的 source 字段添加 figure_source
     
     参数:
         data: 要处理的数据（dict, list 或其他类型）
         figure_info_list: figure_info 列表
+        figure_index: 已构建的 FigureIndex，默认按 figure_info_list 构建一次并在递归中复用
     
     返回:
         (处理后的数据, 是否已匹配)
     """
+    if figure_index is None:
+        figure_index = FigureIndex(figure_info_list)
+    
     if isinstance(data, dict):
         result = {}
         matched = False
@@ -156,7 +286,7 @@ def add_figure_source_to_data(data, figure_info_list):
         for key, value in data.items():
             if key == 'source' and isinstance(value, list):
                 # 找到 source 字段，尝试匹配
-                matched_figure = match_figure_to_source(value, figure_info_list)
+                matched_figure = match_figure_to_source(value, figure_info_list, figure_index)
                 if matched_figure:
                     # 匹配成功，添加 figure_source
                     result[key] = value
@@ -167,7 +297,7 @@ def add_figure_source_to_data(data, figure_info_list):
                     result[key] = value
             else:
                 # 递归处理其他字段
-                processed_value, sub_matched = add_figure_source_to_data(value, figure_info_list)
+                processed_value, sub_matched = add_figure_source_to_data(value, figure_info_list, figure_index)
                 result[key] = processed_value
                 if sub_matched:
                     matched = True
@@ -178,7 +308,7 @@ def add_figure_source_to_data(data, figure_info_list):
         result = []
         matched = False
         for item in data:
-            processed_item, sub_matched = add_figure_source_to_data(item, figure_info_list)
+            processed_item, sub_matched = add_figure_source_to_data(item, figure_info_list, figure_index)
             result.append(processed_item)
             if sub_matched:
                 matched = True
@@ -297,6 +427,33 @@ def process_identifier(identifier, conn, cursor):
         return (False, False, f"处理出错: {str(e)}")
 
 
+def invalidate_api_cache(identifiers):
+    """
+    通知 data_api 失效这些论文的响应缓存（未配置 HEA_API_URL 时跳过，失败只打印提示）
+
+    参数:
+        identifiers: 写入了新 merge_result 的论文标识符列表
+    """
+    if not API_URL or not identifiers:
+        return
+    headers = {"Content-Type": "application/json"}
+    if API_TOKEN:
+        headers["X-Cache-Token"] = API_TOKEN
+    request = urllib.request.Request(
+        API_URL.rstrip("/") + "/cache/invalidate",
+        data=json.dumps({"identifiers": list(identifiers)}).encode("utf-8"),
+        headers=headers,
+        method="POST"
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            invalidated = json.loads(response.read()).get("invalidated", 0)
+        print(f"✓ 已通知 API 失效缓存（{invalidated} 条）")
+    except Exception as e:
+        print(f"✗ 通知 API 失效缓存失败: {str(e)}")
+
+
+@profile_stage("write_merge_result")
 def process_all_identifiers():
     """处理所有有 text_table_result 的 identifier"""
     db_config = get_connection_params()
@@ -333,14 +490,16 @@ def process_all_identifiers():
         total_success = 0
         total_matched = 0
         total_failed = 0
+        written = []
         
         # 处理每个 identifier
-        for identifier in tqdm(identifiers, desc="处理 identifier"):
+        for identifier in PROFILER.rows(tqdm(identifiers, desc="处理 identifier")):
             success, matched, error_msg = process_identifier(identifier, conn, cursor)
             
             total_processed += 1
             if success:
                 total_success += 1
+                written.append(identifier)
                 if matched:
                     total_matched += 1
             else:
@@ -357,7 +516,12 @@ def process_all_identifiers():
         print(f"失败处理: {total_failed}")
         print("=" * 80)
         
-    except psycopg2.Error as e:
+        if written:
+            rows = sync_alloy_performance(conn, written)
+            print(f"✓ 合金性能表已同步 {len(written)} 篇论文（{rows} 行）")
+        invalidate_api_cache(written)
+        
+    except DatabaseError as e:
         print(f"数据库错误: {str(e)}")
         import traceback
         traceback.print_exc()
@@ -4,25 +4,19 @@
 2. 为 new_table_info 表中所有 table_result 不为空的值都补充 source
 3. 将 new_table_info 表中 identifier 唯一的 table_result 写入 result_merge 表的 table_result 字段
 """
-import psycopg2
 import json
 from tqdm import tqdm
 from db import get_connection_params
+from storage import DatabaseError, connect
+from profiler import PROFILER, profile_stage
 
 
 def create_connection(db_config):
-    """创建PostgreSQL数据库连接"""
+    """创建数据库连接（PostgreSQL 或本地 SQLite，由 db.DB_BACKEND 决定）"""
     try:
-        conn = psycopg2.connect(
-            host=db_config.get('host'),
-            port=db_config.get('port'),
-            database=db_config.get('database'),
-            user=db_config.get('user'),
-            password=db_config.get('password'),
-            connect_timeout=30
-        )
+        conn = connect(db_config)
         return conn
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库连接失败: {str(e)}")
         raise
 
@@ -272,6 +266,7 @@ def add_source_to_result(result_data, table_id):
     return result_data
 
 
+@profile_stage("write_merge_table_result")
 def process_unique_table_results():
     """处理 table_result 数据"""
     # 从 db.py 获取连接配置
@@ -309,7 +304,7 @@ def process_unique_table_results():
             skipped_count = 0
             
             with tqdm(total=len(all_records), desc="补充 source 字段") as pbar:
-                for record_id, table_id, table_result in all_records:
+                for record_id, table_id, table_result in PROFILER.rows(all_records):
                     try:
                         # 解析 table_result
                         if isinstance(table_result, dict):
@@ -428,7 +423,7 @@ def process_unique_table_results():
         
         # 使用进度条处理每个 identifier
         with tqdm(total=len(identifier_groups), desc="处理 identifier") as pbar:
-            for identifier, table_results in identifier_groups.items():
+            for identifier, table_results in PROFILER.rows(identifier_groups.items()):
                 try:
                     # 先检查 result_merge 表中是否存在该 identifier
                     cursor.execute("""
@@ -493,7 +488,7 @@ def process_unique_table_results():
         print(f"跳过（JSON 解析失败或其他错误）: {skipped_count} 条记录")
         print("=" * 80)
         
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库错误: {str(e)}")
         import traceback
         traceback.print_exc()
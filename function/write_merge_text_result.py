@@ -1,24 +1,18 @@
 """
 合并 performance_prompt_text 表中相同 identifier 的 result，写入 result_merge 表
 """
-import psycopg2
 import json
 from tqdm import tqdm
 from db import get_connection_params
+from storage import DatabaseError, connect
+from profiler import PROFILER, profile_stage
 
 def create_connection(db_config):
-    """创建PostgreSQL数据库连接"""
+    """创建数据库连接（PostgreSQL 或本地 SQLite，由 db.DB_BACKEND 决定）"""
     try:
-        conn = psycopg2.connect(
-            host=db_config.get('host'),
-            port=db_config.get('port'),
-            database=db_config.get('database'),
-            user=db_config.get('user'),
-            password=db_config.get('password'),
-            connect_timeout=30
-        )
+        conn = connect(db_config)
         return conn
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库连接失败: {str(e)}")
         raise
 
@@ -59,6 +53,7 @@ def merge_results(results):
     return merged_result
 
 
+@profile_stage("write_merge_text_result")
 def process_merge_results():
     """处理合并结果并写入数据库"""
     # 从 db.py 获取连接配置
@@ -107,7 +102,7 @@ def process_merge_results():
         
         # 使用进度条处理每个 identifier
         with tqdm(total=len(identifier_results), desc="合并结果") as pbar:
-            for identifier, results in identifier_results.items():
+            for identifier, results in PROFILER.rows(identifier_results.items()):
                 try:
                     # 合并结果
                     merged_result = merge_results(results)
@@ -138,7 +133,7 @@ def process_merge_results():
                         conn.commit()
                         total_processed += 1
                         total_merged += len(results)
-                    except psycopg2.Error as db_error:
+                    except DatabaseError as db_error:
                         print(f"  数据库写入错误: {str(db_error)}")
                         conn.rollback()
                         skipped_count += 1
@@ -167,7 +162,7 @@ def process_merge_results():
         print(f"跳过: {skipped_count} 个 identifier（合并后结果为空）")
         print("=" * 80)
         
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库错误: {str(e)}")
         import traceback
         traceback.print_exc()
@@ -1,11 +1,14 @@
 """
 从 ex_info_text 表读取数据，构造 performance prompt，写入 performance_prompt_text 表
 """
-import psycopg2
 import json
 from string import Template
 from tqdm import tqdm
 from db import get_connection_params
+from storage import DatabaseError, connect
+from profiler import PROFILER, profile_stage
+from prompt_window import pack_prompts, sentence_windows
+from config import PROMPT_WINDOW_TOKENS
 
 # Prompt 模板
 PROMPT_TEMPLATE = """# Role
@@ -107,45 +110,20 @@ $sentence_list
 
 
 def create_connection(db_config):
-    """创建PostgreSQL数据库连接"""
+    """创建数据库连接（PostgreSQL 或本地 SQLite，由 db.DB_BACKEND 决定）"""
     try:
-        conn = psycopg2.connect(
-            host=db_config.get('host'),
-            port=db_config.get('port'),
-            database=db_config.get('database'),
-            user=db_config.get('user'),
-            password=db_config.get('password'),
-            connect_timeout=30
-        )
+        conn = connect(db_config)
         return conn
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库连接失败: {str(e)}")
         raise
 
 
-def build_performance_prompt(core_alloys, sentence_list):
-    """根据 core_alloys 和 sentence_list 构造 performance prompt"""
-    # 如果 core_alloys 是字符串，先解析为 JSON
-    if isinstance(core_alloys, str):
-        try:
-            core_alloys = json.loads(core_alloys)
-        except json.JSONDecodeError:
-            return None
-    
-    # 如果 sentence_list 是字符串，先解析为 JSON
-    if isinstance(sentence_list, str):
-        try:
-            sentence_list = json.loads(sentence_list)
-        except json.JSONDecodeError:
-            return None
-    
-    # 如果 core_alloys 或 sentence_list 是 None 或空，返回 None
-    if not core_alloys or not sentence_list:
-        return None
-    
-    # 将 core_alloys 和 sentence_list 格式化为 JSON 字符串（美化格式）
+def render_performance_prompt(core_alloys, sentences):
+    """将合金名册与 [{"id", "sentence"}] 句子列表填入模板"""
+    # 将 core_alloys 和句子列表格式化为 JSON 字符串（美化格式）
     core_alloys_json = json.dumps(core_alloys, ensure_ascii=False, indent=2)
-    sentence_list_json = json.dumps(sentence_list, ensure_ascii=False, indent=2)
+    sentence_list_json = json.dumps(sentences, ensure_ascii=False, indent=2)
     
     # 使用 Template 替换模板中的占位符（避免 JSON 中的花括号冲突）
     template = Template(PROMPT_TEMPLATE)
@@ -157,6 +135,31 @@ def build_performance_prompt(core_alloys, sentence_list):
     return prompt
 
 
+def build_performance_prompts(core_alloys, sentence_list, text=None):
+    """
+    分窗构造 performance prompt：句子列表超过 PROMPT_WINDOW_TOKENS 时切成重叠窗口，
+    每个窗口都带完整的合金名册
+
+    返回:
+        prompt 列表（未超过预算时只有一个，包含全部句子）；无数据时返回空列表
+    """
+    if isinstance(core_alloys, str):
+        try:
+            core_alloys = json.loads(core_alloys)
+        except json.JSONDecodeError:
+            return []
+    if isinstance(sentence_list, str):
+        try:
+            sentence_list = json.loads(sentence_list)
+        except json.JSONDecodeError:
+            return []
+    if not core_alloys:
+        return []
+
+    return [render_performance_prompt(core_alloys, window) for window in sentence_windows(sentence_list, text)]
+
+
+@profile_stage("write_per_prompt")
 def process_performance_prompts():
     """处理数据，构造 performance prompt 并写入数据库"""
     # 从 db.py 获取连接配置
@@ -175,7 +178,7 @@ def process_performance_prompts():
         # 查询需要处理的数据（从 ex_info_text 表）
         print("查询需要处理的数据...")
         cursor.execute("""
-            SELECT eit.identifier, eit.text_alloy_result, ei.sentence_list
+            SELECT eit.identifier, eit.text_alloy_result, ei.sentence_list, ei.text
             FROM ex_info_text eit
             INNER JOIN ex_info ei ON eit.identifier = ei.identifier
             WHERE eit.text_alloy_result IS NOT NULL
@@ -192,10 +195,11 @@ def process_performance_prompts():
         # 统计信息
         total_processed = 0
         skipped_count = 0
+        windowed_count = 0
         
         # 使用进度条处理每条记录
         with tqdm(total=len(records), desc="处理 performance prompt") as pbar:
-            for identifier, text_alloy_result, sentence_list in records:
+            for identifier, text_alloy_result, sentence_list, text in PROFILER.rows(records):
                 try:
                     # 解析 text_alloy_result 获取 core_alloys
                     if isinstance(text_alloy_result, dict):
@@ -219,8 +223,11 @@ def process_performance_prompts():
                         pbar.update(1)
                         continue
                     
-                    # 构造 prompt
-                    performance_prompt = build_performance_prompt(core_alloys, sentence_list)
+                    # 构造 prompt（长文档分窗，多个窗口连同合金名册打包存储，供结果阶段按别称合并）
+                    prompts = build_performance_prompts(core_alloys, sentence_list, text)
+                    performance_prompt = pack_prompts(prompts, core_alloys=core_alloys)
+                    if len(prompts) > 1:
+                        windowed_count += 1
                     
                     if performance_prompt is None:
                         skipped_count += 1
@@ -254,9 +261,10 @@ def process_performance_prompts():
         print(f"总记录数: {len(records)}")
         print(f"成功处理: {total_processed} 条")
         print(f"跳过: {skipped_count} 条")
+        print(f"分窗: {windowed_count} 条（超过 {PROMPT_WINDOW_TOKENS} tokens）")
         print("=" * 80)
         
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库错误: {str(e)}")
         import traceback
         traceback.print_exc()
@@ -1,7 +1,6 @@
 """
 从 performance_prompt_text 表读取 prompt，调用大模型获取结果，写入 result 字段
 """
-import psycopg2
 import json
 import re
 import time
@@ -9,6 +8,9 @@ import requests
 from typing import Optional
 from tqdm import tqdm
 from db import get_connection_params
+from storage import DatabaseError, connect
+from profiler import PROFILER, profile_stage, profiled
+from prompt_window import merge_extraction_results, run_windowed_extraction, unpack_prompts
 from config import (
     CHATANYWHERE_API_KEY,
     CHATANYWHERE_API_URL,
@@ -20,22 +22,15 @@ from config import (
 
 
 def create_connection(db_config):
-    """创建PostgreSQL数据库连接，带重试机制"""
+    """创建数据库连接（PostgreSQL 或本地 SQLite，由 db.DB_BACKEND 决定），带重试机制"""
     max_retries = 3
     retry_delay = 2
     
     for attempt in range(max_retries):
         try:
-            conn = psycopg2.connect(
-                host=db_config.get('host'),
-                port=db_config.get('port'),
-                database=db_config.get('database'),
-                user=db_config.get('user'),
-                password=db_config.get('password'),
-                connect_timeout=30
-            )
+            conn = connect(db_config)
             return conn
-        except psycopg2.Error as e:
+        except DatabaseError as e:
             if attempt < max_retries - 1:
                 print(f"连接失败，{retry_delay}秒后重试... (尝试 {attempt + 1}/{max_retries})")
                 time.sleep(retry_delay)
@@ -74,6 +69,7 @@ def extract_json_from_text(text: str) -> Optional[str]:
     return None
 
 
+@profiled("llm")
 def call_llm_api(prompt: str) -> Optional[str]:
     """调用大模型API"""
     headers = {
@@ -173,6 +169,7 @@ def get_llm_result_with_retry(prompt: str) -> Optional[str]:
     return None
 
 
+@profile_stage("write_per_result")
 def process_performance_results():
     """处理所有prompt，调用大模型并写入结果"""
     # 从 db.py 获取连接配置
@@ -231,7 +228,7 @@ def process_performance_results():
         
         # 使用进度条处理每条记录
         with tqdm(total=len(records), desc="处理大模型请求") as pbar:
-            for idx, (record_id, performance_prompt_text) in enumerate(records):
+            for idx, (record_id, performance_prompt_text) in enumerate(PROFILER.rows(records)):
                 try:
                     # 每处理10条记录检查一次连接
                     if idx > 0 and idx % 10 == 0:
@@ -244,7 +241,14 @@ def process_performance_results():
                     
                     # 调用大模型
                     print(f"\n处理 ID: {record_id}")
-                    result_json = get_llm_result_with_retry(performance_prompt_text)
+                    # 长文档的多窗口 prompt 并发调用后按别称合并
+                    prompts, meta = unpack_prompts(performance_prompt_text)
+                    if len(prompts) > 1:
+                        print(f"  长文档分 {len(prompts)} 个窗口并发抽取")
+                    result_json = run_windowed_extraction(
+                        prompts, get_llm_result_with_retry,
+                        lambda results: merge_extraction_results(results, meta.get("core_alloys"))
+                    )
                     
                     # 立即写入数据库
                     if result_json:
@@ -276,7 +280,7 @@ def process_performance_results():
                     # 避免请求过快，添加短暂延迟
                     time.sleep(0.5)
                 
-                except psycopg2.Error as e:
+                except DatabaseError as e:
                     print(f"\n处理 ID {record_id} 时数据库错误: {str(e)}")
                     # 尝试重新连接
                     try:
@@ -308,7 +312,7 @@ def process_performance_results():
         print(f"失败: {failed_count} 条")
         print("=" * 60)
         
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库错误: {str(e)}")
         
     except Exception as e:
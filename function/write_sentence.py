@@ -1,28 +1,32 @@
-import psycopg2
 from psycopg2 import sql
 import json
 import time
+from multiprocessing import Pool
 from tqdm import tqdm
-from split_tool import split_text_to_chunks
+from split_tool import split_text_to_chunks, split_text_to_spans
+from sentence_format import encode_sentence_list
+from sentence_index import ensure_sentence_index, replace_sentence_index
 from db import get_connection_params
+from storage import DatabaseError, connect
+from profiler import PROFILER, profile_stage
+from config import (
+    SENTENCE_WORKERS,
+    SENTENCE_FETCH_SIZE,
+    SENTENCE_CHUNK_SIZE,
+    SENTENCE_WRITE_BATCH,
+    SENTENCE_LIST_FORMAT
+)
 
 def create_connection(db_config):
-    """创建PostgreSQL数据库连接，带重试机制"""
+    """创建数据库连接（PostgreSQL 或本地 SQLite，由 db.DB_BACKEND 决定），带重试机制"""
     max_retries = 3
     retry_delay = 2
     
     for attempt in range(max_retries):
         try:
-            conn = psycopg2.connect(
-                host=db_config.get('host'),
-                port=db_config.get('port'),
-                database=db_config.get('database'),
-                user=db_config.get('user'),
-                password=db_config.get('password'),
-                connect_timeout=30
-            )
+            conn = connect(db_config)
             return conn
-        except psycopg2.Error as e:
+        except DatabaseError as e:
             if attempt < max_retries - 1:
                 print(f"连接失败，{retry_delay}秒后重试... (尝试 {attempt + 1}/{max_retries})")
                 time.sleep(retry_delay)
@@ -115,7 +119,7 @@ def test_connection(db_config):
         
         return True, conn, cursor
         
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"\n✗ 数据库连接失败！")
         print(f"错误信息: {str(e)}")
         print("\n可能的原因:")
@@ -137,8 +141,185 @@ def test_connection(db_config):
             conn.close()
         return False, None, None
 
+def fetch_text_page(conn, last_id=None, fetch_size=SENTENCE_FETCH_SIZE):
+    """
+    按 id 分页读取有文本内容的记录，避免一次性 fetchall 占用大量内存
+
+    参数:
+        conn: 数据库连接
+        last_id: 上一页最后一条记录的 id，为 None 时读取第一页
+        fetch_size: 每页读取的行数
+
+    返回:
+        [(id, identifier, text), ...]，没有更多记录时为空列表
+    """
+    cursor = conn.cursor()
+    try:
+        if last_id is None:
+            cursor.execute("""
+                SELECT id, identifier, text FROM ex_info
+                WHERE text IS NOT NULL AND text != ''
+                ORDER BY id
+                LIMIT %s
+            """, (fetch_size,))
+        else:
+            cursor.execute("""
+                SELECT id, identifier, text FROM ex_info
+                WHERE text IS NOT NULL AND text != '' AND id > %s
+                ORDER BY id
+                LIMIT %s
+            """, (last_id, fetch_size))
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def build_sentence_list(text):
+    """切分文本，按 SENTENCE_LIST_FORMAT 生成待存储的 sentence_list（offsets 或 legacy 格式）"""
+    if SENTENCE_LIST_FORMAT == "legacy":
+        return split_text_to_chunks(text)
+    return encode_sentence_list(split_text_to_spans(text))
+
+
+def split_record(record):
+    """
+    子进程任务：切分单条记录并序列化为 JSON
+
+    参数:
+        record: (id, identifier, text)
+
+    返回:
+        (id, sentence_list_json, 错误信息)，成功时错误信息为 None
+    """
+    record_id, _, text = record
+    try:
+        sentences = build_sentence_list(text)
+        return record_id, json.dumps(sentences, ensure_ascii=False), None
+    except Exception as e:
+        return record_id, None, str(e)
+
+
+def write_sentence_batch(conn, batch_data, index_data=None):
+    """
+    批量写回 sentence_list，并在同一事务内重建这些论文的句子索引
+
+    参数:
+        batch_data: [(sentence_list_json, id), ...]
+        index_data: [(identifier, sentence_list, text), ...]
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.executemany("UPDATE ex_info SET sentence_list = %s WHERE id = %s", batch_data)
+        if index_data:
+            replace_sentence_index(conn, index_data)
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def flush_sentence_batch(conn, db_config, batch_data, index_data):
+    """
+    写回一批结果；数据库错误时回滚并打印错误，回滚失败（连接已断开）时重新连接，不中断整体处理
+
+    返回:
+        (可继续使用的连接, 是否写入成功)
+    """
+    try:
+        write_sentence_batch(conn, batch_data, index_data)
+        return conn, True
+    except DatabaseError as e:
+        print(f"\n批量写回 {len(batch_data)} 条记录时数据库错误: {str(e)}")
+        try:
+            conn.rollback()
+        except DatabaseError:
+            print("连接已断开，正在重新连接...")
+            try:
+                conn.close()
+            except Exception:
+                pass
+            conn = create_connection(db_config)
+            print("已重新连接数据库")
+        return conn, False
+
+
+def process_sentences_parallel(conn, cursor, db_config, workers=SENTENCE_WORKERS,
+                               fetch_size=SENTENCE_FETCH_SIZE,
+                               chunk_size=SENTENCE_CHUNK_SIZE,
+                               write_batch=SENTENCE_WRITE_BATCH):
+    """
+    多进程模式：分页读取 (id, text)，交给进程池切分，按原顺序收集结果并批量写回
+
+    参数:
+        conn, cursor: 已通过连接测试的数据库连接与游标
+        db_config: 连接参数，写回失败且连接断开时用于重新连接
+        workers: 进程数
+        fetch_size: 每页读取的行数
+        chunk_size: 每次分发给单个进程的文档数
+        write_batch: 每次批量写回的行数
+    """
+    cursor.execute("SELECT COUNT(*) FROM ex_info WHERE text IS NOT NULL AND text != ''")
+    total = cursor.fetchone()[0]
+    if total == 0:
+        print("没有找到需要处理的记录（text字段为空或NULL）")
+        return
+
+    print(f"找到 {total} 条有效记录需要处理（{workers} 个进程，每页 {fetch_size} 条，"
+          f"分发粒度 {chunk_size}，批量写回 {write_batch} 条）\n")
+
+    batch_data = []
+    index_data = []
+    processed_count = 0
+    failed_count = 0
+    start_time = time.time()
+
+    original_conn = conn
+    last_id = None
+    try:
+        with Pool(processes=workers) as pool, tqdm(total=total, desc="处理句子切分", unit="doc") as pbar:
+            while True:
+                page = fetch_text_page(conn, last_id, fetch_size)
+                if not page:
+                    break
+                last_id = page[-1][0]
+                # imap 保证结果顺序与输入顺序一致
+                results = pool.imap(split_record, page, chunksize=chunk_size)
+                for (_, identifier, text), (record_id, sentence_list_json, error) in zip(page, PROFILER.rows(results)):
+                    if error is not None:
+                        print(f"\n处理记录 ID {record_id} 时出错: {error}")
+                        failed_count += 1
+                    else:
+                        batch_data.append((sentence_list_json, record_id))
+                        index_data.append((identifier, sentence_list_json, text))
+                        processed_count += 1
+
+                    if len(batch_data) >= write_batch:
+                        conn, written = flush_sentence_batch(conn, db_config, batch_data, index_data)
+                        if not written:
+                            processed_count -= len(batch_data)
+                            failed_count += len(batch_data)
+                        batch_data = []
+                        index_data = []
+                    pbar.update(1)
+
+            if batch_data:
+                conn, written = flush_sentence_batch(conn, db_config, batch_data, index_data)
+                if not written:
+                    processed_count -= len(batch_data)
+                    failed_count += len(batch_data)
+    finally:
+        # 重新连接得到的连接由本函数关闭，原连接由调用方关闭
+        if conn is not original_conn:
+            conn.close()
+
+    elapsed = time.time() - start_time
+    rate = (processed_count + failed_count) / elapsed if elapsed > 0 else 0.0
+    print(f"\n✓ 成功 {processed_count} 条，✗ 失败 {failed_count} 条，"
+          f"耗时 {elapsed:.1f}s，{rate:.2f} docs/sec")
+
+
+@profile_stage("write_sentence")
 def process_sentences():
-    """处理数据库中的文本并写入句子切分结果"""
+    """处理数据库中的文本并写入句子切分结果（SENTENCE_WORKERS > 1 时使用多进程模式）"""
 
     # 从 db.py 导入数据库连接配置
     db_config = get_connection_params()
@@ -150,10 +331,18 @@ def process_sentences():
         return
     
     try:
+        # 句子索引表与 sentence_list 同步维护
+        ensure_sentence_index(conn)
+
+        # 多进程模式
+        if SENTENCE_WORKERS > 1:
+            print("开始处理数据（多进程模式）...\n")
+            process_sentences_parallel(conn, cursor, db_config)
+            return
 
         # 查询所有有文本内容的记录
         print("开始处理数据...\n")
-        cursor.execute("SELECT id, text FROM ex_info WHERE text IS NOT NULL AND text != ''")
+        cursor.execute("SELECT id, identifier, text FROM ex_info WHERE text IS NOT NULL AND text != ''")
         records = cursor.fetchall()
 
         if len(records) == 0:
@@ -164,12 +353,13 @@ def process_sentences():
 
         # 用于批量更新的数据
         batch_data = []
+        index_data = []
         batch_size = 3
         processed_count = 0
 
         # 使用进度条处理每条记录
         with tqdm(total=len(records), desc="处理句子切分") as pbar:
-            for idx, (record_id, text) in enumerate(records):
+            for idx, (record_id, identifier, text) in enumerate(PROFILER.rows(records)):
                 try:
                     # 每处理10条记录检查一次连接
                     if idx > 0 and idx % 10 == 0:
@@ -181,13 +371,14 @@ def process_sentences():
                             cursor = conn.cursor()
                     
                     # 调用句子切分函数
-                    sentences = split_text_to_chunks(text)
+                    sentences = build_sentence_list(text)
 
                     # 将结果转换为JSON字符串存储
                     sentence_list_json = json.dumps(sentences, ensure_ascii=False)
 
                     # 添加到批量更新数据中
                     batch_data.append((sentence_list_json, record_id))
+                    index_data.append((identifier, sentences, text))
                     processed_count += 1
 
                     # 每达到batch_size或最后一条时执行批量更新
@@ -203,12 +394,14 @@ def process_sentences():
                         # 批量更新数据库
                         update_query = "UPDATE ex_info SET sentence_list = %s WHERE id = %s"
                         cursor.executemany(update_query, batch_data)
+                        replace_sentence_index(conn, index_data)
                         conn.commit()
 
                         print(f"\n已更新 {len(batch_data)} 条记录 (总计: {processed_count}/{len(records)})")
                         batch_data = []  # 清空批量数据
+                        index_data = []
 
-                except psycopg2.Error as e:
+                except DatabaseError as e:
                     print(f"\n处理记录 ID {record_id} 时数据库错误: {str(e)}")
                     # 尝试重新连接
                     try:
@@ -232,7 +425,7 @@ def process_sentences():
 
         print("\n所有记录处理完成！")
 
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库错误: {str(e)}")
 
     except Exception as e:
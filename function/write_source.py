@@ -2,32 +2,29 @@
 更新result_merge表，text_result字段的source信息
 将source中的数字ID替换为实际的句子内容
 """
-import psycopg2
 import json
 from tqdm import tqdm
 from db import get_connection_params
+from storage import DatabaseError, connect
+from profiler import PROFILER, profile_stage
+from sentence_format import build_sentence_map
+from sentence_index import ensure_sentence_index, lookup_sentence_map, lookup_sentences
 
 
 def create_connection(db_config):
-    """创建PostgreSQL数据库连接"""
+    """创建数据库连接（PostgreSQL 或本地 SQLite，由 db.DB_BACKEND 决定）"""
     try:
-        conn = psycopg2.connect(
-            host=db_config.get('host'),
-            port=db_config.get('port'),
-            database=db_config.get('database'),
-            user=db_config.get('user'),
-            password=db_config.get('password'),
-            connect_timeout=30
-        )
+        conn = connect(db_config)
         return conn
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库连接失败: {str(e)}")
         raise
 
 
 def get_sentence_dict(identifier, conn, cache):
     """
-    根据 identifier 获取 sentence_list，并转换为字典（带缓存）
+    根据 identifier 获取 {id: sentence} 字典（带缓存）：优先查句子索引表，
+    论文尚未建立索引时回退到解析 ex_info.sentence_list
     
     参数:
         identifier: identifier
@@ -43,11 +40,16 @@ def get_sentence_dict(identifier, conn, cache):
     
     cursor = None
     try:
+        sentences_dict = lookup_sentence_map(conn, identifier)
+        if sentences_dict is not None:
+            cache[identifier] = sentences_dict
+            return sentences_dict
+
         cursor = conn.cursor()
         
-        # 查询 sentence_list
+        # 查询 sentence_list（offsets 格式需要原文 text 切出句子）
         cursor.execute("""
-            SELECT sentence_list
+            SELECT sentence_list, text
             FROM ex_info
             WHERE identifier = %s
             AND sentence_list IS NOT NULL
@@ -59,22 +61,10 @@ def get_sentence_dict(identifier, conn, cache):
             cache[identifier] = {}
             return {}
         
-        sentence_list = result[0]
+        sentence_list, text = result
         
-        # 解析 sentence_list
-        if isinstance(sentence_list, list):
-            sentences_dict = {item.get("id"): item.get("sentence", "") for item in sentence_list if isinstance(item, dict)}
-        elif isinstance(sentence_list, str):
-            try:
-                sentences_data = json.loads(sentence_list)
-                if isinstance(sentences_data, list):
-                    sentences_dict = {item.get("id"): item.get("sentence", "") for item in sentences_data if isinstance(item, dict)}
-                else:
-                    sentences_dict = {}
-            except json.JSONDecodeError:
-                sentences_dict = {}
-        else:
-            sentences_dict = {}
+        # 解析 sentence_list（legacy 列表或 offsets 列式格式）
+        sentences_dict = build_sentence_map(sentence_list, text)
         
         # 存入缓存
         cache[identifier] = sentences_dict
@@ -127,6 +117,39 @@ def is_numeric_list(value):
     return all(isinstance(item, (int, float)) for item in value)
 
 
+def collect_source_ids(data, ids=None):
+    """递归收集 source 字段中的全部句子 ID"""
+    if ids is None:
+        ids = set()
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if key == 'source' and is_numeric_list(value):
+                ids.update(value)
+            else:
+                collect_source_ids(value, ids)
+    elif isinstance(data, list):
+        for item in data:
+            collect_source_ids(item, ids)
+    return ids
+
+
+def prefetch_sentences(records, conn, cache):
+    """
+    按句子索引批量预取所有记录引用到的句子，写入缓存（未建立索引的论文留给 get_sentence_dict 回退处理）
+
+    参数:
+        records: [(identifier, 解析后的 text_result), ...]
+        conn: 数据库连接对象
+        cache: 缓存字典
+    """
+    requests = {}
+    for identifier, data in records:
+        requests.setdefault(identifier, set()).update(collect_source_ids(data))
+    requests = {identifier: ids for identifier, ids in requests.items() if ids and identifier not in cache}
+    if requests:
+        cache.update(lookup_sentences(conn, requests))
+
+
 def replace_source_ids(data, identifier, conn, cache):
     """
     递归遍历数据结构，将 source 字段中的数字ID替换为实际句子内容
@@ -160,6 +183,7 @@ def replace_source_ids(data, identifier, conn, cache):
         return data
 
 
+@profile_stage("write_source")
 def process_text_result_sources():
     """处理 result_merge 表的 text_result 字段，更新 source 信息"""
     db_config = get_connection_params()
@@ -194,27 +218,31 @@ def process_text_result_sources():
         updated_count = 0
         error_count = 0
         
-        # 缓存字典，避免重复查询同一个 identifier 的 sentence_list
+        # 缓存字典，避免重复查询同一个 identifier 的句子
         sentence_cache = {}
+        ensure_sentence_index(conn)
+        
+        # 解析 text_result
+        parsed_records = []
+        for identifier, text_result in records:
+            if isinstance(text_result, dict):
+                parsed_records.append((identifier, text_result))
+            elif isinstance(text_result, str):
+                try:
+                    parsed_records.append((identifier, json.loads(text_result)))
+                except json.JSONDecodeError:
+                    print(f"  [错误] identifier={identifier}: text_result JSON 解析失败")
+                    error_count += 1
+            else:
+                print(f"  [跳过] identifier={identifier}: text_result 格式不正确")
+                processed_count += 1
+        
+        # 按句子索引一次性预取全部引用到的句子
+        prefetch_sentences(parsed_records, conn, sentence_cache)
         
         # 处理每条记录
-        for identifier, text_result in tqdm(records, desc="处理记录"):
+        for identifier, text_result_data in PROFILER.rows(tqdm(parsed_records, desc="处理记录")):
             try:
-                # 解析 text_result
-                if isinstance(text_result, dict):
-                    text_result_data = text_result
-                elif isinstance(text_result, str):
-                    try:
-                        text_result_data = json.loads(text_result)
-                    except json.JSONDecodeError:
-                        print(f"  [错误] identifier={identifier}: text_result JSON 解析失败")
-                        error_count += 1
-                        continue
-                else:
-                    print(f"  [跳过] identifier={identifier}: text_result 格式不正确")
-                    processed_count += 1
-                    continue
-                
                 # 替换 source 中的数字ID为实际句子内容
                 updated_text_result = replace_source_ids(text_result_data, identifier, conn, sentence_cache)
                 
@@ -1,24 +1,18 @@
 """
 将 ex_info 表中的 text_alloy_result 按策略拆分，写入新表 ex_info_text
 """
-import psycopg2
 import json
 from tqdm import tqdm
 from db import get_connection_params
+from storage import DatabaseError, connect
+from profiler import PROFILER, profile_stage
 
 def create_connection(db_config):
-    """创建PostgreSQL数据库连接"""
+    """创建数据库连接（PostgreSQL 或本地 SQLite，由 db.DB_BACKEND 决定）"""
     try:
-        conn = psycopg2.connect(
-            host=db_config.get('host'),
-            port=db_config.get('port'),
-            database=db_config.get('database'),
-            user=db_config.get('user'),
-            password=db_config.get('password'),
-            connect_timeout=30
-        )
+        conn = connect(db_config)
         return conn
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库连接失败: {str(e)}")
         raise
 
@@ -107,6 +101,7 @@ def split_alloys(core_alloys, max_per_group=4):
     return groups
 
 
+@profile_stage("write_split_alloy")
 def split_and_write():
     """拆分合金数据并写入新表"""
     # 从 db.py 获取连接配置
@@ -147,7 +142,7 @@ def split_and_write():
         
         # 使用进度条处理每条记录
         with tqdm(total=len(records), desc="处理拆分") as pbar:
-            for identifier, filename, title, alloy_elements, text_alloy_result in records:
+            for identifier, filename, title, alloy_elements, text_alloy_result in PROFILER.rows(records):
                 try:
                     # 解析 text_alloy_result
                     if isinstance(text_alloy_result, dict):
@@ -269,7 +264,7 @@ def split_and_write():
             print(f"所有 identifier 的原始合金总数: {sum(identifier_original_counts.values())}")
             print(f"所有 identifier 的拆分后总组数: {sum(identifier_split_counts.values())}")
         
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库错误: {str(e)}")
         import traceback
         traceback.print_exc()
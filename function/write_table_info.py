@@ -1,28 +1,23 @@
 """
 从 table_figure_info 表读取 table_info，拆分后写入 new_table_info 表
 """
-import psycopg2
 import json
 from tqdm import tqdm
 from db import get_connection_params
+from storage import DatabaseError, connect
+from profiler import PROFILER, profile_stage
 
 def create_connection(db_config):
-    """创建PostgreSQL数据库连接"""
+    """创建数据库连接（PostgreSQL 或本地 SQLite，由 db.DB_BACKEND 决定）"""
     try:
-        conn = psycopg2.connect(
-            host=db_config.get('host'),
-            port=db_config.get('port'),
-            database=db_config.get('database'),
-            user=db_config.get('user'),
-            password=db_config.get('password'),
-            connect_timeout=30
-        )
+        conn = connect(db_config)
         return conn
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库连接失败: {str(e)}")
         raise
 
 
+@profile_stage("write_table_info")
 def process_table_info():
     """处理表格信息并写入新表"""
     # 从 db.py 获取连接配置
@@ -64,7 +59,7 @@ def process_table_info():
         
         # 使用进度条处理每条记录
         with tqdm(total=len(records), desc="处理表格信息") as pbar:
-            for identifier, table_info in records:
+            for identifier, table_info in PROFILER.rows(records):
                 try:
                     # 解析 table_info
                     if isinstance(table_info, list):
@@ -150,7 +145,7 @@ def process_table_info():
         print(f"跳过: {skipped_count} 条")
         print("=" * 80)
         
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库错误: {str(e)}")
         import traceback
         traceback.print_exc()
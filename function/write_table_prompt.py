@@ -1,29 +1,33 @@
 """
 从 new_table_info 和 ex_info 表读取数据，构造 table prompt，写入 new_table_info 表
 """
-import psycopg2
 import json
 from string import Template
 from tqdm import tqdm
 from db import get_connection_params
+from storage import DatabaseError, connect
+from profiler import PROFILER, profile_stage
+from config import TABLE_PROMPT_FORMAT
+from split_tool import ENCODING
+from table_grid import compact_table_info
 
 # Prompt 模板
 PROMPT_TEMPLATE = """# Role
-你是一位精通电催化析氢反应 (HER) 数据分析的专家。你具备极强的 HTML 表格解析能力，能从科研论文表格中，结合正文引用信息，精准提取合金的实验条件与性能指标。
+你是一位精通电催化析氢反应 (HER) 数据分析的专家。你具备极强的表格解析能力，能从科研论文表格中，结合正文引用信息，精准提取合金的实验条件与性能指标。
 
 # Task
-请阅读提供的【表格信息】，参照【合金名册】中的合金 ID 及其别称 (aliases)，从 HTML 表格中提取对应的实验参数与性能数据。
+请阅读提供的【表格信息】，参照【合金名册】中的合金 ID 及其别称 (aliases)，从表格中提取对应的实验参数与性能数据。
 
 # Input Data
 1. **【合金名册 (core_alloys)】**：第一步识别出的实体清单。你必须将表格中的样本行精准映射到这些 ID 上。
 2. **【表格信息】**：
    - `location`: 表格标题 (Table Caption)，通常包含全局测试条件。
-   - `source_content`: HTML 格式的表格原文。
+   - `source_content`: 表格内容。通常已解析为 Markdown 表格或制表符分隔文本 (TSV)：首行为列标题，复合表头已按“上层 / 下层”合并为路径，跨行/跨列单元格已展开到其覆盖的每个位置；无法解析时为 HTML 原文。
    - `reference_text_list`: 正文中引用该表格的文本，用于辅助理解缩写、代号或补充缺失条件。
 
 # Extraction Logic
 1. **表头语义对齐 (Header Mapping)**：
-   - 仔细解析 HTML 中的 `<thead>` 或首行 `<tr>`。特别注意复合表头（如上层是 Overpotential，下层是不同的电流密度数值）。
+   - 仔细解析表头（Markdown / TSV 首行，或 HTML 中的 `<thead>` / 首行 `<tr>`）。特别注意复合表头（如 `Overpotential (mV) / 10 mA cm-2` 表示上层是 Overpotential，下层是对应的电流密度数值）。
    - 必须将单元格数值与其所属的列标题（性能指标）和行标题（合金名称/代号）精准对应。
 2. **别名/代号桥接**：
    - 若表格首列使用的是代号（如 Sample 1, S-1），请结合【合金名册】中的 `aliases` 以及 `reference_text_list` 中的描述，将其还原为正确的 `alloy_id`。
@@ -94,41 +98,73 @@ $table_info
 
 
 def create_connection(db_config):
-    """创建PostgreSQL数据库连接"""
+    """创建数据库连接（PostgreSQL 或本地 SQLite，由 db.DB_BACKEND 决定）"""
     try:
-        conn = psycopg2.connect(
-            host=db_config.get('host'),
-            port=db_config.get('port'),
-            database=db_config.get('database'),
-            user=db_config.get('user'),
-            password=db_config.get('password'),
-            connect_timeout=30
-        )
+        conn = connect(db_config)
         return conn
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库连接失败: {str(e)}")
         raise
 
 
-def build_table_prompt(core_alloys, table_info):
+def count_tokens(text):
+    """使用 tiktoken 计算文本的 token 数量"""
+    return len(ENCODING.encode(text)) if text else 0
+
+
+def compact_table_for_prompt(table_info, table_format=TABLE_PROMPT_FORMAT):
+    """
+    将 table_info 的 HTML 原文解析为网格，并替换为紧凑文本
+    
+    参数:
+        table_info: table_info 字典
+        table_format: markdown / tsv / html（html 时保留原文）
+    
+    返回:
+        (送入 prompt 的 table_info, table_grid 记录)；无法解析时为 (原 table_info, None)
+        table_grid 记录包含网格、表头路径、输出格式以及压缩前后的 token 数
+    """
+    compacted, grid = compact_table_info(table_info, table_format)
+    if grid is None:
+        return table_info, None
+    
+    record = grid.to_dict()
+    record["format"] = table_format
+    record["raw_tokens"] = count_tokens(table_info.get("source_content"))
+    record["compact_tokens"] = count_tokens(compacted.get("source_content"))
+    return compacted, record
+
+
+def build_table_prompt(core_alloys, table_info, table_format=TABLE_PROMPT_FORMAT):
     """根据 core_alloys 和 table_info 构造 table prompt"""
+    prompt, _ = build_table_prompt_with_grid(core_alloys, table_info, table_format)
+    return prompt
+
+
+def build_table_prompt_with_grid(core_alloys, table_info, table_format=TABLE_PROMPT_FORMAT):
+    """
+    根据 core_alloys 和 table_info 构造 table prompt，HTML 表格压缩为 table_format 格式
+    
+    返回:
+        (prompt, table_grid 记录)；无法构造时 prompt 为 None，表格无法解析时记录为 None
+    """
     # 如果 core_alloys 是字符串，先解析为 JSON
     if isinstance(core_alloys, str):
         try:
             core_alloys = json.loads(core_alloys)
         except json.JSONDecodeError:
-            return None
+            return None, None
     
     # 如果 table_info 是字符串，先解析为 JSON
     if isinstance(table_info, str):
         try:
             table_info = json.loads(table_info)
         except json.JSONDecodeError:
-            return None
+            return None, None
     
     # 如果 core_alloys 或 table_info 是 None 或空，返回 None
     if not core_alloys or not table_info:
-        return None
+        return None, None
     
     # 从 text_alloy_result 中提取 core_alloys
     if isinstance(core_alloys, dict) and "core_alloys" in core_alloys:
@@ -136,10 +172,15 @@ def build_table_prompt(core_alloys, table_info):
     elif isinstance(core_alloys, list):
         core_alloys_list = core_alloys
     else:
-        return None
+        return None, None
     
     if not isinstance(core_alloys_list, list) or len(core_alloys_list) == 0:
-        return None
+        return None, None
+    
+    # HTML 表格解析为网格并压缩
+    grid_record = None
+    if isinstance(table_info, dict):
+        table_info, grid_record = compact_table_for_prompt(table_info, table_format)
     
     # 将 core_alloys 和 table_info 格式化为 JSON 字符串（美化格式）
     core_alloys_json = json.dumps(core_alloys_list, ensure_ascii=False, indent=2)
@@ -152,9 +193,10 @@ def build_table_prompt(core_alloys, table_info):
         table_info=table_info_json
     )
     
-    return prompt
+    return prompt, grid_record
 
 
+@profile_stage("write_table_prompt")
 def process_table_prompts():
     """处理数据，构造 table prompt 并写入数据库"""
     # 从 db.py 获取连接配置
@@ -187,13 +229,33 @@ def process_table_prompts():
             print("没有找到需要处理的记录")
             return
         
+        # 检查 new_table_info 表是否有 table_grid 字段（解析后的网格与 token 节省记录）
+        cursor.execute("""
+            SELECT column_name 
+            FROM information_schema.columns 
+            WHERE table_schema = 'public' 
+            AND table_name = 'new_table_info' 
+            AND column_name = 'table_grid'
+        """)
+        if cursor.fetchone() is None:
+            print("创建 table_grid 字段...")
+            cursor.execute("""
+                ALTER TABLE new_table_info 
+                ADD COLUMN table_grid JSONB
+            """)
+            conn.commit()
+            print("✓ 字段创建成功\n")
+        
         # 统计信息
         total_processed = 0
         skipped_count = 0
+        compacted_count = 0
+        raw_tokens = 0
+        compact_tokens = 0
         
         # 使用进度条处理每条记录
         with tqdm(total=len(records), desc="处理 table prompt") as pbar:
-            for record_id, identifier, table_info, text_alloy_result in records:
+            for record_id, identifier, table_info, text_alloy_result in PROFILER.rows(records):
                 try:
                     # 解析 text_alloy_result 获取 core_alloys
                     if isinstance(text_alloy_result, dict):
@@ -205,8 +267,8 @@ def process_table_prompts():
                         pbar.update(1)
                         continue
                     
-                    # 构造 prompt
-                    table_prompt = build_table_prompt(result_data, table_info)
+                    # 构造 prompt（HTML 表格压缩为网格文本）
+                    table_prompt, grid_record = build_table_prompt_with_grid(result_data, table_info)
                     
                     if table_prompt is None:
                         skipped_count += 1
@@ -216,9 +278,18 @@ def process_table_prompts():
                     # 写入数据库
                     cursor.execute("""
                         UPDATE new_table_info 
-                        SET table_prompt = %s
+                        SET table_prompt = %s, table_grid = %s::jsonb
                         WHERE id = %s
-                    """, (table_prompt, record_id))
+                    """, (
+                        table_prompt,
+                        json.dumps(grid_record, ensure_ascii=False) if grid_record else None,
+                        record_id
+                    ))
+                    
+                    if grid_record:
+                        compacted_count += 1
+                        raw_tokens += grid_record["raw_tokens"]
+                        compact_tokens += grid_record["compact_tokens"]
                     
                     conn.commit()
                     total_processed += 1
@@ -241,9 +312,13 @@ def process_table_prompts():
         print(f"总记录数: {len(records)}")
         print(f"成功处理: {total_processed} 条")
         print(f"跳过: {skipped_count} 条")
+        if compacted_count:
+            saved_ratio = (1 - compact_tokens / raw_tokens) * 100 if raw_tokens else 0.0
+            print(f"表格压缩: {compacted_count} 个表格，HTML {raw_tokens} tokens -> "
+                  f"{TABLE_PROMPT_FORMAT} {compact_tokens} tokens（节省 {saved_ratio:.1f}%）")
         print("=" * 80)
         
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库错误: {str(e)}")
         import traceback
         traceback.print_exc()
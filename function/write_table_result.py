@@ -1,20 +1,24 @@
 """
 从 new_table_info 表读取 table_prompt，调用大模型获取结果，写入 table_result 字段
 """
-import psycopg2
 import json
 import re
 import time
 import requests
+from collections import Counter
 from typing import Optional
 from tqdm import tqdm
 from db import get_connection_params
+from storage import DatabaseError, connect
+from profiler import PROFILER, profile_stage, profiled
+from table_rules import extract_from_record, format_coverage, has_table_grid_column
 from config import (
     CHATANYWHERE_API_KEY,
     CHATANYWHERE_API_URL,
     CHATANYWHERE_MODEL,
     MAX_RETRIES,
     MAX_TOKENS,
+    TABLE_RULES_ENABLED,
     TEMPERATURE
 )
 
@@ -23,22 +27,15 @@ CHATANYWHERE_API_KEY = "sk-tHxZa5r4v06o8DelkankxWKkhVr93LFZrWZ9AcvQ9caAzph9"
 
 
 def create_connection(db_config):
-    """创建PostgreSQL数据库连接，带重试机制"""
+    """创建数据库连接（PostgreSQL 或本地 SQLite，由 db.DB_BACKEND 决定），带重试机制"""
     max_retries = 3
     retry_delay = 2
     
     for attempt in range(max_retries):
         try:
-            conn = psycopg2.connect(
-                host=db_config.get('host'),
-                port=db_config.get('port'),
-                database=db_config.get('database'),
-                user=db_config.get('user'),
-                password=db_config.get('password'),
-                connect_timeout=30
-            )
+            conn = connect(db_config)
             return conn
-        except psycopg2.Error as e:
+        except DatabaseError as e:
             if attempt < max_retries - 1:
                 print(f"连接失败，{retry_delay}秒后重试... (尝试 {attempt + 1}/{max_retries})")
                 time.sleep(retry_delay)
@@ -77,6 +74,7 @@ def extract_json_from_text(text: str) -> Optional[str]:
     return None
 
 
+@profiled("llm")
 def call_llm_api(prompt: str) -> Optional[str]:
     """调用大模型API"""
     headers = {
@@ -176,6 +174,7 @@ def get_llm_result_with_retry(prompt: str) -> Optional[str]:
     return None
 
 
+@profile_stage("write_table_result")
 def process_table_results():
     """处理所有prompt，调用大模型并写入结果"""
     # 从 db.py 获取连接配置
@@ -191,13 +190,19 @@ def process_table_results():
         cursor = conn.cursor()
         print("✓ 数据库连接成功！\n")
         
-        # 查询所有需要处理的记录
+        # table_grid 字段由 write_table_prompt 创建，旧库中可能不存在（规则抽取时现场解析）
+        grid_column = "nti.table_grid" if has_table_grid_column(cursor) else "NULL"
+        
+        # 查询所有需要处理的记录（附带表格原文、网格与合金名册，供规则抽取使用）
         print("查询需要处理的记录...")
-        cursor.execute("""
-            SELECT id, table_prompt 
-            FROM new_table_info 
-            WHERE table_prompt IS NOT NULL 
-            AND table_prompt != ''
+        cursor.execute(f"""
+            SELECT nti.id, nti.table_prompt, nti.table_info, {grid_column},
+                (SELECT ei.text_alloy_result FROM ex_info ei
+                 WHERE ei.identifier = nti.identifier AND ei.text_alloy_result IS NOT NULL
+                 LIMIT 1)
+            FROM new_table_info nti
+            WHERE nti.table_prompt IS NOT NULL 
+            AND nti.table_prompt != ''
         """)
         records = cursor.fetchall()
         
@@ -231,10 +236,12 @@ def process_table_results():
         success_count = 0
         failed_count = 0
         skipped_count = 0
+        rule_count = 0
+        coverage = Counter()
         
         # 使用进度条处理每条记录
         with tqdm(total=len(records), desc="处理大模型请求") as pbar:
-            for idx, (record_id, table_prompt) in enumerate(records):
+            for idx, (record_id, table_prompt, table_info, table_grid, text_alloy_result) in enumerate(PROFILER.rows(records)):
                 try:
                     # 每处理10条记录检查一次连接
                     if idx > 0 and idx % 10 == 0:
@@ -263,6 +270,28 @@ def process_table_results():
                         pbar.update(1)
                         continue
                     
+                    # 先尝试规则抽取，能确定的表格不调用大模型
+                    if TABLE_RULES_ENABLED:
+                        rule_result, reason = extract_from_record(table_info, table_grid, text_alloy_result)
+                        coverage[reason] += 1
+                        if rule_result is not None:
+                            cursor.execute("""
+                                UPDATE new_table_info 
+                                SET table_result = %s::jsonb
+                                WHERE id = %s
+                            """, (json.dumps(rule_result, ensure_ascii=False), record_id))
+                            conn.commit()
+                            success_count += 1
+                            rule_count += 1
+                            processed_count += 1
+                            pbar.set_postfix({
+                                '成功': success_count,
+                                '失败': failed_count,
+                                '跳过': skipped_count
+                            })
+                            pbar.update(1)
+                            continue
+                    
                     # 调用大模型
                     print(f"\n处理 ID: {record_id}")
                     result_json = get_llm_result_with_retry(table_prompt)
@@ -298,7 +327,7 @@ def process_table_results():
                     # 避免请求过快，添加短暂延迟
                     time.sleep(0.5)
                 
-                except psycopg2.Error as e:
+                except DatabaseError as e:
                     print(f"\n处理 ID {record_id} 时数据库错误: {str(e)}")
                     # 尝试重新连接
                     try:
@@ -329,9 +358,12 @@ def process_table_results():
         print(f"成功: {success_count} 条")
         print(f"失败: {failed_count} 条")
         print(f"跳过: {skipped_count} 条（已有结果）")
+        if TABLE_RULES_ENABLED:
+            print(f"规则抽取: {rule_count} 条（未调用大模型）")
+            print(format_coverage(coverage))
         print("=" * 60)
         
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库错误: {str(e)}")
         
     except Exception as e:
@@ -1,31 +1,29 @@
 """
 写入对齐结果：调用 split_match 和 alignment_text_table_result 进行对齐，更新 text_table_result 字段
 """
-import psycopg2
 import json
 from tqdm import tqdm
 from db import get_connection_params
-from split_match import split_match_by_identifier
+from storage import DatabaseError, connect
+from profiler import PROFILER, profile_stage
+from split_match import split_match_by_identifier, split_match_by_identifiers
 from alignment_text_table_result import (
     build_prompt,
     get_llm_result_with_retry,
     add_source_to_result
 )
 
+# ========== 配置参数 ==========
+# 批量预取拆分结果的 identifier 数量（两条查询取回一批论文的 match 与 table_info）
+SPLIT_PREFETCH_SIZE = 200
+
 
 def create_connection(db_config):
-    """创建PostgreSQL数据库连接"""
+    """创建数据库连接（PostgreSQL 或本地 SQLite，由 db.DB_BACKEND 决定）"""
     try:
-        conn = psycopg2.connect(
-            host=db_config.get('host'),
-            port=db_config.get('port'),
-            database=db_config.get('database'),
-            user=db_config.get('user'),
-            password=db_config.get('password'),
-            connect_timeout=30
-        )
+        conn = connect(db_config)
         return conn
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库连接失败: {str(e)}")
         raise
 
@@ -137,7 +135,7 @@ def update_buffer_with_aligned_result(buffer_data, aligned_result):
     return buffer_data
 
 
-def process_identifier(identifier, conn, cursor):
+def process_identifier(identifier, conn, cursor, split_results=None):
     """
     处理单个 identifier 的对齐和更新
     
@@ -145,13 +143,15 @@ def process_identifier(identifier, conn, cursor):
         identifier: identifier
         conn: 数据库连接
         cursor: 数据库游标
+        split_results: 批量预取的拆分结果，默认 None（单独查询）
     
     返回:
         (success: bool, aligned_count: int, error_message: str)
     """
     try:
-        # 1. 调用 split_match_by_identifier 获取需要对齐的列表
-        split_results = split_match_by_identifier(identifier)
+        # 1. 获取需要对齐的列表（未预取时调用 split_match_by_identifier，复用当前连接）
+        if split_results is None:
+            split_results = split_match_by_identifier(identifier, conn)
         
         if not split_results:
             # 如果没有 match 数据，直接复制 buffer 到 text_table_result
@@ -228,6 +228,7 @@ def process_identifier(identifier, conn, cursor):
         return (False, 0, f"处理出错: {str(e)}")
 
 
+@profile_stage("write_text_table_result")
 def process_all_identifiers():
     """处理所有有 match 字段的 identifier"""
     db_config = get_connection_params()
@@ -265,9 +266,20 @@ def process_all_identifiers():
         total_aligned = 0
         total_failed = 0
         
-        # 处理每个 identifier
-        for identifier in tqdm(identifiers, desc="处理 identifier"):
-            success, aligned_count, error_msg = process_identifier(identifier, conn, cursor)
+        # 处理每个 identifier（每 SPLIT_PREFETCH_SIZE 个 identifier 批量预取一次拆分结果）
+        split_map = {}
+        for idx, identifier in enumerate(PROFILER.rows(tqdm(identifiers, desc="处理 identifier"))):
+            if idx % SPLIT_PREFETCH_SIZE == 0:
+                try:
+                    split_map = split_match_by_identifiers(identifiers[idx:idx + SPLIT_PREFETCH_SIZE], conn)
+                except Exception as e:
+                    # 批量预取失败时回退为逐个查询，由 process_identifier 记录各自的错误
+                    print(f"  ⚠ 批量拆分 match 失败，改为逐个查询: {str(e)}")
+                    conn.rollback()
+                    split_map = {}
+            success, aligned_count, error_msg = process_identifier(
+                identifier, conn, cursor, split_map.pop(identifier, None)
+            )
             
             total_processed += 1
             if success:
@@ -316,7 +328,7 @@ def process_all_identifiers():
         print(f"match 为空直接复制: {empty_match_count}")
         print("=" * 80)
         
-    except psycopg2.Error as e:
+    except DatabaseError as e:
         print(f"数据库错误: {str(e)}")
         import traceback
         traceback.print_exc()
@@ -1,6 +1,8 @@
 """
 FastAPI 应用主文件
 """
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
@@ -15,7 +17,20 @@ from .config import (
     CORS_METHODS,
     CORS_HEADERS
 )
-from .routes import papers, root, feedback
+from .database import init_pool, close_pool
+from .routes import papers, root, feedback, cache, alloys
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    应用生命周期：启动时创建数据库连接池，关闭时释放全部连接
+    """
+    init_pool()
+    try:
+        yield
+    finally:
+        close_pool()
 
 
 def create_app() -> FastAPI:
@@ -26,7 +41,7 @@ def create_app() -> FastAPI:
         FastAPI: 配置好的 FastAPI 应用实例
     """
     # 创建 FastAPI 应用
-    app = FastAPI(title=API_TITLE, version=API_VERSION)
+    app = FastAPI(title=API_TITLE, version=API_VERSION, lifespan=lifespan)
     
     # 挂载图片目录
     app.mount("/static_images", StaticFiles(directory=IMAGE_DIR), name="static_images")
@@ -47,6 +62,8 @@ def create_app() -> FastAPI:
     app.include_router(root.router)
     app.include_router(papers.router)
     app.include_router(feedback.router)
+    app.include_router(cache.router)
+    app.include_router(alloys.router)
     
     return app
 
@@ -0,0 +1,96 @@
+"""
+API 并发压测：
+对运行中的 data_api 服务按不同并发客户端数发送请求，输出每档的吞吐量与延迟分位数
+路由中的数据库调用不阻塞事件循环时，吞吐量应随并发数增长（直到 DB_THREAD_LIMIT / 数据库瓶颈）
+
+用法（先启动服务：python -m data_api.run）：
+    python -m data_api.bench_api_load
+    python -m data_api.bench_api_load --url http://127.0.0.1:8003 --path /papers/<identifier>/performance
+    python -m data_api.bench_api_load --levels 1,4,16,64 --requests 400
+"""
+import argparse
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# ========== 配置参数 ==========
+DEFAULT_URL = "http://127.0.0.1:8003"
+DEFAULT_PATH = "/papers"
+DEFAULT_LEVELS = "1,2,4,8,16,32"
+DEFAULT_REQUESTS = 200
+REQUEST_TIMEOUT = 60
+
+
+def fetch(url: str):
+    """
+    发送一次 GET 请求
+
+    Returns:
+        (是否成功, 耗时秒数)
+    """
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=REQUEST_TIMEOUT) as response:
+            response.read()
+            ok = response.status == 200
+    except (urllib.error.URLError, OSError):
+        ok = False
+    return ok, time.perf_counter() - start
+
+
+def run_level(url: str, concurrency: int, total: int) -> dict:
+    """
+    以固定并发数发送 total 个请求
+
+    Returns:
+        包含吞吐量、失败数与延迟分位数的统计
+    """
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda _: fetch(url), range(total)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for _, latency in results)
+    return {
+        "concurrency": concurrency,
+        "throughput": total / elapsed if elapsed > 0 else float("inf"),
+        "errors": sum(1 for ok, _ in results if not ok),
+        "p50": statistics.median(latencies),
+        "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+    }
+
+
+def main():
+    """主函数：逐档并发压测并输出对比"""
+    parser = argparse.ArgumentParser(description="data_api 并发压测")
+    parser.add_argument("--url", default=DEFAULT_URL, help="服务地址")
+    parser.add_argument("--path", default=DEFAULT_PATH, help="压测的路由")
+    parser.add_argument("--levels", default=DEFAULT_LEVELS, help="逗号分隔的并发客户端数")
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS, help="每档请求数")
+    args = parser.parse_args()
+
+    url = args.url.rstrip("/") + args.path
+    levels = [int(level) for level in args.levels.split(",") if level.strip()]
+
+    # 预热：建立连接池
+    ok, _ = fetch(url)
+    if not ok:
+        print(f"✗ 请求失败: {url}")
+        return
+
+    print(f"压测 {url}（每档 {args.requests} 个请求）")
+    baseline = None
+    for concurrency in levels:
+        stats = run_level(url, concurrency, args.requests)
+        baseline = baseline or stats["throughput"]
+        status = "✓" if stats["errors"] == 0 else "✗"
+        print(f"  {status} 并发 {concurrency:4d}  吞吐 {stats['throughput']:8.1f} req/s"
+              f"（x{stats['throughput'] / baseline:4.1f}）"
+              f"  p50 {stats['p50'] * 1000:7.1f}ms  p95 {stats['p95'] * 1000:7.1f}ms"
+              f"  失败 {stats['errors']}")
+
+
+if __name__ == "__main__":
+    main()
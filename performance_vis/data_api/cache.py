@@ -0,0 +1,229 @@
+"""
+响应缓存模块
+
+进程内 LRU + TTL 缓存，缓存序列化后的 JSON 响应体：
+1. 缓存键为 (接口, identifier)，每条缓存记录其数据行版本；版本由 PostgreSQL 系统列 xmin 组成
+   （行被 UPDATE / 重新 INSERT 时 xmin 改变），只查询 id / xmin，不读取 merge_result 等大字段
+2. 每次请求先查行版本：版本一致直接返回缓存的响应体，不再读取、解析、序列化 JSONB
+3. 响应带强 ETag（响应体的 SHA-1），请求头 If-None-Match 命中时返回 304
+4. 流水线写入新结果后可调用 POST /cache/invalidate 显式失效（版本变化本身也会让旧缓存失效）
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from .config import RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL
+from .database import get_db_connection, get_db_cursor, release_db_connection, run_db
+
+# 可用于计算行版本的表（表名直接拼入 SQL，只允许白名单）
+VERSIONED_TABLES = ("paper_info", "result_merge", "ex_info")
+
+
+class CachedResponse:
+    """一条缓存的响应"""
+
+    __slots__ = ("version", "body", "etag", "stored_at")
+
+    def __init__(self, version: str, body: bytes):
+        self.version = version
+        self.body = body
+        self.etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        self.stored_at = time.monotonic()
+
+
+class ResponseCache:
+    """
+    线程安全的 LRU + TTL 响应缓存
+
+    Args:
+        max_entries: 最多缓存的响应数，超过后淘汰最久未使用的
+        ttl: 缓存有效秒数（<= 0 表示不过期）
+    """
+
+    def __init__(self, max_entries: int = 512, ttl: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, str], CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[str, str], version: str) -> Optional[CachedResponse]:
+        """
+        获取缓存，版本不一致或已过期时视为未命中并删除
+
+        Args:
+            key: (接口, identifier)
+            version: 当前数据行版本
+
+        Returns:
+            CachedResponse 或 None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expired = self.ttl > 0 and time.monotonic() - entry.stored_at > self.ttl
+                if expired or entry.version != version:
+                    del self._entries[key]
+                    entry = None
+                else:
+                    self._entries.move_to_end(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def put(self, key: Tuple[str, str], version: str, body: bytes) -> CachedResponse:
+        """写入缓存并返回缓存记录"""
+        entry = CachedResponse(version, body)
+        if self.max_entries <= 0:
+            return entry
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, identifiers: Optional[Iterable[str]] = None) -> int:
+        """
+        显式失效缓存
+
+        Args:
+            identifiers: 需要失效的论文标识符，为 None 时清空全部
+
+        Returns:
+            删除的缓存条数
+        """
+        with self._lock:
+            if identifiers is None:
+                count = len(self._entries)
+                self._entries.clear()
+                return count
+            targets = set(identifiers)
+            keys = [key for key in self._entries if key[1] in targets]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存状态"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+RESPONSE_CACHE = ResponseCache(RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL)
+
+
+def get_row_version(identifier: str, tables: Iterable[str]) -> str:
+    """
+    查询论文在各表中数据行的版本（id / xmin），一次查询、不读取 JSONB 字段
+
+    Args:
+        identifier: 论文标识符
+        tables: VERSIONED_TABLES 中的表名
+
+    Returns:
+        版本字符串，如 "paper_info=123|result_merge=8:456"；各表无数据时对应部分为空
+    """
+    tables = list(tables)
+    parts = []
+    for table in tables:
+        if table not in VERSIONED_TABLES:
+            raise ValueError(f"不支持计算版本的表: {table}")
+        # paper_info 没有自增 id，只用 xmin
+        row_key = "xmin::text" if table == "paper_info" else "id::text || ':' || xmin::text"
+        parts.append(f"""(
+            SELECT string_agg({row_key}, ',' ORDER BY {row_key})
+            FROM public.{table}
+            WHERE identifier = %s
+        ) AS {table}""")
+
+    connection = None
+    cursor = None
+
+    try:
+        connection = get_db_connection()
+        cursor = get_db_cursor(connection)
+        cursor.execute("SELECT " + ",\n".join(parts), (identifier,) * len(parts))
+        row = cursor.fetchone() or {}
+        return "|".join(f"{table}={row.get(table) or ''}" for table in tables)
+
+    finally:
+        if cursor:
+            cursor.close()
+        if connection:
+            release_db_connection(connection)
+
+
+def encode_json(content: Any) -> bytes:
+    """与 FastAPI JSONResponse 相同的方式序列化响应体"""
+    return json.dumps(
+        jsonable_encoder(content),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """请求头 If-None-Match 是否包含当前 ETag（按弱比较，支持 * 与多个 ETag）"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [item.strip() for item in header.split(",")]
+    if "*" in candidates:
+        return True
+    return any((item[2:] if item.startswith("W/") else item) == etag for item in candidates)
+
+
+async def cached_json_response(
+    request: Request,
+    name: str,
+    identifier: str,
+    tables: Iterable[str],
+    build: Callable[[str], Any],
+    extra_version: Optional[Callable[[str], str]] = None
+) -> Response:
+    """
+    带版本校验与 ETag 的缓存响应（阻塞的数据库调用在 run_db 线程池中执行）
+
+    Args:
+        request: 当前请求（读取 If-None-Match）
+        name: 接口名称，作为缓存键的一部分
+        identifier: 论文标识符
+        tables: 决定响应内容的数据表
+        build: 缓存未命中时构建响应内容的同步函数，参数为 identifier
+        extra_version: 响应还依赖数据表以外的状态（如 PDF 文件）时，返回该状态版本的同步函数
+
+    Returns:
+        200 JSON 响应或 304 响应
+    """
+    key = (name, identifier)
+    version = await run_db(get_row_version, identifier, tuple(tables))
+    if extra_version is not None:
+        version += "|" + await run_db(extra_version, identifier)
+    entry = RESPONSE_CACHE.get(key, version)
+    if entry is None:
+        content = await run_db(build, identifier)
+        entry = RESPONSE_CACHE.put(key, version, encode_json(content))
+
+    # no-cache：浏览器可缓存，但每次使用前需带 If-None-Match 重新校验
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
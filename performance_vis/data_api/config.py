@@ -1,6 +1,7 @@
 """
 API 配置项
 """
+import os
 from pathlib import Path
 
 # 数据库配置
@@ -10,6 +11,20 @@ DB_USER = 'root'
 DB_PASSWORD = '123456'
 DB_PORT = 5432
 
+# 连接池配置
+DB_POOL_MIN = 2             # 启动时预建的连接数
+DB_POOL_MAX = 20            # 连接数上限
+DB_POOL_TIMEOUT = 10        # 池满时借用连接的最长等待秒数
+DB_POOL_RECYCLE = 1800      # 连接最长存活秒数，超过后关闭重建
+DB_POOL_CHECK_IDLE = 30     # 空闲超过该秒数的连接借出前执行 SELECT 1 健康检查
+DB_THREAD_LIMIT = DB_POOL_MAX  # 异步路由中同时执行阻塞数据库调用的线程数上限
+
+# 响应缓存配置（论文详情 / 性能数据接口，见 cache.py）
+RESPONSE_CACHE_MAX_ENTRIES = 512   # 最多缓存的响应数（LRU 淘汰），设为 0 关闭缓存
+RESPONSE_CACHE_TTL = 3600          # 缓存有效秒数
+# POST /cache/invalidate 的共享令牌（请求头 X-Cache-Token，与流水线的 HEA_API_TOKEN 相同）；为空时只接受本机请求
+CACHE_INVALIDATE_TOKEN = os.getenv("HEA_API_TOKEN", "")
+
 # 优先显示的论文 identifier 列表（按顺序）
 PRIORITY_IDENTIFIERS = [
     '964e909e7be3f7be1dbebde6285bfdf5',
@@ -21,6 +36,29 @@ PRIORITY_IDENTIFIERS = [
     'bbdce4825323017dbdd9fab04d4e6a91'
 ]
 
+# 论文列表分页（GET /papers）
+PAPER_PAGE_SIZE = 50      # 默认每页条数
+PAPER_PAGE_MAX = 500      # 每页条数上限
+
+# 论文检索（GET /papers/search，见 services/search_service.py）
+# auto：存在 pg_trgm 与全文索引（python -m data_api.search_setup 创建）时用 postgres，否则用进程内倒排索引
+SEARCH_BACKEND = "auto"
+SEARCH_INDEX_TTL = 300    # 进程内倒排索引的重建间隔（秒）
+SEARCH_PAGE_SIZE = 20     # 默认每页条数
+SEARCH_PAGE_MAX = 100     # 每页条数上限
+
+# 合金性能检索（GET /alloys/search，见 services/alloy_search_service.py）
+ALLOY_PAGE_SIZE = 50      # 默认每页条数
+ALLOY_PAGE_MAX = 500      # 每页条数上限
+
+# 相似合金检索（GET /alloys/similar，见 services/similarity_service.py）
+SIMILAR_INDEX_TTL = 300   # 进程内组成向量矩阵的重建间隔（秒）
+SIMILAR_K_DEFAULT = 10    # 默认返回的合金数
+SIMILAR_K_MAX = 200       # 返回合金数上限
+
+# 流水线脚本目录（function/），组成式解析模块 composition.py 与流水线共用
+PIPELINE_DIR = Path(__file__).resolve().parents[2] / "function"
+
 # 图片目录路径
 IMAGE_DIR = "/Users/xiaokong/task/2025/electrocatalysis/extract/result"
 
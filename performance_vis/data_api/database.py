@@ -1,16 +1,41 @@
 """
 数据库连接管理模块
+
+进程级连接池：
+1. 应用启动时 init_pool() 预建 DB_POOL_MIN 个连接，关闭时 close_pool() 释放全部连接
+2. get_db_connection() 从池中借出连接（池满时最多等待 DB_POOL_TIMEOUT 秒），
+   release_db_connection() 归还（回滚未结束的事务）
+3. 健康检查：借出空闲超过 DB_POOL_CHECK_IDLE 秒的连接前执行 SELECT 1，失效连接直接丢弃重建
+4. 连接回收：存活超过 DB_POOL_RECYCLE 秒的连接在归还/借出时关闭，由新连接替换
+5. 异步路由通过 run_db() 在有界线程池（DB_THREAD_LIMIT）中执行阻塞的数据库调用，不阻塞事件循环
 """
+import functools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional
+
+import anyio
+import anyio.to_thread
 import psycopg2
+from psycopg2 import extensions
 from psycopg2.extras import RealDictCursor
-from typing import Optional
-from .config import DB_HOST, DB_NAME, DB_USER, DB_PASSWORD, DB_PORT
+from .config import (
+    DB_HOST, DB_NAME, DB_USER, DB_PASSWORD, DB_PORT,
+    DB_POOL_MIN, DB_POOL_MAX, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_CHECK_IDLE,
+    DB_THREAD_LIMIT
+)
 
 
-def get_db_connection():
+class PoolTimeoutError(Exception):
+    """连接池已满且等待超时"""
+
+
+def create_db_connection():
     """
-    获取数据库连接
-    
+    新建一个独立的数据库连接（不经过连接池）
+
     Returns:
         psycopg2.connection: 数据库连接对象
     """
@@ -23,27 +48,267 @@ def get_db_connection():
     )
 
 
+class ConnectionPool:
+    """
+    线程安全的数据库连接池
+
+    Args:
+        minconn: 启动时预建、并尽量保持的连接数
+        maxconn: 同时存在的连接数上限（借出 + 空闲）
+        timeout: 池满时借用连接的最长等待秒数
+        recycle: 连接最长存活秒数，超过后关闭重建（<= 0 表示不回收）
+        check_idle: 空闲超过该秒数的连接在借出前做健康检查（<= 0 表示每次都检查）
+        connect: 新建连接的函数
+    """
+
+    def __init__(self, minconn: int, maxconn: int, timeout: float = 10.0,
+                 recycle: float = 1800.0, check_idle: float = 30.0, connect=create_db_connection):
+        if maxconn < 1 or minconn < 0 or minconn > maxconn:
+            raise ValueError(f"连接池大小不合法: min={minconn}, max={maxconn}")
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.recycle = recycle
+        self.check_idle = check_idle
+        self._connect = connect
+        self._idle = deque()        # [(连接, 最近归还时间), ...]
+        self._created = {}          # id(连接) -> 创建时间（借出与空闲的连接都在其中）
+        self._size = 0              # 已创建且未关闭的连接数（含正在创建的）
+        self._closed = False
+        self._condition = threading.Condition()
+
+        # 预建连接失败（如数据库暂不可用）不影响启动，后续借用时按需重建
+        for _ in range(minconn):
+            self._reserve()
+            try:
+                self._idle.append((self._open(), time.monotonic()))
+            except Exception as e:
+                print(f"✗ 连接池预建连接失败: {e}")
+                break
+
+    def _reserve(self):
+        """占用一个连接名额（调用方持有锁或在构造阶段）"""
+        self._size += 1
+
+    def _open(self):
+        """新建连接，失败时释放名额"""
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+        self._created[id(conn)] = time.monotonic()
+        return conn
+
+    def _discard(self, conn):
+        """关闭连接并释放名额"""
+        self._created.pop(id(conn), None)
+        try:
+            if not conn.closed:
+                conn.close()
+        except Exception:
+            pass
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def _expired(self, conn) -> bool:
+        """连接是否超过最长存活时间"""
+        if self.recycle <= 0:
+            return False
+        created = self._created.get(id(conn))
+        return created is None or time.monotonic() - created > self.recycle
+
+    def _healthy(self, conn, idle_since: float) -> bool:
+        """健康检查：已关闭 / 超龄的连接不可用；空闲较久的连接执行 SELECT 1"""
+        if conn.closed or self._expired(conn):
+            return False
+        if time.monotonic() - idle_since < self.check_idle:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def getconn(self):
+        """
+        借出一个可用连接
+
+        Returns:
+            psycopg2.connection: 数据库连接对象
+
+        Raises:
+            PoolTimeoutError: 池满且等待超时
+        """
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._condition:
+                if self._closed:
+                    raise RuntimeError("连接池已关闭")
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                elif self._size < self.maxconn:
+                    self._reserve()
+                    conn, idle_since = None, None
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeoutError(f"等待数据库连接超时（{self.timeout}s，上限 {self.maxconn}）")
+                    self._condition.wait(remaining)
+                    continue
+
+            # 建连与健康检查在锁外进行，不阻塞其他线程
+            if conn is None:
+                return self._open()
+            if self._healthy(conn, idle_since):
+                return conn
+            self._discard(conn)
+
+    def putconn(self, conn, discard: bool = False):
+        """
+        归还连接：回滚未结束的事务，失效/超龄的连接直接关闭
+
+        Args:
+            conn: getconn 借出的连接
+            discard: 为 True 时强制关闭（如连接已出错）
+        """
+        if not discard and not conn.closed:
+            try:
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                discard = True
+
+        if discard or self._closed or conn.closed or self._expired(conn):
+            self._discard(conn)
+            return
+        with self._condition:
+            self._idle.append((conn, time.monotonic()))
+            self._condition.notify()
+
+    def closeall(self):
+        """关闭全部空闲连接，并拒绝后续借用（已借出的连接在归还时关闭）"""
+        with self._condition:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._condition.notify_all()
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def owns(self, conn) -> bool:
+        """连接是否由本连接池创建且尚未关闭"""
+        return id(conn) in self._created
+
+    def stats(self) -> dict:
+        """连接池状态"""
+        with self._condition:
+            return {"size": self._size, "idle": len(self._idle), "max": self.maxconn}
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+_thread_limiter: Optional[anyio.CapacityLimiter] = None
+
+
+def init_pool() -> ConnectionPool:
+    """创建进程级连接池（已存在时直接返回）"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(
+                DB_POOL_MIN,
+                DB_POOL_MAX,
+                timeout=DB_POOL_TIMEOUT,
+                recycle=DB_POOL_RECYCLE,
+                check_idle=DB_POOL_CHECK_IDLE
+            )
+        return _pool
+
+
+def close_pool():
+    """关闭进程级连接池"""
+    global _pool, _thread_limiter
+    with _pool_lock:
+        pool, _pool = _pool, None
+        _thread_limiter = None
+    if pool is not None:
+        pool.closeall()
+
+
+def get_db_connection():
+    """
+    从连接池借出数据库连接（未调用 init_pool 时按需创建连接池）
+    用完后必须调用 release_db_connection 归还
+
+    Returns:
+        psycopg2.connection: 数据库连接对象
+    """
+    pool = _pool or init_pool()
+    return pool.getconn()
+
+
+def release_db_connection(connection, discard: bool = False):
+    """
+    归还数据库连接到借出它的连接池
+
+    Args:
+        connection: get_db_connection 返回的连接
+        discard: 为 True 时关闭连接而不放回池中
+    """
+    pool = _pool
+    if pool is None or not pool.owns(connection):
+        # 连接池已关闭或连接不属于连接池
+        connection.close()
+        return
+    pool.putconn(connection, discard=discard)
+
+
+async def run_db(func, *args, **kwargs):
+    """
+    在有界线程池中执行阻塞的数据库调用（供 async 路由使用）
+    同时执行的线程数不超过 DB_THREAD_LIMIT，多出的请求在事件循环中等待，不占用线程
+
+    Args:
+        func: 同步函数（如 services 中的查询函数）
+        *args, **kwargs: 传给 func 的参数
+
+    Returns:
+        func 的返回值（异常原样抛出）
+    """
+    global _thread_limiter
+    if _thread_limiter is None:
+        _thread_limiter = anyio.CapacityLimiter(DB_THREAD_LIMIT)
+    return await anyio.to_thread.run_sync(functools.partial(func, *args, **kwargs), limiter=_thread_limiter)
+
+
 def get_db_cursor(connection) -> RealDictCursor:
     """
     获取数据库游标
-    
+
     Args:
         connection: 数据库连接对象
-    
+
     Returns:
         RealDictCursor: 游标对象
     """
     return connection.cursor(cursor_factory=RealDictCursor)
 
 
+@contextmanager
 def execute_query(query: str, params: Optional[tuple] = None):
     """
     执行数据库查询（上下文管理器方式）
-    
+
     Args:
         query: SQL 查询语句
         params: 查询参数
-    
+
     Yields:
         cursor: 数据库游标对象
     """
@@ -58,5 +323,4 @@ def execute_query(query: str, params: Optional[tuple] = None):
         if cursor:
             cursor.close()
         if connection:
-            connection.close()
-
+            release_db_connection(connection)
@@ -10,7 +10,7 @@ import json
 from typing import Any, Dict, Optional
 import psycopg2
 from psycopg2.extras import RealDictCursor
-from .database import get_db_connection, get_db_cursor
+from .database import get_db_connection, get_db_cursor, release_db_connection
 
 
 def _ensure_parsed(data: Any) -> Optional[Dict]:
@@ -56,7 +56,7 @@ def _fetch_merge_result(identifier: str) -> Optional[Dict]:
         if cur:
             cur.close()
         if conn:
-            conn.close()
+            release_db_connection(conn)
 
 
 def get_performance_data(identifier: str) -> Dict[str, Any]:
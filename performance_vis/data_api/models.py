@@ -5,10 +5,34 @@ from pydantic import BaseModel
 from typing import Optional, Any, Dict, List
 
 
-class PaperListItem(BaseModel):
-    """论文列表项"""
-    identifier: str
-    title: str
+class PaperPage(BaseModel):
+    """论文列表分页结果"""
+    items: List[Dict[str, Any]]  # 每项包含 identifier 与所选字段
+    next_cursor: Optional[str] = None  # 下一页游标，为空表示已到末尾
+    total: Optional[int] = None  # 论文总数（include_total=true 时返回）
+
+
+class PaperSearchPage(BaseModel):
+    """论文检索结果"""
+    items: List[Dict[str, Any]]  # identifier, title, score, title_highlight, snippet
+    next_offset: Optional[int] = None  # 下一页的 offset，为空表示已到末尾
+    total: Optional[int] = None  # 命中总数
+    backend: str  # postgres 或 memory
+
+
+class AlloySearchPage(BaseModel):
+    """合金性能检索结果（来自 alloy_performance 表）"""
+    items: List[Dict[str, Any]]  # 合金行：identifier, title, alloy_id, 组成 / 元素, 电解液, 过电位 / Tafel / 稳定性
+    next_offset: Optional[int] = None  # 下一页的 offset，为空表示已到末尾
+    total: Optional[int] = None  # 命中总数
+
+
+class SimilarAlloyPage(BaseModel):
+    """相似合金检索结果"""
+    query: Dict[str, float]  # 查询组成的摩尔分数
+    metric: str  # cosine 或 l1
+    items: List[Dict[str, Any]]  # identifier, alloy_id, composition, fractions, approximate, score, l1_distance
+    indexed: int  # 参与检索的合金数
 
 
 class PaperDetail(BaseModel):
@@ -27,6 +51,15 @@ class PerformanceData(BaseModel):
     merge_result: Dict[str, Any]
 
 
+class SentenceItem(BaseModel):
+    """论文句子（来自 sentence_index 表）"""
+    id: int
+    sentence: str
+    start: Optional[int] = None  # 在 ex_info.text 中的字符区间，legacy 格式为空
+    end: Optional[int] = None
+    token_count: Optional[int] = None
+
+
 class APIInfo(BaseModel):
     """API 信息"""
     message: str
@@ -42,3 +75,8 @@ class FeedbackRequest(BaseModel):
     type: str  # 文本, 表格, 图片
     problem: str
 
+
+
+class CacheInvalidateRequest(BaseModel):
+    """缓存失效请求"""
+    identifiers: Optional[List[str]] = None  # 为空时清空全部缓存
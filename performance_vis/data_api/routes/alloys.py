@@ -0,0 +1,129 @@
+"""
+合金性能检索 API 路由
+"""
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+
+from ..config import ALLOY_PAGE_SIZE, ALLOY_PAGE_MAX, SIMILAR_K_DEFAULT, SIMILAR_K_MAX
+from ..database import run_db
+from ..models import AlloySearchPage, SimilarAlloyPage
+from ..services.alloy_search_service import search_alloys
+from ..services.similarity_service import find_similar_alloys
+
+router = APIRouter(prefix="/alloys", tags=["alloys"])
+
+
+@router.get("/search", response_model=AlloySearchPage)
+async def search_alloys_endpoint(
+    current_density: int = 10,
+    overpotential_min: Optional[float] = None,
+    overpotential_max: Optional[float] = None,
+    tafel_min: Optional[float] = None,
+    tafel_max: Optional[float] = None,
+    stability_min_hours: Optional[float] = None,
+    electrolyte: Optional[str] = None,
+    molarity: Optional[float] = None,
+    ph_min: Optional[float] = None,
+    ph_max: Optional[float] = None,
+    elements: Optional[str] = None,
+    exclude_elements: Optional[str] = None,
+    element_count_min: Optional[int] = None,
+    element_count_max: Optional[int] = None,
+    sort: str = "overpotential",
+    order: str = "asc",
+    limit: int = Query(ALLOY_PAGE_SIZE, ge=1, le=ALLOY_PAGE_MAX),
+    offset: int = Query(0, ge=0),
+    include_total: bool = False
+):
+    """
+    按性能范围与条件检索合金，如 1 M KOH 中 η10 < 50 mV：
+    /alloys/search?current_density=10&overpotential_max=50&electrolyte=KOH&molarity=1
+
+    Args:
+        current_density: 过电位对应的电流密度（mA cm^-2），可选 10 / 50 / 100 / 500 / 1000
+        overpotential_min / overpotential_max: 过电位范围（mV）
+        tafel_min / tafel_max: Tafel 斜率范围（mV dec^-1）
+        stability_min_hours: 稳定性测试时长下限（h）
+        electrolyte: 电解液成分，如 KOH
+        molarity: 电解液摩尔浓度（mol/L）
+        ph_min / ph_max: pH 范围
+        elements: 逗号分隔的元素，合金需包含全部这些元素
+        exclude_elements: 逗号分隔的元素，合金不能包含其中任何一个
+        element_count_min / element_count_max: 元素种数范围
+        sort: 排序字段，可选 overpotential, tafel_slope, stability_hours, element_count
+        order: asc 或 desc
+        limit: 每页条数
+        offset: 跳过的条数
+        include_total: 是否返回命中总数
+
+    Returns:
+        命中的合金行与下一页 offset
+    """
+    try:
+        return await run_db(
+            search_alloys,
+            current_density=current_density,
+            overpotential_min=overpotential_min,
+            overpotential_max=overpotential_max,
+            tafel_min=tafel_min,
+            tafel_max=tafel_max,
+            stability_min_hours=stability_min_hours,
+            electrolyte=electrolyte,
+            molarity=molarity,
+            ph_min=ph_min,
+            ph_max=ph_max,
+            elements=elements,
+            exclude_elements=exclude_elements,
+            element_count_min=element_count_min,
+            element_count_max=element_count_max,
+            sort=sort,
+            order=order,
+            limit=limit,
+            offset=offset,
+            include_total=include_total
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"数据库查询失败: {str(e)}")
+
+
+@router.get("/similar", response_model=SimilarAlloyPage)
+async def similar_alloys_endpoint(
+    composition: Optional[str] = None,
+    identifier: Optional[str] = None,
+    alloy_id: Optional[str] = None,
+    k: int = Query(SIMILAR_K_DEFAULT, ge=1, le=SIMILAR_K_MAX),
+    metric: str = "cosine",
+    elements: Optional[str] = None,
+    exclude_elements: Optional[str] = None
+):
+    """
+    检索组成最相似的合金，如 /alloys/similar?composition=FeCoNiCrMn&k=10&elements=Fe
+
+    Args:
+        composition: 查询组成式，支持下标数值、括号与变量（Alx(CoCrFeNi)1-x）、LaTeX 写法
+        identifier / alloy_id: 不传 composition 时，以语料中已有的合金为查询
+        k: 返回的合金数
+        metric: cosine（余弦相似度）或 l1（摩尔分数 L1 距离）
+        elements: 逗号分隔的元素，结果需包含全部这些元素
+        exclude_elements: 逗号分隔的元素，结果不能包含其中任何一个
+
+    Returns:
+        查询组成的摩尔分数与按相似度降序的合金列表
+    """
+    try:
+        return await run_db(
+            find_similar_alloys,
+            composition=composition,
+            identifier=identifier,
+            alloy_id=alloy_id,
+            k=k,
+            metric=metric,
+            elements=elements,
+            exclude_elements=exclude_elements
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"数据库查询失败: {str(e)}")
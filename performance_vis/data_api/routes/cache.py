@@ -0,0 +1,65 @@
+"""
+响应缓存管理路由
+"""
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Request
+
+from ..cache import RESPONSE_CACHE
+from ..config import CACHE_INVALIDATE_TOKEN
+from ..models import CacheInvalidateRequest
+
+router = APIRouter(prefix="/cache", tags=["cache"])
+
+LOCAL_HOSTS = ("127.0.0.1", "::1", "localhost")
+
+
+def check_invalidate_permission(request: Request, token: Optional[str]) -> None:
+    """
+    校验缓存失效请求：配置了 CACHE_INVALIDATE_TOKEN 时要求请求头令牌一致，否则只接受本机请求
+
+    Raises:
+        HTTPException: 令牌缺失（401）、令牌错误或非本机请求（403）
+    """
+    if CACHE_INVALIDATE_TOKEN:
+        if not token:
+            raise HTTPException(status_code=401, detail="缺少 X-Cache-Token")
+        if not hmac.compare_digest(token.encode("utf-8"), CACHE_INVALIDATE_TOKEN.encode("utf-8")):
+            raise HTTPException(status_code=403, detail="X-Cache-Token 无效")
+        return
+    host = request.client.host if request.client else None
+    if host not in LOCAL_HOSTS:
+        raise HTTPException(status_code=403, detail="未配置 HEA_API_TOKEN 时只接受本机请求")
+
+
+@router.post("/invalidate")
+async def invalidate_cache(
+    payload: CacheInvalidateRequest,
+    request: Request,
+    x_cache_token: Optional[str] = Header(None)
+):
+    """
+    显式失效响应缓存（流水线写入新结果后调用）
+
+    Args:
+        payload: 需要失效的论文 identifier 列表，为空时清空全部
+        x_cache_token: 共享令牌（请求头 X-Cache-Token），见 config.CACHE_INVALIDATE_TOKEN
+
+    Returns:
+        删除的缓存条数
+    """
+    check_invalidate_permission(request, x_cache_token)
+    count = RESPONSE_CACHE.invalidate(payload.identifiers)
+    return {"success": True, "invalidated": count}
+
+
+@router.get("/stats")
+async def cache_stats():
+    """
+    获取响应缓存状态
+
+    Returns:
+        缓存条数、容量、TTL 与命中统计
+    """
+    return RESPONSE_CACHE.stats()
@@ -2,6 +2,7 @@
 反馈相关路由
 """
 from fastapi import APIRouter, HTTPException
+from ..database import run_db
 from ..models import FeedbackRequest
 from ..services.feedback_service import submit_feedback
 
@@ -23,7 +24,8 @@ async def create_feedback(feedback: FeedbackRequest):
         HTTPException: 提交失败时抛出异常
     """
     try:
-        success = submit_feedback(
+        success = await run_db(
+            submit_feedback,
             identifier=feedback.identifier,
             alloy_id=feedback.alloy_id,
             location=feedback.location,
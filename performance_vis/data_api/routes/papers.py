@@ -1,43 +1,69 @@
 """
 论文相关 API 路由
 """
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Request
+from typing import List, Optional
 
-from ..models import PaperListItem, PaperDetail
-from ..services.paper_service import get_all_papers, search_papers, get_paper_detail
+from ..cache import cached_json_response
+from ..config import PAPER_PAGE_SIZE, PAPER_PAGE_MAX, SEARCH_PAGE_SIZE, SEARCH_PAGE_MAX
+from ..database import run_db
+from ..models import PaperDetail, PaperPage, PaperSearchPage, SentenceItem
+from ..services.paper_service import get_papers_page, parse_list_fields, get_paper_detail
+from ..services.search_service import search_papers
 
 router = APIRouter(prefix="/papers", tags=["papers"])
 
 
-@router.get("", response_model=List[PaperListItem])
-async def get_all_papers_endpoint():
+@router.get("", response_model=PaperPage)
+async def get_papers_page_endpoint(
+    limit: int = Query(PAPER_PAGE_SIZE, ge=1, le=PAPER_PAGE_MAX),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include_total: bool = False
+):
     """
-    获取所有论文标题列表
+    分页获取论文列表（keyset 分页）
     优先显示的论文会按照配置的顺序显示在前面，其他论文按 identifier 排序显示在后面
     
+    Args:
+        limit: 每页条数
+        cursor: 上一页返回的 next_cursor，不传时从第一页开始
+        fields: 逗号分隔的字段，可选 title, abstract, alloy_elements, topic；不传时只返回 title
+        include_total: 是否返回论文总数
+    
     Returns:
-        包含 identifier 和 title 的论文列表
+        当前页论文列表（identifier 与所选字段）、下一页游标与可选的总数
     """
     try:
-        return get_all_papers()
+        selected = parse_list_fields(fields)
+        return await run_db(get_papers_page, limit, cursor, selected, include_total)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"数据库查询失败: {str(e)}")
 
 
-@router.get("/search", response_model=List[PaperListItem])
-async def search_papers_endpoint(q: str):
+@router.get("/search", response_model=PaperSearchPage)
+async def search_papers_endpoint(
+    q: str,
+    limit: int = Query(SEARCH_PAGE_SIZE, ge=1, le=SEARCH_PAGE_MAX),
+    offset: int = Query(0, ge=0),
+    include_total: bool = False
+):
     """
-    搜索论文标题
+    检索论文（标题、摘要、主题、合金元素），按相关度排序并高亮命中词
     
     Args:
-        q: 搜索关键词（支持任意字符检索）
+        q: 检索词
+        limit: 每页条数
+        offset: 跳过的条数
+        include_total: 是否返回命中总数
     
     Returns:
-        匹配的论文列表
+        检索结果（含 title_highlight / snippet 高亮片段）与下一页 offset
     """
     try:
-        return search_papers(q)
+        return await run_db(search_papers, q, limit, offset, include_total)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -45,10 +71,44 @@ async def search_papers_endpoint(q: str):
 
 
 # 注意：更具体的路由要放在前面，避免被通用路由匹配
+@router.get("/{identifier}/view")
+async def get_paper_view_endpoint(identifier: str, request: Request, fields: Optional[str] = None):
+    """
+    论文页面一次性获取所需数据：基本信息、整合性能数据（含合金详细信息，按数据密度排序）与 PDF 地址
+    代替分别请求 /papers/{identifier}、/performance 与 /pdf，按行版本缓存并支持 ETag / If-None-Match（304）
+    
+    Args:
+        identifier: 论文标识符
+        fields: 逗号分隔的字段，可选 title, abstract, alloy_elements, topic, performance, pdf；不传时返回全部
+    
+    Returns:
+        包含 identifier 与所选字段的字典
+    """
+    from ..services.paper_service import get_paper_view, get_pdf_version, parse_view_fields
+    
+    try:
+        selected = parse_view_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        return await cached_json_response(
+            request, "view:" + ",".join(selected), identifier, ("paper_info", "result_merge", "ex_info"),
+            lambda key: get_paper_view(key, selected),
+            # PDF 文件不在数据表中，其存在与修改时间单独计入版本
+            get_pdf_version if "pdf" in selected else None
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"数据库查询失败: {str(e)}")
+
+
 @router.get("/{identifier}/performance")
-async def get_paper_performance_endpoint(identifier: str):
+async def get_paper_performance_endpoint(identifier: str, request: Request):
     """
     获取论文的整合性能数据（来自 result_merge.merge_result）
+    按 result_merge / ex_info 行版本缓存，支持 ETag / If-None-Match（304）
     
     Args:
         identifier: 论文标识符
@@ -59,12 +119,41 @@ async def get_paper_performance_endpoint(identifier: str):
     from ..services.performance_service import get_paper_performance_data
     
     try:
-        performance_data = get_paper_performance_data(identifier)
-        return performance_data.dict()
+        return await cached_json_response(
+            request, "performance", identifier, ("result_merge", "ex_info"),
+            lambda key: get_paper_performance_data(key).dict()
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/{identifier}/sentences", response_model=List[SentenceItem])
+async def get_paper_sentences_endpoint(identifier: str, ids: Optional[str] = None):
+    """
+    批量获取论文句子（证据句高亮、溯源展示）
+    
+    Args:
+        identifier: 论文标识符
+        ids: 逗号分隔的句子 ID，如 "3,5,12"；不传时返回整篇
+    
+    Returns:
+        句子列表，包含句子文本与在原文中的字符区间
+    """
+    from ..services.sentence_service import get_paper_sentences, parse_sentence_ids
+    
+    try:
+        sentence_ids = parse_sentence_ids(ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        return await run_db(get_paper_sentences, identifier, sentence_ids)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"数据库查询失败: {str(e)}")
+
+
 @router.get("/{identifier}/pdf")
 async def get_paper_pdf_path(identifier: str):
     """
@@ -81,7 +170,7 @@ async def get_paper_pdf_path(identifier: str):
     import os
     
     try:
-        filename = get_paper_filename(identifier)
+        filename = await run_db(get_paper_filename, identifier)
         
         if not filename:
             raise HTTPException(status_code=404, detail=f"未找到 identifier 为 {identifier} 的论文 PDF 文件")
@@ -106,9 +195,10 @@ async def get_paper_pdf_path(identifier: str):
 
 
 @router.get("/{identifier}", response_model=PaperDetail)
-async def get_paper_detail_endpoint(identifier: str):
+async def get_paper_detail_endpoint(identifier: str, request: Request):
     """
     获取论文详情
+    按 paper_info / result_merge 行版本缓存，支持 ETag / If-None-Match（304）
     
     Args:
         identifier: 论文标识符
@@ -117,7 +207,9 @@ async def get_paper_detail_endpoint(identifier: str):
         论文详细信息，包括标题、摘要、研究对象、研究概要和性能数据
     """
     try:
-        return get_paper_detail(identifier)
+        return await cached_json_response(
+            request, "detail", identifier, ("paper_info", "result_merge"), get_paper_detail
+        )
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -16,10 +16,15 @@ async def root():
         message="HEA 论文性能数据 API",
         version=API_VERSION,
         endpoints={
-            "GET /papers": "获取所有论文标题列表",
+            "GET /papers?limit={limit}&cursor={cursor}&fields={fields}": "分页获取论文列表（优先论文在前，游标分页）",
             "GET /papers/{identifier}": "获取论文详情",
             "GET /papers/search?q={query}": "搜索论文标题",
-            "GET /papers/{identifier}/performance": "获取论文多源整合的性能数据（文本/表格/图片）"
+            "GET /papers/{identifier}/performance": "获取论文多源整合的性能数据（文本/表格/图片）",
+            "GET /papers/{identifier}/view?fields={fields}": "一次获取论文信息、整合性能数据与 PDF 地址（可选字段）",
+            "GET /papers/{identifier}/sentences?ids={ids}": "批量获取论文句子（证据溯源）",
+            "GET /alloys/search?current_density={j}&overpotential_max={mV}&electrolyte={name}&elements={symbols}": "按性能范围、电解液与元素检索合金",
+            "GET /alloys/similar?composition={composition}&k={k}&metric={cosine|l1}": "按组成检索相似合金（或 identifier + alloy_id 指定语料中的合金）",
+            "POST /cache/invalidate": "失效论文详情 / 性能数据的响应缓存（需 X-Cache-Token 或本机请求）"
         }
     )
 
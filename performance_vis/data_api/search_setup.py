@@ -0,0 +1,47 @@
+"""
+创建论文检索所需的 PostgreSQL 扩展与索引（见 services/search_service.py）：
+1. pg_trgm 扩展
+2. paper_info 上的加权 tsvector 表达式 GIN 索引（title > topic / alloy_elements > abstract）
+3. paper_info.title 上的三元组 GIN 索引（模糊匹配与 ILIKE 子串匹配）
+
+创建完成后重启 API 服务，SEARCH_BACKEND = auto 时自动切换到 postgres 后端
+
+用法：
+    python -m data_api.search_setup
+"""
+from .database import create_db_connection
+from .services.search_service import SEARCH_DOCUMENT_SQL, SEARCH_INDEX_NAME, TITLE_TRGM_INDEX_NAME
+
+STATEMENTS = [
+    ("pg_trgm 扩展", "CREATE EXTENSION IF NOT EXISTS pg_trgm"),
+    ("全文索引", f"""
+        CREATE INDEX IF NOT EXISTS {SEARCH_INDEX_NAME}
+        ON public.paper_info USING GIN ({SEARCH_DOCUMENT_SQL})
+    """),
+    ("标题三元组索引", f"""
+        CREATE INDEX IF NOT EXISTS {TITLE_TRGM_INDEX_NAME}
+        ON public.paper_info USING GIN (title gin_trgm_ops)
+    """),
+]
+
+
+def main():
+    """主函数：依次创建扩展与索引"""
+    connection = create_db_connection()
+    connection.autocommit = True
+    cursor = connection.cursor()
+    try:
+        for name, statement in STATEMENTS:
+            try:
+                cursor.execute(statement)
+                print(f"✓ {name}")
+            except Exception as e:
+                print(f"✗ {name}: {str(e)}")
+        cursor.execute("ANALYZE public.paper_info")
+    finally:
+        cursor.close()
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
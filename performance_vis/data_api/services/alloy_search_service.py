@@ -0,0 +1,188 @@
+"""
+合金性能检索服务：在扁平表 alloy_performance 上做数值范围与条件过滤
+
+alloy_performance 每篇论文每个合金一行（由 function/alloy_performance.py 在写入 merge_result 后维护），
+过电位 / Tafel 斜率 / 稳定性时长为带索引的数值列，元素集合为 JSONB 数组（GIN 索引），
+例如“1 M KOH 中 η10 < 50 mV 的全部合金”只需一次索引范围查询，不再逐篇解析 merge_result
+"""
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+from ..database import get_db_connection, get_db_cursor, release_db_connection
+from ..models import AlloySearchPage
+
+# ========== 配置参数 ==========
+# 支持的标准电流密度（mA cm^-2）-> 过电位列
+OVERPOTENTIAL_COLUMNS = {
+    10: "overpotential_10",
+    50: "overpotential_50",
+    100: "overpotential_100",
+    500: "overpotential_500",
+    1000: "overpotential_1000",
+}
+# 可排序字段 -> 列（overpotential 按所选电流密度对应的列排序）
+SORT_COLUMNS = {"tafel_slope": "tafel_slope", "stability_hours": "stability_hours", "element_count": "element_count"}
+MOLARITY_TOLERANCE = 1e-6
+
+RESULT_COLUMNS = (
+    "identifier", "alloy_id", "alloy_type", "composition", "elements", "element_count",
+    "electrolyte", "electrolyte_molar", "ph",
+    "overpotential_10", "overpotential_50", "overpotential_100", "overpotential_500", "overpotential_1000",
+    "tafel_slope", "stability_hours", "stability_cycles"
+)
+
+_SUBSCRIPT_TRANSLATION = str.maketrans("₀₁₂₃₄₅₆₇₈₉", "0123456789")
+_ELEMENT_PATTERN = re.compile(r"^[A-Z][a-z]?$")
+
+
+def electrolyte_key(name: str) -> str:
+    """电解液比较键（与 function/alloy_performance.py 写入时一致）：大写、去空白与下标"""
+    return re.sub(r"\s+", "", name.translate(_SUBSCRIPT_TRANSLATION)).upper()
+
+
+def parse_elements(value: Optional[str]) -> List[str]:
+    """
+    解析逗号分隔的元素符号，如 "Fe,Ni" -> ["Fe", "Ni"]
+
+    Raises:
+        ValueError: 存在不合法的元素符号时抛出异常
+    """
+    if not value:
+        return []
+    elements = []
+    for item in value.split(","):
+        symbol = item.strip()
+        if not symbol:
+            continue
+        symbol = symbol[:1].upper() + symbol[1:].lower()
+        if not _ELEMENT_PATTERN.match(symbol):
+            raise ValueError(f"不合法的元素符号: {item.strip()}")
+        if symbol not in elements:
+            elements.append(symbol)
+    return elements
+
+
+def _add_range(conditions: List[str], params: List[Any], column: str, low: Optional[float], high: Optional[float]):
+    """数值列的闭区间过滤"""
+    if low is not None:
+        conditions.append(f"{column} >= %s")
+        params.append(low)
+    if high is not None:
+        conditions.append(f"{column} <= %s")
+        params.append(high)
+
+
+def search_alloys(
+    current_density: int = 10,
+    overpotential_min: Optional[float] = None,
+    overpotential_max: Optional[float] = None,
+    tafel_min: Optional[float] = None,
+    tafel_max: Optional[float] = None,
+    stability_min_hours: Optional[float] = None,
+    electrolyte: Optional[str] = None,
+    molarity: Optional[float] = None,
+    ph_min: Optional[float] = None,
+    ph_max: Optional[float] = None,
+    elements: Optional[str] = None,
+    exclude_elements: Optional[str] = None,
+    element_count_min: Optional[int] = None,
+    element_count_max: Optional[int] = None,
+    sort: str = "overpotential",
+    order: str = "asc",
+    limit: int = 50,
+    offset: int = 0,
+    include_total: bool = False
+) -> AlloySearchPage:
+    """
+    按性能范围与条件检索合金
+
+    Args:
+        current_density: 过电位对应的电流密度（mA cm^-2），可选 10 / 50 / 100 / 500 / 1000
+        overpotential_min / overpotential_max: 该电流密度下过电位范围（mV，绝对值）
+        tafel_min / tafel_max: Tafel 斜率范围（mV dec^-1）
+        stability_min_hours: 稳定性测试时长下限（h）
+        electrolyte: 电解液成分（忽略大小写、空白与下标），如 KOH
+        molarity: 电解液摩尔浓度（mol/L）
+        ph_min / ph_max: pH 范围
+        elements: 逗号分隔的元素，合金需包含全部这些元素
+        exclude_elements: 逗号分隔的元素，合金不能包含其中任何一个
+        element_count_min / element_count_max: 元素种数范围
+        sort: 排序字段，可选 overpotential, tafel_slope, stability_hours, element_count
+        order: asc 或 desc（空值总是排在最后）
+        limit: 每页条数
+        offset: 跳过的条数
+        include_total: 是否返回命中总数
+
+    Returns:
+        命中的合金行（含论文标题）、下一页 offset 与可选的总数
+
+    Raises:
+        ValueError: 参数不合法时抛出异常
+        Exception: 数据库查询失败时抛出异常
+    """
+    overpotential_column = OVERPOTENTIAL_COLUMNS.get(current_density)
+    if overpotential_column is None:
+        raise ValueError(f"不支持的电流密度: {current_density}，可选 {', '.join(map(str, OVERPOTENTIAL_COLUMNS))}")
+    if sort == "overpotential":
+        sort_column = overpotential_column
+    elif sort in SORT_COLUMNS:
+        sort_column = SORT_COLUMNS[sort]
+    else:
+        raise ValueError(f"不支持的排序字段: {sort}")
+    if order not in ("asc", "desc"):
+        raise ValueError(f"不支持的排序方向: {order}")
+
+    conditions: List[str] = []
+    params: List[Any] = []
+    _add_range(conditions, params, overpotential_column, overpotential_min, overpotential_max)
+    _add_range(conditions, params, "tafel_slope", tafel_min, tafel_max)
+    _add_range(conditions, params, "stability_hours", stability_min_hours, None)
+    _add_range(conditions, params, "ph", ph_min, ph_max)
+    _add_range(conditions, params, "element_count", element_count_min, element_count_max)
+    if electrolyte and electrolyte.strip():
+        conditions.append("electrolyte_key = %s")
+        params.append(electrolyte_key(electrolyte))
+    if molarity is not None:
+        _add_range(conditions, params, "electrolyte_molar", molarity - MOLARITY_TOLERANCE, molarity + MOLARITY_TOLERANCE)
+
+    included = parse_elements(elements)
+    if included:
+        conditions.append("elements @> %s::jsonb")
+        params.append(json.dumps(included))
+    excluded = parse_elements(exclude_elements)
+    if excluded:
+        conditions.append("NOT (elements ?| %s::text[])")
+        params.append(excluded)
+
+    where_sql = "WHERE " + " AND ".join(conditions) if conditions else ""
+    columns_sql = ", ".join(f"a.{column}" for column in RESULT_COLUMNS)
+
+    connection = None
+    cursor = None
+    try:
+        connection = get_db_connection()
+        cursor = get_db_cursor(connection)
+        cursor.execute(f"""
+            SELECT {columns_sql},
+                   (SELECT p.title FROM public.paper_info p WHERE p.identifier = a.identifier LIMIT 1) AS title
+            FROM public.alloy_performance a
+            {where_sql}
+            ORDER BY a.{sort_column} {order.upper()} NULLS LAST, a.id
+            LIMIT %s OFFSET %s
+        """, params + [limit + 1, offset])
+        rows = cursor.fetchall()
+
+        total = None
+        if include_total:
+            cursor.execute(f"SELECT COUNT(*) AS total FROM public.alloy_performance a {where_sql}", params)
+            total = cursor.fetchone()["total"]
+    finally:
+        if cursor:
+            cursor.close()
+        if connection:
+            release_db_connection(connection)
+
+    items: List[Dict[str, Any]] = [dict(row) for row in rows[:limit]]
+    next_offset = offset + limit if len(rows) > limit else None
+    return AlloySearchPage(items=items, next_offset=next_offset, total=total)
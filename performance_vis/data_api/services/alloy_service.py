@@ -2,8 +2,12 @@
 合金详细信息相关业务逻辑服务
 """
 import json
+import re
 from typing import Dict, Any, Optional, List
-from ..database import get_db_connection, get_db_cursor
+from ..database import get_db_connection, get_db_cursor, release_db_connection
+
+# 归一化 id / 别名时去掉的字符（空白、连字符、下划线、括号等）
+_NORMALIZE_PATTERN = re.compile(r"[\s\-_–—()\[\]{}·.,]+")
 
 
 def parse_json_field(value: Any) -> Any:
@@ -20,25 +24,152 @@ def parse_json_field(value: Any) -> Any:
     return value
 
 
-def get_alloy_details(identifier: str, alloy_id: str) -> Optional[Dict[str, Any]]:
+def normalize_alloy_id(value: Any) -> str:
+    """归一化合金 id / 别名：忽略大小写与分隔符，如 "FeCoNi-HEA (a)" -> "feconiheaa" """
+    if value is None:
+        return ""
+    return _NORMALIZE_PATTERN.sub("", str(value)).lower()
+
+
+def build_alloy_details(alloy: Dict[str, Any]) -> Dict[str, Any]:
     """
-    根据 identifier 和 alloy_id 获取合金详细信息
-    
+    构建返回给前端的合金详细信息
+
+    Args:
+        alloy: alloy_info.core_alloys 中的一项
+
+    Returns:
+        包含 id, type, aliases, composition, precursor_id, evidence_source 的字典
+    """
+    return {
+        "id": alloy.get("id"),
+        "type": alloy.get("type"),
+        "aliases": alloy.get("aliases", []),
+        "composition": alloy.get("composition"),
+        "precursor_id": alloy.get("precursor_id"),
+        "evidence_source": alloy.get("evidence_source", [])
+    }
+
+
+class AlloyIndex:
+    """
+    单篇论文 core_alloys 的查找索引
+
+    匹配优先级：
+    1. 与逐项扫描一致：按 core_alloys 顺序，第一个 id 精确相等或与 alloy_id 互为子串的合金
+       （精确匹配的位置作为扫描上界，只有其前面的合金需要做子串判断）
+    2. 以上均未命中时：别名精确匹配，再按归一化后的 id / 别名匹配
+
+    Args:
+        core_alloys: alloy_info.core_alloys 列表
+    """
+
+    def __init__(self, core_alloys: List[Any]):
+        self.alloys = [alloy for alloy in core_alloys if isinstance(alloy, dict)]
+        self._exact = {}        # id -> 第一个位置
+        self._alias = {}        # 别名 -> 第一个位置
+        self._normalized = {}   # 归一化 id / 别名 -> 第一个位置（id 优先于别名）
+
+        for position, alloy in enumerate(self.alloys):
+            alloy_id = alloy.get("id")
+            try:
+                self._exact.setdefault(alloy_id, position)
+            except TypeError:
+                pass
+            normalized = normalize_alloy_id(alloy_id)
+            if normalized:
+                self._normalized.setdefault(normalized, position)
+
+        for position, alloy in enumerate(self.alloys):
+            aliases = alloy.get("aliases")
+            if not isinstance(aliases, list):
+                continue
+            for alias in aliases:
+                if not isinstance(alias, str) or not alias:
+                    continue
+                self._alias.setdefault(alias, position)
+                normalized = normalize_alloy_id(alias)
+                if normalized:
+                    self._normalized.setdefault(normalized, position)
+
+    def find(self, alloy_id: Any) -> Optional[Dict[str, Any]]:
+        """
+        查找 alloy_id 对应的合金
+
+        Args:
+            alloy_id: extraction_results 中的 alloy_id
+
+        Returns:
+            core_alloys 中匹配的合金，未找到时返回 None
+        """
+        try:
+            exact = self._exact.get(alloy_id)
+        except TypeError:
+            exact = None
+
+        # 精确匹配之前的合金可能先以子串方式命中
+        limit = len(self.alloys) if exact is None else exact
+        if alloy_id and isinstance(alloy_id, str):
+            for alloy in self.alloys[:limit]:
+                alloy_id_in_data = alloy.get("id")
+                if alloy_id_in_data and (alloy_id in str(alloy_id_in_data) or str(alloy_id_in_data) in alloy_id):
+                    return alloy
+        if exact is not None:
+            return self.alloys[exact]
+
+        if isinstance(alloy_id, str):
+            position = self._alias.get(alloy_id)
+            if position is None:
+                normalized = normalize_alloy_id(alloy_id)
+                position = self._normalized.get(normalized) if normalized else None
+            if position is not None:
+                return self.alloys[position]
+        return None
+
+    def get_details(self, alloy_id: Any) -> Optional[Dict[str, Any]]:
+        """查找 alloy_id 并返回合金详细信息，未找到时返回 None"""
+        alloy = self.find(alloy_id)
+        return build_alloy_details(alloy) if alloy is not None else None
+
+
+def build_alloy_index(alloy_info: Any) -> Optional[AlloyIndex]:
+    """
+    由 ex_info.alloy_info 字段值构建合金索引
+
+    Args:
+        alloy_info: alloy_info 字段（dict 或 JSON 字符串）
+
+    Returns:
+        AlloyIndex；alloy_info 为空或格式不正确时返回 None
+    """
+    alloy_result = parse_json_field(alloy_info)
+    if not alloy_result or not isinstance(alloy_result, dict):
+        return None
+
+    core_alloys = alloy_result.get("core_alloys", [])
+    if not isinstance(core_alloys, list):
+        return None
+
+    return AlloyIndex(core_alloys)
+
+
+def get_alloy_index(identifier: str) -> Optional[AlloyIndex]:
+    """
+    读取论文的 ex_info.alloy_info 并构建合金索引（一次查询）
+
     Args:
         identifier: 论文标识符
-        alloy_id: 合金 ID
-    
+
     Returns:
-        合金详细信息，包含 id, type, aliases, composition, precursor_id
-        如果未找到则返回 None
+        AlloyIndex；论文没有可用的 alloy_info 时返回 None
     """
     connection = None
     cursor = None
-    
+
     try:
         connection = get_db_connection()
         cursor = get_db_cursor(connection)
-        
+
         # 查询 ex_info 表的 alloy_info 字段
         cursor.execute("""
             SELECT alloy_info
@@ -49,81 +180,69 @@ def get_alloy_details(identifier: str, alloy_id: str) -> Optional[Dict[str, Any]
             ORDER BY id DESC
             LIMIT 1
         """, (identifier,))
-        
+
         row = cursor.fetchone()
         if not row or "alloy_info" not in row:
             return None
-        
-        # 解析 alloy_info
-        alloy_result = parse_json_field(row["alloy_info"])
-        if not alloy_result or not isinstance(alloy_result, dict):
-            return None
-        
-        # 查找匹配的合金
-        core_alloys = alloy_result.get("core_alloys", [])
-        if not isinstance(core_alloys, list):
-            return None
-        
-        # 根据 alloy_id 匹配合金（匹配 id 字段，支持精确匹配和部分匹配）
-        for alloy in core_alloys:
-            if not isinstance(alloy, dict):
-                continue
-            
-            alloy_id_in_data = alloy.get("id")
-            # 精确匹配
-            if alloy_id_in_data == alloy_id:
-                return {
-                    "id": alloy.get("id"),
-                    "type": alloy.get("type"),
-                    "aliases": alloy.get("aliases", []),
-                    "composition": alloy.get("composition"),
-                    "precursor_id": alloy.get("precursor_id"),
-                    "evidence_source": alloy.get("evidence_source", [])
-                }
-            # 部分匹配：如果 alloy_id 包含在 id 中，或者 id 包含在 alloy_id 中
-            if alloy_id_in_data and alloy_id:
-                if alloy_id in str(alloy_id_in_data) or str(alloy_id_in_data) in alloy_id:
-                    return {
-                        "id": alloy.get("id"),
-                        "type": alloy.get("type"),
-                        "aliases": alloy.get("aliases", []),
-                        "composition": alloy.get("composition"),
-                        "precursor_id": alloy.get("precursor_id"),
-                        "evidence_source": alloy.get("evidence_source", [])
-                    }
-        
-        return None
-        
+
+        return build_alloy_index(row["alloy_info"])
+
     finally:
         if cursor:
             cursor.close()
         if connection:
-            connection.close()
+            release_db_connection(connection)
+
 
+def get_alloy_details(identifier: str, alloy_id: str) -> Optional[Dict[str, Any]]:
+    """
+    根据 identifier 和 alloy_id 获取合金详细信息
+
+    Args:
+        identifier: 论文标识符
+        alloy_id: 合金 ID
+
+    Returns:
+        合金详细信息，包含 id, type, aliases, composition, precursor_id
+        如果未找到则返回 None
+    """
+    alloy_index = get_alloy_index(identifier)
+    if alloy_index is None:
+        return None
+    return alloy_index.get_details(alloy_id)
 
-def enrich_alloys_with_details(identifier: str, extraction_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+
+def enrich_alloys_with_details(
+    identifier: str,
+    extraction_results: List[Dict[str, Any]],
+    alloy_index: Optional[AlloyIndex] = None
+) -> List[Dict[str, Any]]:
     """
     为 extraction_results 中的每个合金添加详细信息
-    
+    alloy_info 每篇论文只查询、解析一次，所有合金在同一个索引上匹配
+
     Args:
         identifier: 论文标识符
         extraction_results: 性能数据中的 extraction_results 列表
-    
+        alloy_index: 已构建的合金索引（调用方已读取 alloy_info 时传入，不再查询数据库）
+
     Returns:
         添加了详细信息的 extraction_results 列表
     """
     if not extraction_results or not isinstance(extraction_results, list):
         return extraction_results
-    
+
+    if alloy_index is None and any(isinstance(alloy, dict) and alloy.get("alloy_id") for alloy in extraction_results):
+        alloy_index = get_alloy_index(identifier)
+
     enriched_results = []
     for alloy in extraction_results:
         alloy_id = alloy.get("alloy_id")
-        if alloy_id:
-            details = get_alloy_details(identifier, alloy_id)
+        if alloy_id and alloy_index is not None:
+            details = alloy_index.get_details(alloy_id)
             if details:
                 alloy = alloy.copy()
                 alloy["alloy_details"] = details
         enriched_results.append(alloy)
-    
-    return enriched_results
 
+    return enriched_results
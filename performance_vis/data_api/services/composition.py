@@ -0,0 +1,42 @@
+"""
+合金组成向量：把组成式转换为固定元素基（按原子序数排列的 ELEMENTS）上的摩尔分数向量
+
+组成式解析使用流水线的 function/composition.py（alloy_performance 表的元素集合由同一模块生成），
+保证 /alloys/search 的元素过滤与 /alloys/similar 的组成向量对同一合金给出相同的元素集合
+"""
+import importlib.util
+from typing import Dict
+
+import numpy as np
+
+from ..config import PIPELINE_DIR
+
+
+def _load_pipeline_composition():
+    """按文件路径加载 function/composition.py（只依赖标准库，不引入流水线的其他模块）"""
+    spec = importlib.util.spec_from_file_location("hea_pipeline_composition", PIPELINE_DIR / "composition.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+_composition = _load_pipeline_composition()
+
+ELEMENTS = _composition.ELEMENTS
+ELEMENT_INDEX = _composition.ELEMENT_INDEX
+parse_composition = _composition.parse_composition
+
+
+def composition_vector(fractions: Dict[str, float]) -> np.ndarray:
+    """摩尔分数字典 -> ELEMENTS 基上的 float64 向量"""
+    vector = np.zeros(len(ELEMENTS), dtype=np.float64)
+    for symbol, fraction in fractions.items():
+        index = ELEMENT_INDEX.get(symbol)
+        if index is not None:
+            vector[index] = fraction
+    return vector
+
+
+def vector_fractions(vector: np.ndarray, digits: int = 4) -> Dict[str, float]:
+    """向量 -> 非零分量的摩尔分数字典（按原子序数排列）"""
+    return {ELEMENTS[index]: round(float(vector[index]), digits) for index in np.flatnonzero(vector)}
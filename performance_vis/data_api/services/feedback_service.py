@@ -2,7 +2,7 @@
 反馈服务模块
 """
 from typing import Optional
-from ..database import get_db_connection, get_db_cursor
+from ..database import get_db_connection, get_db_cursor, release_db_connection
 
 
 def submit_feedback(identifier: str, alloy_id: str, location: str, type: str, problem: str) -> bool:
@@ -46,5 +46,5 @@ def submit_feedback(identifier: str, alloy_id: str, location: str, type: str, pr
         if cursor:
             cursor.close()
         if connection:
-            connection.close()
+            release_db_connection(connection)
 
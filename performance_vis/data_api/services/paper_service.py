@@ -1,13 +1,23 @@
 """
 论文相关业务逻辑服务
 """
+import base64
 import json
+import os
 from typing import List, Dict, Any, Optional
 from psycopg2.extras import RealDictCursor  # type: ignore
 
-from ..database import get_db_connection, get_db_cursor
-from ..config import PRIORITY_IDENTIFIERS
-from ..models import PaperListItem, PaperDetail
+from ..database import get_db_connection, get_db_cursor, release_db_connection
+from ..config import PRIORITY_IDENTIFIERS, PDF_DIR
+from ..models import PaperDetail, PaperPage
+
+# 论文列表（GET /papers）可选择的字段，identifier 总是返回
+PAPER_LIST_FIELDS = ("title", "abstract", "alloy_elements", "topic")
+
+# 论文视图（GET /papers/{identifier}/view）可选择的字段
+PAPER_VIEW_FIELDS = ("title", "abstract", "alloy_elements", "topic", "performance", "pdf")
+# 需要按 JSON 解析的 paper_info 字段
+_JSON_INFO_FIELDS = ("abstract", "alloy_elements", "topic")
 
 
 def parse_json_field(value: Any) -> Any:
@@ -32,121 +42,167 @@ def parse_json_field(value: Any) -> Any:
     return value
 
 
-def get_all_papers() -> List[PaperListItem]:
+def encode_page_cursor(phase: str, value: Any) -> str:
     """
-    获取所有论文标题列表
-    优先显示的论文会按照配置的顺序显示在前面，其他论文按 identifier 排序显示在后面
-    
+    编码分页游标
+
+    Args:
+        phase: priority（value 为 PRIORITY_IDENTIFIERS 中的下标）或 rest（value 为上一页最后的 identifier）
+        value: 游标位置
+
     Returns:
-        包含 identifier 和 title 的论文列表
-    
+        URL 安全的游标字符串
+    """
+    raw = json.dumps([phase, value], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_page_cursor(cursor: str):
+    """
+    解码分页游标
+
+    Returns:
+        (phase, value)
+
     Raises:
-        Exception: 数据库查询失败时抛出异常
+        ValueError: 游标格式不正确时抛出异常
     """
-    connection = None
-    cursor = None
-    
     try:
-        connection = get_db_connection()
-        cursor = get_db_cursor(connection)
-        
-        # 查询所有论文的 identifier 和 title
-        cursor.execute("""
-            SELECT identifier, title
-            FROM public.paper_info
-        """)
-        
-        results = cursor.fetchall()
-        
-        # 转换为字典列表
-        all_papers = [
-            {
-                "identifier": row["identifier"],
-                "title": row["title"] if row["title"] else ""
-            }
-            for row in results
-        ]
-        
-        # 创建 identifier 到论文的映射
-        paper_dict = {paper["identifier"]: paper for paper in all_papers}
-        
-        # 按照优先级顺序提取优先显示的论文
-        priority_papers = []
-        for identifier in PRIORITY_IDENTIFIERS:
-            if identifier in paper_dict:
-                priority_papers.append(paper_dict[identifier])
-        
-        # 提取其他论文（不在优先级列表中的）
-        other_papers = [
-            paper for paper in all_papers
-            if paper["identifier"] not in PRIORITY_IDENTIFIERS
-        ]
-        # 其他论文按 identifier 排序
-        other_papers.sort(key=lambda x: x["identifier"])
-        
-        # 合并：优先显示的在前，其他的在后
-        papers = priority_papers + other_papers
-        
-        return [PaperListItem(**paper) for paper in papers]
-        
-    finally:
-        if cursor:
-            cursor.close()
-        if connection:
-            connection.close()
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        phase, value = json.loads(raw.decode("utf-8"))
+    except Exception:
+        raise ValueError(f"无效的分页游标: {cursor}")
+    if phase == "priority" and isinstance(value, int) and value >= 0:
+        return phase, value
+    if phase == "rest" and (value is None or isinstance(value, str)):
+        return phase, value
+    raise ValueError(f"无效的分页游标: {cursor}")
 
 
-def search_papers(query: str) -> List[PaperListItem]:
+def parse_list_fields(fields: Optional[str]) -> List[str]:
     """
-    搜索论文标题
-    
+    解析论文列表的字段选择参数
+
     Args:
-        query: 搜索关键词（支持任意字符检索）
-    
+        fields: 逗号分隔的字段，为空时只返回 title
+
     Returns:
-        匹配的论文列表
-    
+        按 PAPER_LIST_FIELDS 顺序排列的字段列表
+
     Raises:
-        ValueError: 搜索关键词为空时抛出异常
+        ValueError: 包含不支持的字段时抛出异常
+    """
+    if not fields or not fields.strip():
+        return ["title"]
+    requested = {item.strip() for item in fields.split(",") if item.strip()} - {"identifier"}
+    unknown = requested - set(PAPER_LIST_FIELDS)
+    if unknown:
+        raise ValueError(f"不支持的字段: {', '.join(sorted(unknown))}（可选: {', '.join(PAPER_LIST_FIELDS)}）")
+    return [field for field in PAPER_LIST_FIELDS if field in requested]
+
+
+def _list_item(row: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """把 paper_info 行转换为列表项"""
+    item = {"identifier": row["identifier"]}
+    for field in fields:
+        if field == "title":
+            item["title"] = row["title"] if row["title"] else ""
+        else:
+            item[field] = parse_json_field(row.get(field))
+    return item
+
+
+def get_papers_page(
+    limit: int,
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    include_total: bool = False
+) -> PaperPage:
+    """
+    分页获取论文列表（keyset 分页）
+    优先显示的论文（PRIORITY_IDENTIFIERS）按配置顺序在前，其他论文按 identifier 排序
+    1. 优先阶段：按 identifier = ANY(...) 读取剩余的优先论文（数量受配置列表限制）
+    2. 其他阶段：WHERE identifier > 上一页最后的 identifier ORDER BY identifier LIMIT n，
+       每次请求的工作量只与页大小有关
+
+    Args:
+        limit: 每页条数
+        cursor: 上一页返回的 next_cursor，为空时从第一页开始
+        fields: PAPER_LIST_FIELDS 中的字段，为 None 时只返回 title
+        include_total: 是否返回论文总数（需要额外的 COUNT 查询）
+
+    Returns:
+        PaperPage
+
+    Raises:
+        ValueError: 游标无效时抛出异常
         Exception: 数据库查询失败时抛出异常
     """
-    if not query or not query.strip():
-        raise ValueError("搜索关键词不能为空")
-    
+    fields = ["title"] if fields is None else fields
+    phase, value = decode_page_cursor(cursor) if cursor else ("priority", 0)
+    columns = ", ".join(["identifier"] + fields)
+
     connection = None
-    cursor = None
-    
+    cursor_obj = None
+
     try:
         connection = get_db_connection()
-        cursor = get_db_cursor(connection)
-        
-        # 使用 ILIKE 进行不区分大小写的模糊匹配
-        search_pattern = f"%{query.strip()}%"
-        cursor.execute("""
-            SELECT identifier, title
-            FROM public.paper_info
-            WHERE title ILIKE %s
-            ORDER BY identifier
-        """, (search_pattern,))
-        
-        results = cursor.fetchall()
-        
-        # 转换为字典列表
-        papers = [
-            {
-                "identifier": row["identifier"],
-                "title": row["title"] if row["title"] else ""
-            }
-            for row in results
-        ]
-        
-        return [PaperListItem(**paper) for paper in papers]
-        
+        cursor_obj = get_db_cursor(connection)
+
+        items = []
+        next_cursor = None
+        after = value if phase == "rest" else None
+
+        if phase == "priority":
+            pending = PRIORITY_IDENTIFIERS[value:]
+            if pending:
+                cursor_obj.execute(f"""
+                    SELECT {columns}
+                    FROM public.paper_info
+                    WHERE identifier = ANY(%s)
+                """, (pending,))
+                rows = {row["identifier"]: row for row in cursor_obj.fetchall()}
+                for offset, identifier in enumerate(pending):
+                    if identifier not in rows:
+                        continue
+                    if len(items) == limit:
+                        next_cursor = encode_page_cursor("priority", value + offset)
+                        break
+                    items.append(_list_item(rows[identifier], fields))
+
+        if next_cursor is None:
+            # 多取一条判断是否还有下一页
+            remaining = limit - len(items)
+            conditions = ["identifier <> ALL(%s)"]
+            params = [list(PRIORITY_IDENTIFIERS)]
+            if after is not None:
+                conditions.append("identifier > %s")
+                params.append(after)
+            cursor_obj.execute(f"""
+                SELECT {columns}
+                FROM public.paper_info
+                WHERE {" AND ".join(conditions)}
+                ORDER BY identifier
+                LIMIT %s
+            """, (*params, remaining + 1))
+            rows = cursor_obj.fetchall()
+            items.extend(_list_item(row, fields) for row in rows[:remaining])
+            if len(rows) > remaining:
+                last = rows[remaining - 1]["identifier"] if remaining > 0 else after
+                next_cursor = encode_page_cursor("rest", last)
+
+        total = None
+        if include_total:
+            cursor_obj.execute("SELECT COUNT(*) AS total FROM public.paper_info")
+            total = cursor_obj.fetchone()["total"]
+
+        return PaperPage(items=items, next_cursor=next_cursor, total=total)
+
     finally:
-        if cursor:
-            cursor.close()
+        if cursor_obj:
+            cursor_obj.close()
         if connection:
-            connection.close()
+            release_db_connection(connection)
 
 
 def get_paper_detail(identifier: str) -> PaperDetail:
@@ -212,7 +268,7 @@ def get_paper_detail(identifier: str) -> PaperDetail:
         if cursor:
             cursor.close()
         if connection:
-            connection.close()
+            release_db_connection(connection)
 
 
 def get_paper_filename(identifier: str) -> Optional[str]:
@@ -255,5 +311,151 @@ def get_paper_filename(identifier: str) -> Optional[str]:
         if cursor:
             cursor.close()
         if connection:
-            connection.close()
+            release_db_connection(connection)
+
+
+
+def get_pdf_version(identifier: str) -> str:
+    """
+    PDF 文件的版本（是否存在及修改时间），用于 /view 的缓存校验：
+    PDF 增删或替换时版本改变，缓存的 pdf 字段随之失效
+
+    Args:
+        identifier: 论文标识符
+
+    Returns:
+        版本字符串，如 "pdf=1718000000000000000"；没有文件时为 "pdf="
+
+    Raises:
+        Exception: 数据库查询失败时抛出异常
+    """
+    filename = get_paper_filename(identifier)
+    if not filename:
+        return "pdf="
+    try:
+        return f"pdf={os.stat(os.path.join(PDF_DIR, f'{filename}.pdf')).st_mtime_ns}"
+    except OSError:
+        return "pdf="
+
+
+def parse_view_fields(fields: Optional[str]) -> List[str]:
+    """
+    解析逗号分隔的字段选择参数
+
+    Args:
+        fields: 如 "title,performance"，为空时返回全部字段
+
+    Returns:
+        按 PAPER_VIEW_FIELDS 顺序排列的字段列表
+
+    Raises:
+        ValueError: 包含不支持的字段时抛出异常
+    """
+    if not fields or not fields.strip():
+        return list(PAPER_VIEW_FIELDS)
+    requested = {item.strip() for item in fields.split(",") if item.strip()}
+    unknown = requested - set(PAPER_VIEW_FIELDS)
+    if unknown:
+        raise ValueError(f"不支持的字段: {', '.join(sorted(unknown))}（可选: {', '.join(PAPER_VIEW_FIELDS)}）")
+    return [field for field in PAPER_VIEW_FIELDS if field in requested]
+
+
+def get_paper_view(identifier: str, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    获取论文视图：基本信息、整合性能数据（含合金详细信息，按数据密度排序）与 PDF 地址
+    所选字段在一次查询中读取（merge_result / alloy_info / filename 为子查询），JSONB 只解析一次
+
+    Args:
+        identifier: 论文标识符
+        fields: PAPER_VIEW_FIELDS 中的字段，为 None 时返回全部
+
+    Returns:
+        包含 identifier 与所选字段的字典
+
+    Raises:
+        ValueError: 未找到论文时抛出异常
+        Exception: 数据库查询失败时抛出异常
+    """
+    from .alloy_service import AlloyIndex, build_alloy_index
+    from .performance_service import prepare_merge_result
+
+    fields = list(PAPER_VIEW_FIELDS) if fields is None else fields
+    columns = ["p.identifier"]
+    columns.extend(f"p.{field}" for field in ("title",) + _JSON_INFO_FIELDS if field in fields)
+    if "performance" in fields:
+        columns.append("""(
+                SELECT merge_result
+                FROM public.result_merge r
+                WHERE r.identifier = p.identifier
+                  AND merge_result IS NOT NULL
+                  AND merge_result::text != 'null'::text
+                ORDER BY r.id DESC
+                LIMIT 1
+            ) AS merge_result""")
+        columns.append("""(
+                SELECT alloy_info
+                FROM public.ex_info e
+                WHERE e.identifier = p.identifier
+                  AND alloy_info IS NOT NULL
+                  AND alloy_info::text != 'null'::text
+                ORDER BY e.id DESC
+                LIMIT 1
+            ) AS alloy_info""")
+    if "pdf" in fields:
+        columns.append("""(
+                SELECT filename
+                FROM public.ex_info e
+                WHERE e.identifier = p.identifier
+                ORDER BY e.id DESC
+                LIMIT 1
+            ) AS filename""")
+
+    connection = None
+    cursor = None
+
+    try:
+        connection = get_db_connection()
+        cursor = get_db_cursor(connection)
+
+        cursor.execute(f"""
+            SELECT {", ".join(columns)}
+            FROM public.paper_info p
+            WHERE p.identifier = %s
+        """, (identifier,))
+
+        row = cursor.fetchone()
+
+    finally:
+        if cursor:
+            cursor.close()
+        if connection:
+            release_db_connection(connection)
+
+    if not row:
+        raise ValueError(f"未找到 identifier 为 {identifier} 的论文")
+
+    result = {"identifier": row["identifier"]}
+    if "title" in fields:
+        result["title"] = row["title"] if row["title"] else ""
+    for field in _JSON_INFO_FIELDS:
+        if field in fields:
+            result[field] = parse_json_field(row.get(field))
+
+    if "performance" in fields:
+        merge_result = parse_json_field(row.get("merge_result"))
+        if isinstance(merge_result, dict):
+            # 没有 alloy_info 时用空索引，避免再次查询
+            alloy_index = build_alloy_index(row.get("alloy_info")) or AlloyIndex([])
+            merge_result = prepare_merge_result(identifier, merge_result, alloy_index)
+        else:
+            merge_result = {}
+        result["performance"] = merge_result
+
+    if "pdf" in fields:
+        filename = row.get("filename")
+        pdf = None
+        if filename and os.path.exists(os.path.join(PDF_DIR, f"{filename}.pdf")):
+            pdf = {"filename": filename, "url": f"/static_pdfs/{filename}.pdf"}
+        result["pdf"] = pdf
 
+    return result
@@ -3,10 +3,39 @@
 """
 from ..get_performance_data import get_performance_data
 from ..models import PerformanceData
-from .alloy_service import enrich_alloys_with_details
+from typing import Any, Dict, Optional
+
+from .alloy_service import AlloyIndex, enrich_alloys_with_details
 from .alloy_sorting import sort_alloys_by_density
 
 
+def prepare_merge_result(
+    identifier: str,
+    merge_result: Dict[str, Any],
+    alloy_index: Optional[AlloyIndex] = None
+) -> Dict[str, Any]:
+    """
+    为 merge_result 的 extraction_results 添加合金详细信息，并按数据密度排序（原地修改）
+    
+    Args:
+        identifier: 论文标识符
+        merge_result: 已解析的 merge_result
+        alloy_index: 已构建的合金索引，为 None 时按 identifier 查询
+    
+    Returns:
+        处理后的 merge_result
+    """
+    if "extraction_results" in merge_result:
+        enriched_results = enrich_alloys_with_details(
+            identifier,
+            merge_result["extraction_results"],
+            alloy_index
+        )
+        # 按数据密度排序（密度高的在前）
+        merge_result["extraction_results"] = sort_alloys_by_density(enriched_results)
+    return merge_result
+
+
 def get_paper_performance_data(identifier: str) -> PerformanceData:
     """
     获取论文的整合性能数据（来自 result_merge.merge_result）
@@ -23,16 +52,7 @@ def get_paper_performance_data(identifier: str) -> PerformanceData:
     """
     try:
         performance_data = get_performance_data(identifier)
-        merge_result = performance_data.get("merge_result", {})
-        
-        # 为 extraction_results 中的每个合金添加详细信息
-        if "extraction_results" in merge_result:
-            enriched_results = enrich_alloys_with_details(
-                identifier,
-                merge_result["extraction_results"]
-            )
-            # 按数据密度排序（密度高的在前）
-            merge_result["extraction_results"] = sort_alloys_by_density(enriched_results)
+        prepare_merge_result(identifier, performance_data.get("merge_result", {}))
         
         return PerformanceData(**performance_data)
     except Exception as e:
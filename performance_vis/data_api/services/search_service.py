@@ -0,0 +1,348 @@
+"""
+论文检索服务：在 title / abstract / topic / alloy_elements 上做全文检索，结果按相关度排序、带高亮并分页
+
+两种后端（SEARCH_BACKEND = auto 时自动选择）：
+1. postgres：paper_info 上的加权 tsvector 表达式 GIN 索引 + pg_trgm 标题索引
+   （由 python -m data_api.search_setup 创建），ts_rank_cd + word_similarity 排序，ts_headline 高亮
+2. memory：索引或 pg_trgm 不可用时，在进程内基于 paper_info 构建倒排索引（BM25 + 前缀匹配），
+   每 SEARCH_INDEX_TTL 秒重建一次
+"""
+import bisect
+import heapq
+import json
+import math
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..config import SEARCH_BACKEND, SEARCH_INDEX_TTL
+from ..database import get_db_connection, get_db_cursor, release_db_connection
+from ..models import PaperSearchPage
+
+# ========== 配置参数 ==========
+# PostgreSQL 全文检索配置（英文词干），索引与查询必须使用相同的表达式
+SEARCH_TS_CONFIG = "english"
+SEARCH_DOCUMENT_SQL = (
+    "(setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(topic::text, '') || ' ' || coalesce(alloy_elements::text, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(abstract::text, '')), 'C'))"
+)
+SEARCH_INDEX_NAME = "idx_paper_info_search"
+TITLE_TRGM_INDEX_NAME = "idx_paper_info_title_trgm"
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+SNIPPET_WORDS = 30
+
+# 内存倒排索引：各字段权重与 BM25 参数
+FIELD_WEIGHTS = {"title": 3.0, "topic": 2.0, "alloy_elements": 2.0, "abstract": 1.0}
+BM25_K1 = 1.2
+BM25_B = 0.75
+PREFIX_MIN_LENGTH = 3        # 不少于该长度的查询词同时做前缀匹配
+PREFIX_WEIGHT = 0.5          # 前缀匹配的得分折扣
+TITLE_SUBSTRING_BONUS = 2.0  # 查询串是标题子串时的加分（兼容原 ILIKE 行为）
+
+_TOKEN_PATTERN = re.compile(r"[0-9a-z一-鿿]+")
+_WORD_PATTERN = re.compile(r"[0-9A-Za-z一-鿿]+")
+
+
+def flatten_text(value: Any) -> str:
+    """把字符串或 JSON 字段（dict / list / JSON 字符串）展开为纯文本"""
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        stripped = value.strip()
+        if stripped[:1] in ("{", "["):
+            try:
+                return flatten_text(json.loads(stripped))
+            except (json.JSONDecodeError, TypeError):
+                return value
+        return value
+    if isinstance(value, dict):
+        return " ".join(flatten_text(item) for item in value.values())
+    if isinstance(value, list):
+        return " ".join(flatten_text(item) for item in value)
+    return str(value)
+
+
+def stem(token: str) -> str:
+    """简单的英文复数还原：catalysts -> catalyst，alloys -> alloy，properties -> property"""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """小写化、按字母数字切词并做复数还原"""
+    return [stem(token) for token in _TOKEN_PATTERN.findall(text.lower())]
+
+
+def highlight(text: str, terms: set) -> str:
+    """把文本中命中查询词（含前缀命中）的单词包上高亮标签"""
+    def replace(match):
+        word = match.group(0)
+        return f"{HIGHLIGHT_START}{word}{HIGHLIGHT_STOP}" if stem(word.lower()) in terms else word
+    return _WORD_PATTERN.sub(replace, text)
+
+
+def make_snippet(text: str, terms: set, words: int = SNIPPET_WORDS) -> str:
+    """截取第一个命中词附近的片段并高亮；没有命中时返回空字符串"""
+    matches = list(_WORD_PATTERN.finditer(text))
+    for position, match in enumerate(matches):
+        if stem(match.group(0).lower()) in terms:
+            start = max(0, position - words // 3)
+            end = min(len(matches), start + words)
+            fragment = text[matches[start].start():matches[end - 1].end()]
+            prefix = "... " if start > 0 else ""
+            suffix = " ..." if end < len(matches) else ""
+            return prefix + highlight(fragment, terms) + suffix
+    return ""
+
+
+class PaperSearchIndex:
+    """
+    进程内倒排索引（memory 后端）
+
+    Args:
+        rows: paper_info 行（identifier, title, abstract, topic, alloy_elements）
+    """
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.documents = {}                          # identifier -> {字段: 文本}
+        self.postings = defaultdict(dict)            # 词 -> {identifier: 加权词频}
+        self.lengths = {}                            # identifier -> 加权文档长度
+        for row in rows:
+            identifier = row["identifier"]
+            fields = {field: flatten_text(row.get(field)) for field in FIELD_WEIGHTS}
+            self.documents[identifier] = fields
+            length = 0.0
+            for field, weight in FIELD_WEIGHTS.items():
+                for token in tokenize(fields[field]):
+                    self.postings[token][identifier] = self.postings[token].get(identifier, 0.0) + weight
+                    length += weight
+            self.lengths[identifier] = length
+        self.vocabulary = sorted(self.postings)
+        average_length = (sum(self.lengths.values()) / len(self.lengths)) if self.lengths else 0.0
+        # BM25 分母中与文档长度相关的部分预先计算
+        self._norms = {
+            identifier: BM25_K1 * (1 - BM25_B + BM25_B * length / (average_length or 1.0))
+            for identifier, length in self.lengths.items()
+        }
+        self._titles = [(identifier, fields["title"].lower()) for identifier, fields in self.documents.items()]
+        self.built_at = time.monotonic()
+
+    def _expand(self, term: str) -> List[Tuple[str, float]]:
+        """查询词 -> [(索引词, 权重)]：精确匹配权重 1，前缀匹配打折"""
+        expanded = [(term, 1.0)] if term in self.postings else []
+        if len(term) >= PREFIX_MIN_LENGTH:
+            position = bisect.bisect_left(self.vocabulary, term)
+            while position < len(self.vocabulary) and self.vocabulary[position].startswith(term):
+                if self.vocabulary[position] != term:
+                    expanded.append((self.vocabulary[position], PREFIX_WEIGHT))
+                position += 1
+        return expanded
+
+    def search(self, query: str, top: int) -> Tuple[List[Tuple[str, float]], int, set]:
+        """
+        检索并按得分排序
+
+        Args:
+            query: 检索词
+            top: 需要返回的前若干名
+
+        Returns:
+            (前 top 名 [(identifier, 得分), ...], 命中总数, 命中的索引词集合)
+        """
+        scores = defaultdict(float)
+        matched_terms = set()
+        total_documents = len(self.documents)
+        for term in set(tokenize(query)):
+            for token, weight in self._expand(term):
+                postings = self.postings[token]
+                matched_terms.add(token)
+                factor = weight * math.log(1 + (total_documents - len(postings) + 0.5) / (len(postings) + 0.5)) * (BM25_K1 + 1)
+                norms = self._norms
+                for identifier, frequency in postings.items():
+                    scores[identifier] += factor * frequency / (frequency + norms[identifier])
+
+        # 兼容原 ILIKE '%q%'：标题包含完整查询串的论文总是命中
+        needle = query.strip().lower()
+        if needle:
+            for identifier, title in self._titles:
+                if needle in title:
+                    scores[identifier] += TITLE_SUBSTRING_BONUS
+
+        ranked = heapq.nsmallest(top, scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked, len(scores), matched_terms
+
+
+_memory_index: Optional[PaperSearchIndex] = None
+_memory_lock = threading.Lock()
+_backend: Optional[str] = None
+
+
+def _load_memory_index() -> PaperSearchIndex:
+    """获取（必要时重建）进程内倒排索引"""
+    global _memory_index
+    with _memory_lock:
+        index = _memory_index
+        if index is not None and (SEARCH_INDEX_TTL <= 0 or time.monotonic() - index.built_at < SEARCH_INDEX_TTL):
+            return index
+
+        connection = None
+        cursor = None
+        try:
+            connection = get_db_connection()
+            cursor = get_db_cursor(connection)
+            cursor.execute("""
+                SELECT identifier, title, abstract, topic, alloy_elements
+                FROM public.paper_info
+            """)
+            _memory_index = PaperSearchIndex(cursor.fetchall())
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                release_db_connection(connection)
+        return _memory_index
+
+
+def get_search_backend() -> str:
+    """
+    当前使用的检索后端（auto 模式下检查 pg_trgm 扩展与全文索引是否存在，结果在进程内缓存）
+
+    Returns:
+        postgres 或 memory
+    """
+    global _backend
+    if SEARCH_BACKEND in ("postgres", "memory"):
+        return SEARCH_BACKEND
+    if _backend is not None:
+        return _backend
+
+    connection = None
+    cursor = None
+    try:
+        connection = get_db_connection()
+        cursor = get_db_cursor(connection)
+        cursor.execute("""
+            SELECT
+                EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') AS has_trgm,
+                EXISTS (SELECT 1 FROM pg_indexes WHERE tablename = 'paper_info' AND indexname = %s) AS has_search,
+                EXISTS (SELECT 1 FROM pg_indexes WHERE tablename = 'paper_info' AND indexname = %s) AS has_title_trgm
+        """, (SEARCH_INDEX_NAME, TITLE_TRGM_INDEX_NAME))
+        row = cursor.fetchone()
+        _backend = "postgres" if row and all(row.values()) else "memory"
+    finally:
+        if cursor:
+            cursor.close()
+        if connection:
+            release_db_connection(connection)
+    return _backend
+
+
+def _search_postgres(query: str, limit: int, offset: int, include_total: bool) -> PaperSearchPage:
+    """postgres 后端：全文索引 + 标题三元组索引"""
+    params = {"q": query, "pattern": f"%{query}%", "limit": limit + 1, "offset": offset}
+    match_sql = f"""
+        {SEARCH_DOCUMENT_SQL} @@ websearch_to_tsquery('{SEARCH_TS_CONFIG}', %(q)s)
+        OR %(q)s <%% title
+        OR title ILIKE %(pattern)s
+    """
+
+    connection = None
+    cursor = None
+    try:
+        connection = get_db_connection()
+        cursor = get_db_cursor(connection)
+        # ts_headline 只对排序截断后的当前页计算
+        cursor.execute(f"""
+            WITH ranked AS (
+                SELECT identifier, title, abstract,
+                       ts_rank_cd({SEARCH_DOCUMENT_SQL}, websearch_to_tsquery('{SEARCH_TS_CONFIG}', %(q)s), 32)
+                       + 0.5 * word_similarity(%(q)s, coalesce(title, '')) AS score
+                FROM public.paper_info
+                WHERE {match_sql}
+                ORDER BY score DESC, identifier
+                LIMIT %(limit)s OFFSET %(offset)s
+            )
+            SELECT identifier, title, score,
+                   ts_headline('{SEARCH_TS_CONFIG}', coalesce(title, ''), websearch_to_tsquery('{SEARCH_TS_CONFIG}', %(q)s),
+                               'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, HighlightAll=true') AS title_highlight,
+                   ts_headline('{SEARCH_TS_CONFIG}', coalesce(abstract::text, ''), websearch_to_tsquery('{SEARCH_TS_CONFIG}', %(q)s),
+                               'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, MaxWords={SNIPPET_WORDS}, MinWords=10, MaxFragments=2') AS snippet
+            FROM ranked
+            ORDER BY score DESC, identifier
+        """, params)
+        rows = cursor.fetchall()
+
+        total = None
+        if include_total:
+            cursor.execute(f"SELECT COUNT(*) AS total FROM public.paper_info WHERE {match_sql}", params)
+            total = cursor.fetchone()["total"]
+    finally:
+        if cursor:
+            cursor.close()
+        if connection:
+            release_db_connection(connection)
+
+    items = [
+        {
+            "identifier": row["identifier"],
+            "title": row["title"] if row["title"] else "",
+            "score": float(row["score"] or 0.0),
+            "title_highlight": row["title_highlight"],
+            "snippet": row["snippet"]
+        }
+        for row in rows[:limit]
+    ]
+    next_offset = offset + limit if len(rows) > limit else None
+    return PaperSearchPage(items=items, next_offset=next_offset, total=total, backend="postgres")
+
+
+def _search_memory(query: str, limit: int, offset: int) -> PaperSearchPage:
+    """memory 后端：进程内倒排索引"""
+    index = _load_memory_index()
+    ranked, total, terms = index.search(query, offset + limit)
+
+    items = []
+    for identifier, score in ranked[offset:]:
+        fields = index.documents[identifier]
+        items.append({
+            "identifier": identifier,
+            "title": fields["title"],
+            "score": round(score, 6),
+            "title_highlight": highlight(fields["title"], terms),
+            "snippet": make_snippet(fields["abstract"], terms)
+        })
+    next_offset = offset + limit if total > offset + limit else None
+    return PaperSearchPage(items=items, next_offset=next_offset, total=total, backend="memory")
+
+
+def search_papers(query: str, limit: int = 20, offset: int = 0, include_total: bool = False) -> PaperSearchPage:
+    """
+    检索论文（标题、摘要、主题、合金元素）
+
+    Args:
+        query: 检索词，支持多个词、"短语" 与 -排除词（postgres 后端）
+        limit: 每页条数
+        offset: 跳过的条数
+        include_total: 是否返回命中总数（memory 后端总是返回）
+
+    Returns:
+        按相关度排序的检索结果，title_highlight / snippet 中命中词以 <mark> 标出
+
+    Raises:
+        ValueError: 检索词为空时抛出异常
+        Exception: 数据库查询失败时抛出异常
+    """
+    if not query or not query.strip():
+        raise ValueError("搜索关键词不能为空")
+    query = query.strip()
+
+    if get_search_backend() == "postgres":
+        return _search_postgres(query, limit, offset, include_total)
+    return _search_memory(query, limit, offset)
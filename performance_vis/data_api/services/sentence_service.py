@@ -0,0 +1,91 @@
+"""
+句子证据相关业务逻辑服务（基于 sentence_index 表按主键查询，无需解析整篇 sentence_list）
+"""
+from typing import List, Optional
+
+from ..database import get_db_connection, get_db_cursor, release_db_connection
+from ..models import SentenceItem
+
+
+def parse_sentence_ids(ids: Optional[str]) -> Optional[List[int]]:
+    """
+    解析逗号分隔的句子 ID 参数
+
+    Args:
+        ids: 如 "3,5,12"，为空时表示整篇
+
+    Returns:
+        句子 ID 列表，为空时返回 None
+
+    Raises:
+        ValueError: 包含非整数 ID 时抛出异常
+    """
+    if not ids:
+        return None
+    try:
+        return sorted({int(item) for item in ids.split(",") if item.strip()})
+    except ValueError:
+        raise ValueError(f"句子 ID 必须是逗号分隔的整数: {ids}")
+
+
+def get_paper_sentences(identifier: str, sentence_ids: Optional[List[int]] = None) -> List[SentenceItem]:
+    """
+    批量获取论文的句子文本与字符区间
+
+    Args:
+        identifier: 论文标识符
+        sentence_ids: 句子 ID 列表，为 None 时返回整篇
+
+    Returns:
+        按句子 ID 排序的句子列表（不存在的 ID 被忽略）
+
+    Raises:
+        ValueError: 论文尚未建立句子索引时抛出异常
+    """
+    connection = None
+    cursor = None
+
+    try:
+        connection = get_db_connection()
+        cursor = get_db_cursor(connection)
+
+        if sentence_ids is None:
+            cursor.execute("""
+                SELECT sentence_id, sentence, start_offset, end_offset, token_count
+                FROM public.sentence_index
+                WHERE identifier = %s
+                ORDER BY sentence_id
+            """, (identifier,))
+        else:
+            cursor.execute("""
+                SELECT sentence_id, sentence, start_offset, end_offset, token_count
+                FROM public.sentence_index
+                WHERE identifier = %s AND sentence_id = ANY(%s)
+                ORDER BY sentence_id
+            """, (identifier, sentence_ids))
+        rows = cursor.fetchall()
+
+        if not rows:
+            # 区分“论文未建立索引”与“请求的 ID 都不存在”
+            cursor.execute("""
+                SELECT 1 FROM public.sentence_index WHERE identifier = %s LIMIT 1
+            """, (identifier,))
+            if cursor.fetchone() is None:
+                raise ValueError(f"未找到 identifier 为 {identifier} 的句子索引")
+
+        return [
+            SentenceItem(
+                id=row["sentence_id"],
+                sentence=row["sentence"] or "",
+                start=row["start_offset"],
+                end=row["end_offset"],
+                token_count=row["token_count"]
+            )
+            for row in rows
+        ]
+
+    finally:
+        if cursor:
+            cursor.close()
+        if connection:
+            release_db_connection(connection)
@@ -0,0 +1,219 @@
+"""
+相似合金检索服务：按组成向量做 k 近邻检索
+
+alloy_performance 中的每个 (identifier, alloy_id) 解析为 ELEMENTS 基上的摩尔分数向量（services/composition.py），
+全部合金组成一个稠密 NumPy 矩阵（每行一个合金），在进程内缓存，每 SIMILAR_INDEX_TTL 秒重建一次。
+检索时对整个矩阵做一次向量化运算（余弦相似度或 L1 距离），再按元素包含 / 排除掩码过滤并取 top-k
+"""
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..config import SIMILAR_INDEX_TTL
+from ..database import get_db_connection, get_db_cursor, release_db_connection
+from ..models import SimilarAlloyPage
+from .alloy_search_service import parse_elements
+from .alloy_service import parse_json_field
+from .composition import ELEMENT_INDEX, ELEMENTS, composition_vector, parse_composition, vector_fractions
+
+METRICS = ("cosine", "l1")
+
+
+class AlloyVectorIndex:
+    """
+    合金组成向量索引
+
+    Args:
+        rows: [{identifier, alloy_id, composition, elements}, ...]；组成式无法解析时按 elements 等原子比处理，
+              两者都没有的合金不进入索引
+    """
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.keys: List[Tuple[str, str]] = []
+        self.compositions: List[Optional[str]] = []
+        self.approximate: List[bool] = []
+        self._positions: Dict[Tuple[str, str], int] = {}
+        vectors = []
+
+        for row in rows:
+            key = (row["identifier"], row["alloy_id"])
+            if key in self._positions:
+                continue
+            fractions = parse_composition(row.get("composition"))
+            approximate = not fractions
+            if approximate:
+                elements = parse_json_field(row.get("elements"))
+                symbols = [symbol for symbol in elements or [] if symbol in ELEMENT_INDEX] if isinstance(elements, list) else []
+                fractions = {symbol: 1.0 / len(symbols) for symbol in symbols}
+            if not fractions:
+                continue
+            self._positions[key] = len(self.keys)
+            self.keys.append(key)
+            self.compositions.append(row.get("composition"))
+            self.approximate.append(approximate)
+            vectors.append(composition_vector(fractions))
+
+        # matrix: 摩尔分数（每行和为 1）；unit: 行单位化后的矩阵（余弦相似度）；present: 元素是否出现
+        self.matrix = np.vstack(vectors) if vectors else np.zeros((0, len(ELEMENTS)), dtype=np.float64)
+        norms = np.linalg.norm(self.matrix, axis=1, keepdims=True)
+        self.unit = np.divide(self.matrix, norms, out=np.zeros_like(self.matrix), where=norms > 0)
+        self.present = self.matrix > 0
+        self.built_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def vector_of(self, identifier: str, alloy_id: str) -> Optional[np.ndarray]:
+        """索引中某个合金的组成向量，不存在时返回 None"""
+        position = self._positions.get((identifier, alloy_id))
+        return None if position is None else self.matrix[position]
+
+    def search(
+        self,
+        vector: np.ndarray,
+        k: int = 10,
+        metric: str = "cosine",
+        include: Optional[List[str]] = None,
+        exclude: Optional[List[str]] = None,
+        skip: Optional[Tuple[str, str]] = None
+    ) -> List[Tuple[int, float, float]]:
+        """
+        k 近邻检索
+
+        Args:
+            vector: 查询组成向量（摩尔分数）
+            k: 返回的合金数
+            metric: cosine（余弦相似度）或 l1（摩尔分数的 L1 距离，范围 0..2）
+            include: 必须包含的元素
+            exclude: 不能包含的元素
+            skip: 排除的合金（以某个合金为查询时排除其自身）
+
+        Returns:
+            [(行号, 相似度, L1 距离), ...]，按相似度降序；相似度对 l1 为 1 - 距离 / 2
+        """
+        if len(self) == 0 or k <= 0:
+            return []
+
+        mask = np.ones(len(self), dtype=bool)
+        if include:
+            mask &= self.present[:, [ELEMENT_INDEX[symbol] for symbol in include]].all(axis=1)
+        if exclude:
+            mask &= ~self.present[:, [ELEMENT_INDEX[symbol] for symbol in exclude]].any(axis=1)
+        if skip is not None and skip in self._positions:
+            mask[self._positions[skip]] = False
+        candidates = np.flatnonzero(mask)
+        if candidates.size == 0:
+            return []
+
+        distances = np.abs(self.matrix[candidates] - vector).sum(axis=1)
+        if metric == "cosine":
+            norm = np.linalg.norm(vector)
+            scores = self.unit[candidates] @ (vector / norm) if norm > 0 else np.zeros(candidates.size)
+        else:
+            scores = 1.0 - distances / 2.0
+
+        if candidates.size > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(candidates.size)
+        # 相似度相同时按 L1 距离、再按行号排序，保证结果稳定
+        order = top[np.lexsort((candidates[top], distances[top], -scores[top]))]
+        return [(int(candidates[i]), float(scores[i]), float(distances[i])) for i in order]
+
+
+_vector_index: Optional[AlloyVectorIndex] = None
+_vector_lock = threading.Lock()
+
+
+def _load_vector_index() -> AlloyVectorIndex:
+    """获取（必要时重建）进程内组成向量索引"""
+    global _vector_index
+    with _vector_lock:
+        index = _vector_index
+        if index is not None and (SIMILAR_INDEX_TTL <= 0 or time.monotonic() - index.built_at < SIMILAR_INDEX_TTL):
+            return index
+
+        connection = None
+        cursor = None
+        try:
+            connection = get_db_connection()
+            cursor = get_db_cursor(connection)
+            cursor.execute("""
+                SELECT identifier, alloy_id, composition, elements
+                FROM public.alloy_performance
+                ORDER BY identifier, alloy_id, id
+            """)
+            _vector_index = AlloyVectorIndex(cursor.fetchall())
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                release_db_connection(connection)
+        return _vector_index
+
+
+def find_similar_alloys(
+    composition: Optional[str] = None,
+    identifier: Optional[str] = None,
+    alloy_id: Optional[str] = None,
+    k: int = 10,
+    metric: str = "cosine",
+    elements: Optional[str] = None,
+    exclude_elements: Optional[str] = None
+) -> SimilarAlloyPage:
+    """
+    检索组成最相似的合金
+
+    Args:
+        composition: 查询组成式，如 "Fe0.2Co0.2Ni0.2Cr0.2Mn0.2"
+        identifier / alloy_id: 以语料中已有的合金为查询（不传 composition 时使用），结果中排除其自身
+        k: 返回的合金数
+        metric: cosine 或 l1
+        elements: 逗号分隔的元素，结果需包含全部这些元素
+        exclude_elements: 逗号分隔的元素，结果不能包含其中任何一个
+
+    Returns:
+        查询向量与按相似度降序的合金列表
+
+    Raises:
+        ValueError: 参数不合法、组成式无法解析或查询合金不存在时抛出异常
+        Exception: 数据库查询失败时抛出异常
+    """
+    if metric not in METRICS:
+        raise ValueError(f"不支持的距离度量: {metric}，可选 {', '.join(METRICS)}")
+    include = parse_elements(elements)
+    exclude = parse_elements(exclude_elements)
+    unknown = [symbol for symbol in include + exclude if symbol not in ELEMENT_INDEX]
+    if unknown:
+        raise ValueError(f"不合法的元素符号: {', '.join(unknown)}")
+
+    index = _load_vector_index()
+    skip = None
+    if composition and composition.strip():
+        fractions = parse_composition(composition)
+        if not fractions:
+            raise ValueError(f"无法解析组成式: {composition}")
+        vector = composition_vector(fractions)
+    elif identifier and alloy_id:
+        vector = index.vector_of(identifier, alloy_id)
+        if vector is None:
+            raise ValueError(f"未找到合金组成: identifier={identifier}, alloy_id={alloy_id}")
+        skip = (identifier, alloy_id)
+    else:
+        raise ValueError("需要提供 composition，或同时提供 identifier 与 alloy_id")
+
+    items = []
+    for position, score, distance in index.search(vector, k, metric, include, exclude, skip):
+        row_identifier, row_alloy_id = index.keys[position]
+        items.append({
+            "identifier": row_identifier,
+            "alloy_id": row_alloy_id,
+            "composition": index.compositions[position],
+            "fractions": vector_fractions(index.matrix[position]),
+            "approximate": index.approximate[position],
+            "score": round(score, 6),
+            "l1_distance": round(distance, 6)
+        })
+    return SimilarAlloyPage(query=vector_fractions(vector), metric=metric, items=items, indexed=len(index))
@@ -10,29 +10,29 @@ const api = axios.create({
 })
 
 export const paperApi = {
-  // 获取所有论文列表
-  async getPapers() {
-    const response = await api.get('/papers')
+  // 分页获取论文列表
+  async getPapersPage({ limit = 50, cursor = null, fields = null, includeTotal = false } = {}) {
+    const params = { limit }
+    if (cursor) params.cursor = cursor
+    if (fields) params.fields = fields
+    if (includeTotal) params.include_total = true
+    const response = await api.get('/papers', { params })
     return response.data
   },
 
-  // 搜索论文
-  async searchPapers(query) {
+  // 搜索论文（返回第一页结果，含 title_highlight / snippet 高亮片段）
+  async searchPapers(query, { limit = 100, offset = 0 } = {}) {
     const response = await api.get('/papers/search', {
-      params: { q: query }
+      params: { q: query, limit, offset }
     })
-    return response.data
-  },
-
-  // 获取论文详情
-  async getPaperDetail(identifier) {
-    const response = await api.get(`/papers/${identifier}`)
-    return response.data
+    return response.data.items
   },
 
-  // 获取论文性能数据
-  async getPaperPerformance(identifier) {
-    const response = await api.get(`/papers/${identifier}/performance`)
+  // 获取论文页面数据（基本信息、整合性能数据与 PDF 地址，一次请求）
+  async getPaperView(identifier, fields = null) {
+    const params = {}
+    if (fields) params.fields = fields
+    const response = await api.get(`/papers/${identifier}/view`, { params })
     return response.data
   },
 
@@ -42,21 +42,6 @@ export const paperApi = {
     const cleanPath = path.startsWith('/') ? path.substring(1) : path
     // 使用相对路径
     return `/static_images/${cleanPath}`
-  },
-
-  // 获取 PDF URL
-  async getPdfUrl(identifier) {
-    try {
-      const response = await api.get(`/papers/${identifier}/pdf`)
-      if (response.data && response.data.url) {
-        // 使用相对路径
-        return response.data.url
-      }
-      return null
-    } catch (error) {
-      console.error('Error fetching PDF URL:', error)
-      return null
-    }
   }
 }
 